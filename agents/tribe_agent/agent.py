@@ -10,10 +10,19 @@ from google.adk.agents import LlmAgent
 from google.adk.tools import FunctionTool
 
 # Import tools from tools directory
-from tools.housing import search_housing_resources_tool
+from tools.housing import get_housing_overview_tool, search_housing_resources_tool
 # NOTE: search_live_data is now handled by frontend tool (searchLiveData) which calls /api/live-search
 from tools.visa import search_visa_options_tool
 from tools.context import get_user_context_tool
+import answer_cache
+import deadline
+import history
+import model_router
+from tools import batching
+from logging_config import get_logger
+from turn_context import get_context_value, safe_get
+
+logger = get_logger(__name__)
 
 # Base system instruction for the TRIBE assistant
 BASE_SYSTEM_INSTRUCTION = """You are TRIBE, an AI migration assistant helping people navigate their
@@ -59,7 +68,8 @@ def build_system_prompt(context=None) -> str:
     Build dynamic system prompt with user context from CopilotKit properties.
 
     The context is passed via AG-UI protocol from CopilotKit's properties prop.
-    ADK passes a ReadonlyContext object, not a dict.
+    ADK passes a ReadonlyContext object, not a dict; values are read from it
+    or its session state (see turn_context).
 
     Args:
         context: Optional ReadonlyContext or dict containing user/corridor state
@@ -70,19 +80,9 @@ def build_system_prompt(context=None) -> str:
     context_parts = []
 
     if context:
-        # Handle both ReadonlyContext objects and dicts
-        def safe_get(obj, key, default=None):
-            """Safely get a value from dict or object with attributes."""
-            if obj is None:
-                return default
-            if isinstance(obj, dict):
-                return obj.get(key, default)
-            # Try attribute access for ReadonlyContext
-            return getattr(obj, key, default)
-
         try:
             # Extract corridor information
-            corridor = safe_get(context, "corridor")
+            corridor = get_context_value(context, "corridor")
             if corridor:
                 origin = safe_get(corridor, "origin")
                 destination = safe_get(corridor, "destination")
@@ -93,12 +93,12 @@ def build_system_prompt(context=None) -> str:
                     )
 
             # Extract migration stage
-            stage = safe_get(context, "stage")
+            stage = get_context_value(context, "stage")
             if stage and stage in STAGE_DESCRIPTIONS:
                 context_parts.append(STAGE_DESCRIPTIONS[stage])
 
             # Extract language preference
-            language = safe_get(context, "language", "en")
+            language = get_context_value(context, "language", "en")
             lang_name = LANGUAGE_NAMES.get(language, "English") if language else "English"
             if language and language != "en":
                 context_parts.append(
@@ -110,14 +110,14 @@ def build_system_prompt(context=None) -> str:
                 )
 
             # Note about user context tool
-            if safe_get(context, "userId"):
+            if get_context_value(context, "userId"):
                 context_parts.append(
                     "You can use the get_user_context tool to fetch the user's current todos, "
                     "saved documents, and migration progress for more personalized assistance."
                 )
         except Exception as e:
             # Log but don't fail - return base instruction
-            print(f"Warning: Error processing context: {e}")
+            logger.warning(f"Error processing context: {e}")
 
     if context_parts:
         return BASE_SYSTEM_INSTRUCTION + "\n\n## CURRENT USER CONTEXT:\n" + "\n".join(context_parts)
@@ -136,7 +136,7 @@ async def get_agent_info() -> dict:
     return {
         "name": "TRIBE",
         "version": "1.0.0",
-        "model": "gemini-2.5-flash",
+        "model": model_router.FULL_MODEL,
         "capabilities": [
             "visa_guidance",
             "housing_search",
@@ -153,13 +153,29 @@ get_agent_info_tool = FunctionTool(get_agent_info)
 # The instruction callable receives context from AG-UI protocol (CopilotKit properties)
 tribe_agent = LlmAgent(
     name="tribe_agent",
-    model="gemini-2.5-flash",
+    model=model_router.FULL_MODEL,  # Simple turns are routed to a lighter model
     instruction=build_system_prompt,  # Dynamic instruction based on user context
     tools=[
         get_agent_info_tool,
+        get_housing_overview_tool,
         search_housing_resources_tool,
         # search_live_data_tool removed - now handled by frontend tool (searchLiveData)
         search_visa_options_tool,
         get_user_context_tool,
     ],
+    # Repeated opening questions for a corridor are answered without calling Gemini;
+    # otherwise old turns are folded into a summary before routing the call
+    before_model_callback=[
+        answer_cache.before_model_callback,
+        history.before_model_callback,
+        model_router.before_model_callback,
+        deadline.before_model_callback,  # Last, so the timeout reflects all earlier work
+    ],
+    after_model_callback=[
+        answer_cache.after_model_callback,
+        batching.after_model_callback,  # Bounds and times parallel tool calls per turn
+    ],
+    on_model_error_callback=deadline.on_model_error_callback,
+    on_tool_error_callback=batching.on_tool_error_callback,
+    after_agent_callback=batching.after_agent_callback,
 )
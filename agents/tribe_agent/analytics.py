@@ -0,0 +1,151 @@
+"""
+Batched analytics event sink
+
+Usage events (tool calls, answer cache lookups, direct API lookups, request
+timings) with their corridor and language, written for offline analysis
+instead of grepping stdout logs. Nothing is written unless ANALYTICS_DIR is
+set.
+
+- `emit(event, **fields)` only appends to an in-memory buffer; it never
+  blocks or does I/O on the request path
+- a background task flushes every ANALYTICS_FLUSH_SECONDS, or as soon as
+  ANALYTICS_BATCH_SIZE events are waiting, writing the batch in a thread
+- the buffer holds at most ANALYTICS_BUFFER_SIZE events; when the writer
+  falls behind, new events are dropped and counted
+  (analytics_events_dropped_total) rather than growing memory
+- files are gzip JSONL, one per worker and hour
+  (events-<YYYYmmddHH>-<pid>-<n>.jsonl.gz), rotated past
+  ANALYTICS_ROTATE_BYTES; each flush appends a gzip member, so files are
+  readable with zcat / pandas.read_json(lines=True) even while being written
+- on shutdown the flusher is told to stop and writes the rest itself, so
+  only one write to a file is ever in progress
+"""
+
+import asyncio
+import collections
+import gzip
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+import metrics
+import serialization
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+ANALYTICS_DIR = os.environ.get("ANALYTICS_DIR", "")
+ANALYTICS_BUFFER_SIZE = int(os.environ.get("ANALYTICS_BUFFER_SIZE", 50_000))
+ANALYTICS_BATCH_SIZE = int(os.environ.get("ANALYTICS_BATCH_SIZE", 1000))
+ANALYTICS_FLUSH_SECONDS = float(os.environ.get("ANALYTICS_FLUSH_SECONDS", 5))
+ANALYTICS_ROTATE_BYTES = int(os.environ.get("ANALYTICS_ROTATE_BYTES", 64 * 1024 * 1024))
+
+_emitted = metrics.counter("analytics_events_total", "Analytics events accepted by type")
+_dropped = metrics.counter(
+    "analytics_events_dropped_total", "Analytics events dropped because the buffer was full"
+)
+_buffer: collections.deque = collections.deque()
+metrics.gauge(
+    "analytics_buffer_events",
+    "Analytics events waiting to be written",
+    callback=lambda: len(_buffer),
+)
+
+_wakeup: Optional[asyncio.Event] = None
+_stopping = False
+
+
+def emit(event: str, **fields) -> None:
+    """Record an event. Non-blocking; drops the event if the buffer is full."""
+    if not ANALYTICS_DIR:
+        return
+    if len(_buffer) >= ANALYTICS_BUFFER_SIZE:
+        _dropped.inc(event=event)
+        return
+    _buffer.append({"ts": round(time.time(), 3), "event": event, **fields})
+    _emitted.inc(event=event)
+    if len(_buffer) >= ANALYTICS_BATCH_SIZE and _wakeup is not None:
+        _wakeup.set()
+
+
+class RotatingGzipWriter:
+    """Appends batches as gzip members to per-hour files, rotating by size."""
+
+    def __init__(self, directory: Path, rotate_bytes: int = ANALYTICS_ROTATE_BYTES):
+        self.directory = directory
+        self.rotate_bytes = rotate_bytes
+        self._path: Optional[Path] = None
+        self._hour: Optional[str] = None
+        self._part = 0
+
+    def _current_path(self) -> Path:
+        hour = datetime.now(timezone.utc).strftime("%Y%m%d%H")
+        if hour != self._hour:
+            self._hour, self._part, self._path = hour, 0, None
+        if self._path is not None and self._path.exists():
+            if self._path.stat().st_size >= self.rotate_bytes:
+                self._part += 1
+                self._path = None
+        if self._path is None:
+            name = f"events-{hour}-{os.getpid()}-{self._part}.jsonl.gz"
+            self._path = self.directory / name
+        return self._path
+
+    def write(self, events: list[dict]) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        lines = b"".join(serialization.dumps(e) + b"\n" for e in events)
+        with open(self._current_path(), "ab") as f:
+            f.write(gzip.compress(lines))
+
+
+def _take_batch() -> list[dict]:
+    batch = []
+    while _buffer and len(batch) < ANALYTICS_BATCH_SIZE:
+        batch.append(_buffer.popleft())
+    return batch
+
+
+async def _flush(writer: RotatingGzipWriter) -> None:
+    while _buffer:
+        batch = _take_batch()
+        try:
+            await asyncio.to_thread(writer.write, batch)
+        except OSError:
+            _dropped.inc(len(batch), event="write_error")
+            logger.exception("Analytics flush failed", extra={"events": len(batch)})
+            return
+
+
+async def run(writer: RotatingGzipWriter) -> None:
+    """Flush the buffer periodically (or when a batch is ready) until stopped."""
+    while True:
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=ANALYTICS_FLUSH_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        _wakeup.clear()
+        # A stop request lands here too, after any write in progress finished
+        await _flush(writer)
+        if _stopping:
+            return
+
+
+def start() -> Optional[asyncio.Task]:
+    global _wakeup, _stopping
+    if not ANALYTICS_DIR:
+        return None
+    _wakeup = asyncio.Event()
+    _stopping = False
+    return asyncio.create_task(run(RotatingGzipWriter(Path(ANALYTICS_DIR))), name="analytics-sink")
+
+
+async def stop(task: Optional[asyncio.Task]) -> None:
+    """Stop the flusher once it has written whatever is still buffered."""
+    global _stopping
+    if task is None:
+        return
+    _stopping = True
+    _wakeup.set()
+    await task
@@ -0,0 +1,357 @@
+"""
+Semantic Answer Cache
+
+Many conversations open with the same question for the same corridor and
+language ("what documents do I need for a NGA→CAN work visa?"). This cache
+stores final answers keyed on (normalized question, corridor, stage, language)
+and matches new questions by cosine similarity of locally computed hashed
+n-gram vectors, held in a NumPy matrix. On a confident hit the
+before_model_callback returns the cached answer as the model response, so
+ADK skips the Gemini call and tool loop and ag_ui_adk streams it as the usual
+AG-UI text events.
+
+Only opening questions are cached: a follow-up like "and for my spouse?"
+depends on earlier turns, and answers that used personal data
+(get_user_context) are never stored.
+
+Answers are tagged like the data they were built from (`iso3:<O>:<D>` for
+the turn's corridor and visa lookups, `country:<ISO3>` for live searches).
+Each answer has a marker entry in the 'answer' cache namespace carrying those
+tags, so `cache.invalidate` (and /internal/invalidate) drops the markers, in
+every worker with CACHE_BACKEND=shared, and a hit whose marker is gone is
+treated as a miss.
+"""
+
+import os
+import re
+import threading
+import time
+import uuid
+import zlib
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+import numpy as np
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.genai import types
+
+import analytics
+import deadline
+import metrics
+from cache import get_cache
+from logging_config import get_logger
+from tools.visa import normalize_country_code
+from turn_context import get_context_value, safe_get, turn_scope
+
+logger = get_logger(__name__)
+
+ANSWER_CACHE_ENABLED = os.environ.get("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_THRESHOLD = float(os.environ.get("ANSWER_CACHE_THRESHOLD", 0.9))
+ANSWER_CACHE_TTL_SECONDS = float(os.environ.get("ANSWER_CACHE_TTL_SECONDS", 6 * 60 * 60))
+ANSWER_CACHE_MAX_ENTRIES = int(os.environ.get("ANSWER_CACHE_MAX_ENTRIES", 2048))
+
+EMBEDDING_DIM = 1024
+MIN_QUESTION_WORDS = 3
+
+# Function words that vary between phrasings without changing the question
+STOPWORDS = frozenset(
+    "a an the i me my we our you your do does can could would should please is are "
+    "be of to in on at for what which".split()
+)
+
+# Answers built from these tools are specific to one user and must not be shared
+PERSONAL_TOOLS = {"get_user_context"}
+
+_lookups = metrics.counter("answer_cache_lookups_total", "Answer cache lookups by result")
+_stores = metrics.counter("answer_cache_stores_total", "Answers stored in the answer cache")
+_evictions = metrics.counter("answer_cache_evictions_total", "Answer cache evictions by reason")
+
+
+def normalize_question(text: str) -> str:
+    """Lower-case, strip punctuation and collapse whitespace."""
+    return " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
+
+
+def _hash_feature(feature: str) -> tuple[int, float]:
+    h = zlib.crc32(feature.encode("utf-8"))
+    # Signed hashing keeps collisions from systematically inflating similarity
+    return h % EMBEDDING_DIM, (1.0 if h & 0x80000000 else -1.0)
+
+
+def embed(normalized: str) -> np.ndarray:
+    """
+    Embed a normalized question as an L2-normalized hashed n-gram vector.
+
+    Word unigrams and bigrams capture intent; character 4-grams make the
+    match robust to inflections and typos ("document"/"documents").
+    """
+    vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    words = [w for w in normalized.split() if w not in STOPWORDS] or normalized.split()
+    features = [(w, 1.0) for w in words]
+    features += [(f"{a} {b}", 1.0) for a, b in zip(words, words[1:])]
+    for word in words:
+        padded = f" {word} "
+        features += [(f"#{padded[i:i + 4]}", 0.5) for i in range(max(1, len(padded) - 3))]
+
+    for feature, weight in features:
+        index, sign = _hash_feature(feature)
+        vector[index] += sign * weight
+
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+@dataclass
+class _Entry:
+    scope: tuple[str, str, str]
+    normalized: str
+    answer: str
+    expires_at: float
+    last_used: float
+    marker: str
+    hits: int = 0
+
+
+class AnswerCache:
+    """Bounded similarity cache of final answers, partitioned by scope."""
+
+    def __init__(
+        self,
+        max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+        ttl: float = ANSWER_CACHE_TTL_SECONDS,
+        threshold: float = ANSWER_CACHE_THRESHOLD,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self._matrix = np.zeros((max_entries, EMBEDDING_DIM), dtype=np.float32)
+        self._entries: list[Optional[_Entry]] = [None] * max_entries
+        self._free = list(range(max_entries - 1, -1, -1))
+        self._by_scope: dict[tuple, set[int]] = {}
+        self._exact: dict[tuple, int] = {}
+        self._lock = threading.Lock()
+        # Invalidation markers, tagged with the data each answer was built from
+        self._markers = get_cache("answer", max_entries=2 * max_entries, default_ttl=ttl)
+
+    def _evict(self, slot: int, reason: str) -> None:
+        entry = self._entries[slot]
+        self._entries[slot] = None
+        self._free.append(slot)
+        slots = self._by_scope.get(entry.scope)
+        if slots is not None:
+            slots.discard(slot)
+            if not slots:
+                del self._by_scope[entry.scope]
+        self._exact.pop((entry.scope, entry.normalized), None)
+        _evictions.inc(reason=reason)
+
+    def lookup(self, question: str, scope: tuple[str, str, str]) -> Optional[tuple[str, float]]:
+        """
+        Find a cached answer for a question within the same scope.
+
+        Returns:
+            (answer, similarity) on a hit above the threshold, otherwise None
+        """
+        normalized = normalize_question(question)
+        now = time.time()
+
+        with self._lock:
+            slot = self._exact.get((scope, normalized))
+            score = 1.0
+            if slot is None:
+                slots = self._by_scope.get(scope)
+                if not slots:
+                    _lookups.inc(result="miss")
+                    return None
+                candidates = np.fromiter(slots, dtype=np.int64, count=len(slots))
+                similarities = self._matrix[candidates] @ embed(normalized)
+                best = int(np.argmax(similarities))
+                slot, score = int(candidates[best]), float(similarities[best])
+                if score < self.threshold:
+                    _lookups.inc(result="miss")
+                    return None
+
+            entry = self._entries[slot]
+            if entry.expires_at <= now:
+                self._evict(slot, "expired")
+                _lookups.inc(result="miss")
+                return None
+            if self._markers.get(entry.marker) is None:
+                self._evict(slot, "invalidated")
+                _lookups.inc(result="miss")
+                return None
+
+            entry.last_used = now
+            entry.hits += 1
+            _lookups.inc(result="hit")
+            return entry.answer, score
+
+    def store(
+        self, question: str, scope: tuple[str, str, str], answer: str, tags: Iterable[str] = ()
+    ) -> None:
+        """Store a final answer, replacing an identical question or evicting the LRU entry."""
+        normalized = normalize_question(question)
+        now = time.time()
+        marker = uuid.uuid4().hex
+        self._markers.set(marker, True, tags=tags)
+
+        with self._lock:
+            slot = self._exact.get((scope, normalized))
+            if slot is not None:
+                self._evict(slot, "replaced")
+            if not self._free:
+                used = [(e.last_used, i) for i, e in enumerate(self._entries) if e is not None]
+                self._evict(min(used)[1], "capacity")
+
+            slot = self._free.pop()
+            self._matrix[slot] = embed(normalized)
+            self._entries[slot] = _Entry(scope, normalized, answer, now + self.ttl, now, marker)
+            self._by_scope.setdefault(scope, set()).add(slot)
+            self._exact[(scope, normalized)] = slot
+            _stores.inc()
+
+    def clear(self) -> None:
+        with self._lock:
+            for slot, entry in enumerate(self._entries):
+                if entry is not None:
+                    self._evict(slot, "cleared")
+
+    def __len__(self) -> int:
+        return self.max_entries - len(self._free)
+
+
+answer_cache = AnswerCache()
+
+
+def hit_ratio() -> float:
+    """Share of lookups answered from the cache since startup."""
+    hits = _lookups.value(result="hit")
+    total = hits + _lookups.value(result="miss")
+    return hits / total if total else 0.0
+
+
+metrics.gauge(
+    "answer_cache_entries", "Answers currently cached", callback=lambda: len(answer_cache)
+)
+metrics.gauge(
+    "answer_cache_hit_ratio", "Answer cache hits / lookups since startup", callback=hit_ratio
+)
+
+
+# Turns whose answer may be stored once the model produces it, by invocation id
+_pending: dict[str, dict] = {}
+_PENDING_MAX = 10_000
+
+
+def _iso3_tag(origin, destination) -> Optional[str]:
+    origin_code, origin_error = normalize_country_code(origin)
+    dest_code, dest_error = normalize_country_code(destination)
+    if origin_error or dest_error:
+        return None
+    return f"iso3:{origin_code}:{dest_code}"
+
+
+def _scope_tags(callback_context: CallbackContext) -> set[str]:
+    """Invalidation tags for the turn's corridor."""
+    corridor = get_context_value(callback_context, "corridor")
+    tags = {_iso3_tag(safe_get(corridor, "origin"), safe_get(corridor, "destination"))}
+    corridor_id = safe_get(corridor, "_id") or safe_get(corridor, "id")
+    if corridor_id:
+        tags.add(f"corridor:{corridor_id}")
+    return tags - {None}
+
+
+def _call_tags(call: types.FunctionCall) -> set[str]:
+    """Invalidation tags of the data a tool call reads, as the tools tag their caches."""
+    args = call.args or {}
+    if call.name == "search_visa_options":
+        return {_iso3_tag(args.get("origin"), args.get("destination"))} - {None}
+    if call.name == "search_live_data" and args.get("target_country"):
+        code, error = normalize_country_code(args["target_country"])
+        return set() if error else {f"country:{code}"}
+    return set()
+
+
+def _opening_question(llm_request: LlmRequest) -> Optional[str]:
+    """The user's question if this is the first model call of a fresh conversation."""
+    contents = llm_request.contents
+    if not contents or any(c.role != "user" for c in contents):
+        return None
+    parts = contents[-1].parts or []
+    if any(p.function_response for p in parts):
+        return None
+    text = " ".join(p.text for p in parts if p.text).strip()
+    if len(text.split()) < MIN_QUESTION_WORDS:
+        return None
+    return text
+
+
+def before_model_callback(
+    callback_context: CallbackContext, llm_request: LlmRequest
+) -> Optional[LlmResponse]:
+    """Serve a cached answer instead of calling the model when one matches."""
+    if not ANSWER_CACHE_ENABLED:
+        return None
+
+    question = _opening_question(llm_request)
+    if question is None:
+        return None
+
+    scope = turn_scope(callback_context)
+    hit = answer_cache.lookup(question, scope)
+    analytics.emit(
+        "answer_cache",
+        result="miss" if hit is None else "hit",
+        similarity=None if hit is None else round(hit[1], 3),
+        corridor=scope[0],
+        stage=scope[1],
+        language=scope[2],
+    )
+    if hit is None:
+        if len(_pending) >= _PENDING_MAX:
+            _pending.clear()
+        _pending[callback_context.invocation_id] = {
+            "question": question,
+            "scope": scope,
+            "cacheable": True,
+            "tags": _scope_tags(callback_context),
+        }
+        return None
+
+    answer, score = hit
+    logger.info(
+        "Answer cache hit",
+        extra={
+            "corridor": scope[0],
+            "stage": scope[1],
+            "language": scope[2],
+            "similarity": round(score, 3),
+        },
+    )
+    return LlmResponse(content=types.Content(role="model", parts=[types.Part(text=answer)]))
+
+
+def after_model_callback(
+    callback_context: CallbackContext, llm_response: LlmResponse
+) -> Optional[LlmResponse]:
+    """Store the final answer of a cacheable turn."""
+    pending = _pending.get(callback_context.invocation_id)
+    if pending is None or llm_response.partial or not llm_response.content:
+        return None
+
+    parts = llm_response.content.parts or []
+    calls = [p.function_call for p in parts if p.function_call]
+    if calls:
+        if any(call.name in PERSONAL_TOOLS for call in calls):
+            pending["cacheable"] = False
+        for call in calls:
+            pending["tags"] |= _call_tags(call)
+        return None
+
+    _pending.pop(callback_context.invocation_id, None)
+    answer = "".join(p.text for p in parts if p.text and not p.thought).strip()
+    degraded = llm_response.error_code or answer == deadline.DEGRADED_ANSWER
+    if pending["cacheable"] and answer and not degraded:
+        answer_cache.store(pending["question"], pending["scope"], answer, pending["tags"])
+    return None
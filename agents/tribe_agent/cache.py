@@ -0,0 +1,407 @@
+"""
+Local response caches for tool results.
+
+Two backends share one interface:
+- MemoryCache: per-process LRU with TTL (default)
+- SharedCache: SQLite file on local disk (tmpfs when available), shared by all
+  worker processes on the host so preforked workers don't each warm their own
+
+The backend is selected with CACHE_BACKEND=memory|shared. Values must be
+JSON-serializable so both backends behave the same.
+
+Entries can carry tags (e.g. 'corridor:<id>', 'iso3:NGA:CAN') kept in a tag
+index, so an upstream change can evict every affected entry in O(tag size)
+via `invalidate()` instead of waiting for TTLs to expire. Tag rows are removed
+together with their entries, however the entry goes (expiry, trim, delete).
+
+With the memory backend, `invalidate()` only reaches the calling process;
+serve.py therefore requires CACHE_BACKEND=shared to run several workers.
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+import serialization
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "memory").lower()
+
+# tmpfs keeps the shared cache off the container's writable layer
+_DEFAULT_CACHE_DIR = (
+    Path("/dev/shm") if Path("/dev/shm").is_dir() else Path(tempfile.gettempdir())
+)
+CACHE_PATH = Path(
+    os.environ.get("CACHE_PATH", _DEFAULT_CACHE_DIR / "tribe_agent_cache.sqlite3")
+)
+
+# Every namespace the app caches under. invalidate() rejects anything else, and
+# accepts these even in a process that has not created the cache yet (LAZY_INIT).
+NAMESPACES = frozenset(
+    {"visa", "user_context", "live_search", "history", "idempotency", "answer"}
+)
+
+
+class MemoryCache:
+    """In-process LRU cache with per-entry TTL and a tag index."""
+
+    def __init__(self, namespace: str, max_entries: int = 1024, default_ttl: float = 300.0):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._key_tags: dict[str, tuple[str, ...]] = {}
+        self._tag_keys: dict[str, set[str]] = {}
+        self._lock = threading.Lock()
+
+    def _remove(self, key: str) -> bool:
+        """Drop a key and its tag index entries. Caller holds the lock."""
+        if self._entries.pop(key, None) is None:
+            return False
+        for tag in self._key_tags.pop(key, ()):
+            keys = self._tag_keys.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_keys[tag]
+        return True
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def expires_at(self, key: str) -> Optional[float]:
+        """Expiry (epoch seconds) of a live entry, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.time():
+            return None
+        return entry[0]
+
+    def set(
+        self, key: str, value: Any, ttl: Optional[float] = None, tags: Iterable[str] = ()
+    ) -> None:
+        """Store a value, evicting the least recently used entry when full."""
+        expires_at = time.time() + (ttl if ttl is not None else self.default_ttl)
+        tags = tuple(tags)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (expires_at, value)
+            if tags:
+                self._key_tags[key] = tags
+                for tag in tags:
+                    self._tag_keys.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def delete(self, key: str) -> bool:
+        """Remove a key. Returns True if it was present."""
+        with self._lock:
+            return self._remove(key)
+
+    def delete_prefix(self, prefix: str) -> int:
+        """Remove every key starting with prefix (scans keys). Returns the count."""
+        with self._lock:
+            keys = [key for key in self._entries if key.startswith(prefix)]
+            for key in keys:
+                self._remove(key)
+        return len(keys)
+
+    def invalidate_tag(self, tag: str) -> int:
+        """Remove every key carrying the tag. Returns the count."""
+        with self._lock:
+            keys = list(self._tag_keys.get(tag, ()))
+            for key in keys:
+                self._remove(key)
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._key_tags.clear()
+            self._tag_keys.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SharedCache:
+    """
+    SQLite-backed cache shared by every worker process on the host.
+
+    Each process opens its own connection (connections must not cross fork).
+    WAL mode lets readers proceed while another worker writes.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        max_entries: int = 1024,
+        default_ttl: float = 300.0,
+        path: Path = CACHE_PATH,
+    ):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None or self._conn_pid != os.getpid():
+            conn = sqlite3.connect(
+                self.path, timeout=5.0, check_same_thread=False, isolation_level=None
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL, PRIMARY KEY (namespace, key))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_tags ("
+                " namespace TEXT NOT NULL, tag TEXT NOT NULL, key TEXT NOT NULL,"
+                " PRIMARY KEY (namespace, tag, key))"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS cache_tags_key ON cache_tags (namespace, key)"
+            )
+            # Tag rows left behind by versions that didn't remove them with their entries
+            conn.execute(
+                "DELETE FROM cache_tags WHERE namespace = ? AND NOT EXISTS ("
+                " SELECT 1 FROM cache WHERE cache.namespace = cache_tags.namespace"
+                " AND cache.key = cache_tags.key)",
+                (self.namespace,),
+            )
+            self._conn = conn
+            self._conn_pid = os.getpid()
+        return self._conn
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            ).fetchone()
+        if row is None or row[1] <= time.time():
+            return None
+        return json.loads(row[0])
+
+    def expires_at(self, key: str) -> Optional[float]:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT expires_at FROM cache WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            ).fetchone()
+        if row is None or row[0] <= time.time():
+            return None
+        return row[0]
+
+    def _delete_keys(self, conn: sqlite3.Connection, keys: list[str]) -> int:
+        """Delete entries and their tag rows. Caller holds the lock and a transaction."""
+        rows = [(self.namespace, key) for key in keys]
+        cursor = conn.executemany("DELETE FROM cache WHERE namespace = ? AND key = ?", rows)
+        deleted = cursor.rowcount
+        conn.executemany("DELETE FROM cache_tags WHERE namespace = ? AND key = ?", rows)
+        return deleted
+
+    def _transaction(self, work) -> Any:
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN")
+            try:
+                result = work(conn)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return result
+
+    def set(
+        self, key: str, value: Any, ttl: Optional[float] = None, tags: Iterable[str] = ()
+    ) -> None:
+        now = time.time()
+        expires_at = now + (ttl if ttl is not None else self.default_ttl)
+
+        def work(conn: sqlite3.Connection) -> None:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at)"
+                " VALUES (?, ?, ?, ?)",
+                (self.namespace, key, serialization.dumps_str(value), expires_at),
+            )
+            conn.execute(
+                "DELETE FROM cache_tags WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO cache_tags (namespace, tag, key) VALUES (?, ?, ?)",
+                [(self.namespace, tag, key) for tag in tags],
+            )
+            # Purge expired rows and trim the soonest-expiring entries over the bound,
+            # with their tag rows
+            victims = [
+                row[0]
+                for row in conn.execute(
+                    "SELECT key FROM cache WHERE namespace = ? AND (expires_at <= ? OR key IN ("
+                    " SELECT key FROM cache WHERE namespace = ?"
+                    " ORDER BY expires_at DESC LIMIT -1 OFFSET ?))",
+                    (self.namespace, now, self.namespace, self.max_entries),
+                )
+            ]
+            if victims:
+                self._delete_keys(conn, victims)
+
+        self._transaction(work)
+
+    def delete(self, key: str) -> bool:
+        return self._transaction(lambda conn: self._delete_keys(conn, [key])) > 0
+
+    def delete_prefix(self, prefix: str) -> int:
+        # Range scan on the primary key instead of LIKE, which can't use the index
+        bounds = (self.namespace, prefix, prefix + "\U0010ffff")
+
+        def work(conn: sqlite3.Connection) -> int:
+            cursor = conn.execute(
+                "DELETE FROM cache WHERE namespace = ? AND key >= ? AND key < ?", bounds
+            )
+            conn.execute(
+                "DELETE FROM cache_tags WHERE namespace = ? AND key >= ? AND key < ?", bounds
+            )
+            return cursor.rowcount
+
+        return self._transaction(work)
+
+    def invalidate_tag(self, tag: str) -> int:
+        def work(conn: sqlite3.Connection) -> int:
+            keys = [
+                row[0]
+                for row in conn.execute(
+                    "SELECT key FROM cache_tags WHERE namespace = ? AND tag = ?",
+                    (self.namespace, tag),
+                )
+            ]
+            # Also drops the entries' other tags, not only this one
+            return self._delete_keys(conn, keys)
+
+        return self._transaction(work)
+
+    def clear(self) -> None:
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM cache WHERE namespace = ?", (self.namespace,))
+            conn.execute("DELETE FROM cache_tags WHERE namespace = ?", (self.namespace,))
+
+    def __len__(self) -> int:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT COUNT(*) FROM cache WHERE namespace = ? AND expires_at > ?",
+                (self.namespace, time.time()),
+            ).fetchone()
+        return row[0]
+
+
+_caches: dict[str, MemoryCache | SharedCache] = {}
+
+
+def _stored_namespaces() -> set[str]:
+    """Namespaces present in the shared cache file."""
+    if not CACHE_PATH.exists():
+        return set()
+    conn = sqlite3.connect(CACHE_PATH, timeout=5.0)
+    try:
+        return {row[0] for row in conn.execute("SELECT DISTINCT namespace FROM cache")}
+    except sqlite3.OperationalError:
+        return set()
+    finally:
+        conn.close()
+
+
+def get_cache(namespace: str, max_entries: int = 1024, default_ttl: float = 300.0):
+    """
+    Get (or create) the cache for a namespace using the configured backend.
+
+    Args:
+        namespace: Logical cache name, e.g. 'visa'
+        max_entries: Upper bound on stored entries
+        default_ttl: TTL in seconds for entries stored without an explicit ttl
+
+    Returns:
+        A MemoryCache or SharedCache instance
+    """
+    if namespace not in _caches:
+        if CACHE_BACKEND == "shared":
+            _caches[namespace] = SharedCache(namespace, max_entries, default_ttl)
+        else:
+            if CACHE_BACKEND != "memory":
+                logger.warning(f"Unknown CACHE_BACKEND '{CACHE_BACKEND}', using memory")
+            _caches[namespace] = MemoryCache(namespace, max_entries, default_ttl)
+    return _caches[namespace]
+
+
+def invalidate(
+    namespaces: Optional[Iterable[str]] = None,
+    keys: Iterable[str] = (),
+    prefixes: Iterable[str] = (),
+    tags: Iterable[str] = (),
+) -> dict[str, int]:
+    """
+    Evict entries by key, key prefix or tag across caches.
+
+    Args:
+        namespaces: Caches to evict from (default: all registered caches)
+        keys: Exact keys to remove
+        prefixes: Key prefixes to remove
+        tags: Tags whose entries should be removed
+
+    Returns:
+        Number of evicted entries per namespace
+
+    Raises:
+        ValueError: A namespace is not one of NAMESPACES (or a registered cache)
+    """
+    keys, prefixes, tags = list(keys), list(prefixes), list(tags)
+
+    if namespaces is None:
+        names = set(_caches)
+        # Other workers may have cached namespaces this process never touched
+        if CACHE_BACKEND == "shared":
+            names |= _stored_namespaces()
+    else:
+        names = set(namespaces)
+        unknown = names - NAMESPACES - set(_caches)
+        if unknown:
+            raise ValueError(f"Unknown cache namespaces: {', '.join(sorted(unknown))}")
+
+    evicted = {}
+    for namespace in sorted(names):
+        cache = _caches.get(namespace)
+        if cache is None:
+            if CACHE_BACKEND != "shared":
+                evicted[namespace] = 0  # Never created in this process: nothing cached
+                continue
+            # Evict from the shared file without registering a cache here
+            cache = SharedCache(namespace)
+        count = sum(cache.delete(key) for key in keys)
+        count += sum(cache.delete_prefix(prefix) for prefix in prefixes)
+        count += sum(cache.invalidate_tag(tag) for tag in tags)
+        evicted[namespace] = count
+    return evicted
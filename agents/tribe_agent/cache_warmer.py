@@ -0,0 +1,183 @@
+"""
+Background cache warmer for busy migration corridors
+
+Most traffic concentrates on a few dozen corridors, so the first user on
+each after a deploy or TTL expiry would otherwise pay the Convex round trip.
+The warmer keeps their visa requirements (and processing times) in the
+visa cache:
+
+- corridors come from WARM_CORRIDORS ("NGA:CAN,IND:GBR", names or ISO3)
+  plus the WARM_TOP_LEARNED busiest corridors seen by search_visa_options
+- an entry is refreshed when it is missing (e.g. after an invalidation) or
+  within WARM_REFRESH_AHEAD_SECONDS of its expiry, whoever filled it (a user
+  request, another worker, or this process before a restart)
+- at most WARM_CONCURRENCY refreshes run at once, each after a random
+  jitter, and none starts while a user request is waiting on Convex, so
+  cache fill never competes with user traffic for upstream capacity
+
+With CACHE_BACKEND=shared one worker per host warms the shared cache
+(file lock next to CACHE_PATH); with the memory backend each worker warms
+its own.
+"""
+
+import asyncio
+import fcntl
+import os
+import random
+import time
+from typing import Optional
+
+import httpx
+
+import cache
+import metrics
+import warmup
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+CACHE_WARMER_ENABLED = os.environ.get("CACHE_WARMER_ENABLED", "true").lower() == "true"
+WARM_CORRIDORS = os.environ.get("WARM_CORRIDORS", "")
+WARM_TOP_LEARNED = int(os.environ.get("WARM_TOP_LEARNED", 20))
+WARM_CONCURRENCY = max(int(os.environ.get("WARM_CONCURRENCY", 2)), 1)
+WARM_INTERVAL_SECONDS = float(os.environ.get("WARM_INTERVAL_SECONDS", 60))
+WARM_REFRESH_AHEAD_SECONDS = float(os.environ.get("WARM_REFRESH_AHEAD_SECONDS", 600))
+WARM_JITTER_SECONDS = float(os.environ.get("WARM_JITTER_SECONDS", 5))
+WARM_PROCESSING_TIMES = os.environ.get("WARM_PROCESSING_TIMES", "true").lower() == "true"
+
+WARM_TIMEOUT_SECONDS = 30.0
+MAX_CORRIDORS = 100
+IDLE_POLL_SECONDS = 0.25
+
+_refreshes = metrics.counter(
+    "cache_warmer_refreshes_total", "Corridor refreshes by the cache warmer"
+)
+_state = {"corridors": 0}
+metrics.gauge(
+    "cache_warmer_corridors",
+    "Corridors the warmer keeps fresh",
+    callback=lambda: _state["corridors"],
+)
+
+_lock_file = None
+
+
+def _parse_corridors(spec: str, normalize) -> list[tuple[str, str]]:
+    corridors = []
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        origin, sep, destination = item.partition(":")
+        origin_code, origin_error = normalize(origin)
+        dest_code, dest_error = normalize(destination)
+        if not sep or origin_error or dest_error:
+            logger.warning(f"Ignoring invalid WARM_CORRIDORS entry '{item.strip()}'")
+            continue
+        corridors.append((origin_code, dest_code))
+    return corridors
+
+
+def _is_leader() -> bool:
+    """With the shared cache, only the worker holding the warmer lock refreshes."""
+    global _lock_file
+    if cache.CACHE_BACKEND != "shared":
+        return True
+    if _lock_file is not None:
+        return True
+    handle = open(f"{cache.CACHE_PATH}.warmer.lock", "a")
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return False
+    _lock_file = handle
+    return True
+
+
+def _target_corridors(visa, configured: list[tuple[str, str]]) -> list[tuple[str, str]]:
+    learned = [corridor for corridor, _ in visa.corridor_hits.most_common(WARM_TOP_LEARNED)]
+    return list(dict.fromkeys(configured + learned))[:MAX_CORRIDORS]
+
+
+def _is_due(visa, corridor: tuple[str, str], now: float) -> bool:
+    expires_at = visa.visa_cache.expires_at(visa.requirements_key(*corridor))
+    return expires_at is None or now >= expires_at - WARM_REFRESH_AHEAD_SECONDS
+
+
+async def _wait_for_idle(visa) -> None:
+    """Yield to user traffic: wait until no user request is waiting on Convex."""
+    while visa.user_calls_in_flight() > 0:
+        await asyncio.sleep(IDLE_POLL_SECONDS)
+
+
+async def _refresh(client: httpx.AsyncClient, semaphore, visa, corridor: tuple[str, str]) -> None:
+    async with semaphore:
+        await asyncio.sleep(random.uniform(0, WARM_JITTER_SECONDS))
+        try:
+            await _wait_for_idle(visa)
+            visa_data = await visa.fetch_requirements(client, *corridor, background=True)
+            if visa_data.get("error"):
+                _refreshes.inc(result="error")
+                logger.warning(
+                    "Cache warmer refresh failed",
+                    extra={"corridor": ":".join(corridor), "error": visa_data.get("message")},
+                )
+                return
+
+            visa_type = visa_data.get("visaType")
+            if WARM_PROCESSING_TIMES and visa_type and visa_type != "Unknown":
+                await _wait_for_idle(visa)
+                await visa.fetch_processing_times(client, *corridor, visa_type, background=True)
+        except (httpx.HTTPError, ValueError) as e:
+            _refreshes.inc(result="error")
+            logger.warning(
+                "Cache warmer refresh failed",
+                extra={"corridor": ":".join(corridor), "error": str(e)},
+            )
+            return
+
+        _refreshes.inc(result="ok")
+
+
+async def run() -> None:
+    """Refresh due corridors every WARM_INTERVAL_SECONDS until cancelled."""
+    # Tools import the ADK stack; in lazy mode wait for the warm-up to load it
+    if warmup.LAZY_INIT:
+        await warmup.warm_up()
+    from tools import visa
+
+    configured = _parse_corridors(WARM_CORRIDORS, visa.normalize_country_code)
+    semaphore = asyncio.Semaphore(WARM_CONCURRENCY)
+
+    async with httpx.AsyncClient(timeout=WARM_TIMEOUT_SECONDS) as client:
+        while True:
+            await asyncio.sleep(random.uniform(0, WARM_JITTER_SECONDS))
+            if _is_leader():
+                corridors = _target_corridors(visa, configured)
+                _state["corridors"] = len(corridors)
+                now = time.time()
+                due = [c for c in corridors if _is_due(visa, c, now)]
+                if due:
+                    started = time.perf_counter()
+                    await asyncio.gather(*(_refresh(client, semaphore, visa, c) for c in due))
+                    logger.info(
+                        "Cache warmer cycle complete",
+                        extra={
+                            "corridors": len(corridors),
+                            "refreshed": len(due),
+                            "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+                        },
+                    )
+            await asyncio.sleep(WARM_INTERVAL_SECONDS)
+
+
+def start() -> Optional[asyncio.Task]:
+    """Start the warmer on the running loop, if enabled and Convex is configured."""
+    if not CACHE_WARMER_ENABLED or not os.environ.get("CONVEX_SITE_URL"):
+        return None
+    return asyncio.create_task(run(), name="cache-warmer")
+
+
+def stop(task: Optional[asyncio.Task]) -> None:
+    if task is not None:
+        task.cancel()
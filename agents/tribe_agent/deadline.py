@@ -0,0 +1,171 @@
+"""
+Per-turn deadlines
+
+Each /agui request (one user turn) gets a time budget, TURN_DEADLINE_SECONDS,
+stored in a contextvar by DeadlineMiddleware. Tasks spawned while serving the
+turn (ADK runner, tool calls, threads via asyncio.to_thread) inherit it.
+
+- Tools size their httpx timeouts with `timeout(cap)`, the smaller of their
+  own cap and the remaining budget, and skip upstream calls once it is spent.
+- Model calls get the remaining budget as the request timeout; when nothing
+  is left, or the call fails after the deadline, the turn ends with a short
+  degraded answer instead of an error.
+
+Every cut is counted in deadline_exceeded_total{stage, name}.
+
+The server imports this module for the middleware before the ADK stack is
+loaded (LAZY_INIT), so ADK types are only imported inside the callbacks.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Optional
+
+import metrics
+from logging_config import get_logger
+
+if TYPE_CHECKING:
+    from google.adk.agents.callback_context import CallbackContext
+    from google.adk.models import LlmRequest, LlmResponse
+
+logger = get_logger(__name__)
+
+TURN_DEADLINE_SECONDS = float(os.environ.get("TURN_DEADLINE_SECONDS", 45))
+DEADLINE_PATHS = ("/agui",)
+
+# Don't start an upstream call with less than this left; it would only time out
+MIN_CALL_SECONDS = 1.0
+
+DEGRADED_ANSWER = (
+    "I ran out of time gathering everything for this answer. "
+    "Please ask again, or narrow the question (for example one country or one topic)."
+)
+
+_deadline: ContextVar[Optional[float]] = ContextVar("turn_deadline", default=None)
+
+_exceeded = metrics.counter(
+    "deadline_exceeded_total", "Calls cut short or skipped because the turn deadline was spent"
+)
+
+
+def start(seconds: float = TURN_DEADLINE_SECONDS):
+    """Start a deadline for the current context. Returns a token for `reset`."""
+    return _deadline.set(time.monotonic() + seconds)
+
+
+def reset(token) -> None:
+    _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the turn, or None outside a turn."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def expired(min_seconds: float = 0.0) -> bool:
+    """True if the turn has less than min_seconds left."""
+    left = remaining()
+    return left is not None and left <= min_seconds
+
+
+def timeout(cap: float) -> float:
+    """Timeout for an outbound call: the tool's cap, clipped to the remaining budget."""
+    left = remaining()
+    if left is None:
+        return cap
+    return max(min(cap, left), 0.001)
+
+
+def record_exceeded(stage: str, name: str) -> None:
+    """Count a call that was skipped or cut short by the deadline."""
+    _exceeded.inc(stage=stage, name=name)
+    logger.warning(
+        "Turn deadline exceeded",
+        extra={"stage": stage, "target": name, "deadline_seconds": TURN_DEADLINE_SECONDS},
+    )
+
+
+def degraded_tool_result(name: str) -> dict:
+    """Error result for a tool call skipped because the turn budget is spent."""
+    record_exceeded("tool", name)
+    return {
+        "error": True,
+        "degraded": True,
+        "message": "Skipped: this turn's time budget is spent. Answer with what you already know.",
+    }
+
+
+def _degraded_response() -> LlmResponse:
+    from google.adk.models import LlmResponse
+    from google.genai import types
+
+    # error_code marks it as a failure for after_model_callbacks (e.g. the answer
+    # cache must not store it); ADK still runs them on this response
+    return LlmResponse(
+        content=types.Content(role="model", parts=[types.Part(text=DEGRADED_ANSWER)]),
+        turn_complete=True,
+        error_code="DEADLINE_EXCEEDED",
+        error_message="Turn deadline exceeded",
+    )
+
+
+def before_model_callback(
+    callback_context: CallbackContext, llm_request: LlmRequest
+) -> Optional[LlmResponse]:
+    """Give the model call the remaining budget, or end the turn if none is left."""
+    left = remaining()
+    if left is None:
+        return None
+    if left <= MIN_CALL_SECONDS:
+        record_exceeded("model", llm_request.model or "-")
+        return _degraded_response()
+
+    from google.genai import types
+
+    config = llm_request.config or types.GenerateContentConfig()
+    http_options = config.http_options or types.HttpOptions()
+    http_options.timeout = int(left * 1000)
+    config.http_options = http_options
+    llm_request.config = config
+    return None
+
+
+def on_model_error_callback(
+    callback_context: CallbackContext, llm_request: LlmRequest, error: Exception
+) -> Optional[LlmResponse]:
+    """Turn a model failure caused by the deadline into the degraded answer."""
+    if not expired(MIN_CALL_SECONDS):
+        return None
+    record_exceeded("model", llm_request.model or "-")
+    return _degraded_response()
+
+
+class DeadlineMiddleware:
+    """ASGI middleware starting a turn deadline for AG-UI requests."""
+
+    def __init__(
+        self,
+        app,
+        paths: tuple[str, ...] = DEADLINE_PATHS,
+        seconds: float = TURN_DEADLINE_SECONDS,
+    ):
+        self.app = app
+        self.paths = paths
+        self.seconds = seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        token = start(self.seconds)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            reset(token)
@@ -0,0 +1,285 @@
+"""
+Conversation History Compaction
+
+ADK resends the whole session history, tool results included, on every model
+call, so prompt size grows through a long planning conversation. This
+before_model_callback keeps the last HISTORY_KEEP_TURNS turns verbatim and
+folds older turns into a rolling summary appended to the system instruction:
+
+- key facts (corridor, stage, visa type, housing searched, task progress)
+  that stay pinned however long the conversation gets
+- one or two lines per older turn (question, tools used, answer opening)
+
+Bulky tool results in kept turns other than the current one are replaced by
+a one-line digest. If the request is still over HISTORY_TOKEN_BUDGET, more
+turns are folded until it fits or only the current turn is left.
+
+Summaries are stored per session in the 'history' cache and extended
+incrementally, so each turn only summarizes the turns that just aged out.
+"""
+
+import hashlib
+import os
+from typing import Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.genai import types
+
+import metrics
+from cache import get_cache
+from logging_config import get_logger
+from tools.payloads import estimate_tokens, truncate
+from turn_context import corridor_label, get_context_value
+
+logger = get_logger(__name__)
+
+HISTORY_COMPACTION_ENABLED = (
+    os.environ.get("HISTORY_COMPACTION_ENABLED", "true").lower() == "true"
+)
+HISTORY_KEEP_TURNS = int(os.environ.get("HISTORY_KEEP_TURNS", 6))
+HISTORY_TOKEN_BUDGET = int(os.environ.get("HISTORY_TOKEN_BUDGET", 12000))
+
+TOOL_RESULT_MAX_TOKENS = 400
+SUMMARY_MAX_LINES = 40
+QUESTION_MAX_CHARS = 160
+ANSWER_MAX_CHARS = 240
+
+# Matches the AG-UI session timeout
+summary_cache = get_cache("history", max_entries=4096, default_ttl=3600)
+
+_tokens_saved = metrics.counter(
+    "history_tokens_saved_total", "Estimated prompt tokens removed by history compaction"
+)
+_compactions = metrics.counter("history_compactions_total", "Model calls with compacted history")
+
+
+def _is_user_message(content: types.Content) -> bool:
+    """A message typed by the user, as opposed to tool results sent back as 'user'."""
+    parts = content.parts or []
+    return (
+        content.role == "user"
+        and any(p.text for p in parts)
+        and not any(p.function_response for p in parts)
+    )
+
+
+def split_turns(contents: list[types.Content]) -> list[list[types.Content]]:
+    """Group contents into turns, each starting at a user message."""
+    turns: list[list[types.Content]] = []
+    for content in contents:
+        if _is_user_message(content) or not turns:
+            turns.append([content])
+        else:
+            turns[-1].append(content)
+    return turns
+
+
+def _tokens(contents: list[types.Content]) -> int:
+    return sum(estimate_tokens(c.model_dump(exclude_none=True, mode="json")) for c in contents)
+
+
+def _text(content: types.Content) -> str:
+    return " ".join(p.text for p in content.parts or [] if p.text and not p.thought).strip()
+
+
+def _turn_fingerprint(turn: list[types.Content]) -> str:
+    return hashlib.sha256(_text(turn[0]).encode("utf-8")).hexdigest()[:12]
+
+
+def digest_tool_result(name: str, response: dict) -> str:
+    """One-line digest of a tool result, keeping the facts later turns rely on."""
+    if not isinstance(response, dict):
+        return f"{name}: {truncate(str(response), 120)}"
+    if response.get("error"):
+        return f"{name}: error ({truncate(str(response.get('message', '')), 80)})"
+
+    if name == "search_visa_options":
+        parts = [f"{response.get('origin')}→{response.get('destination')}"]
+        if response.get("visaType"):
+            parts.append(str(response["visaType"]))
+        if response.get("visaRequired") is not None:
+            parts.append("visa required" if response["visaRequired"] else "no visa required")
+        processing = response.get("processingTime") or {}
+        if processing.get("averageDays"):
+            parts.append(f"~{processing['averageDays']} days processing")
+        return f"{name}: " + ", ".join(parts)
+
+    if name == "search_housing_resources":
+        results = response.get("results") or []
+        organizations = [r.get("organization") for r in results if r.get("organization")]
+        countries = list(dict.fromkeys(r.get("country") for r in results if r.get("country")))
+        scope = ", ".join(countries[:2]) or response.get("continent") or ""
+        shown = ", ".join(organizations[:3]) + ("…" if len(organizations) > 3 else "")
+        found = response.get("total_found", len(results))
+        return (
+            f"{name}: {found} resources" + (f" in {scope}" if scope else "")
+            + (f" ({shown})" if shown else "")
+        )
+
+    if name == "get_housing_overview":
+        resource_types = ", ".join(list(response.get("resource_types") or {})[:3])
+        return (
+            f"{name}: {response.get('total_resources', 0)} resources in "
+            f"{response.get('total_countries', 0)} countries ({response.get('scope')})"
+            + (f", mostly {resource_types}" if resource_types else "")
+        )
+
+    if name == "get_user_context":
+        progress = response.get("progress") or {}
+        return (
+            f"{name}: {response.get('todosTotal', len(response.get('todos') or []))} active tasks, "
+            f"{progress.get('completed', 0)}/{progress.get('total', 0)} protocols completed"
+        )
+
+    return f"{name}: " + truncate(", ".join(f"{k}={v}" for k, v in response.items()), 120)
+
+
+def _update_facts(facts: dict, turn: list[types.Content]) -> None:
+    """Record the latest facts established by a turn's tool results."""
+    for content in turn:
+        for part in content.parts or []:
+            response = part.function_response
+            if not response or not isinstance(response.response, dict):
+                continue
+            if response.response.get("error"):
+                continue
+            if response.name == "search_visa_options":
+                facts["visa"] = digest_tool_result(response.name, response.response)
+            elif response.name == "search_housing_resources":
+                facts["housing"] = digest_tool_result(response.name, response.response)
+            elif response.name == "get_user_context":
+                facts["progress"] = digest_tool_result(response.name, response.response)
+
+
+def _summarize_turn(turn: list[types.Content]) -> list[str]:
+    question = truncate(_text(turn[0]), QUESTION_MAX_CHARS)
+    tools = [
+        part.function_call.name
+        for content in turn
+        for part in content.parts or []
+        if part.function_call
+    ]
+    answers = [_text(c) for c in turn[1:] if c.role == "model" and _text(c)]
+
+    used = f" (used {', '.join(dict.fromkeys(tools))})" if tools else ""
+    lines = [f"- User: {question}{used}"]
+    if answers:
+        lines.append(f"  Assistant: {truncate(answers[-1], ANSWER_MAX_CHARS)}")
+    return lines
+
+
+def _rolling_summary(session_id: str, older: list[list[types.Content]]) -> dict:
+    """Extend the stored summary with turns that aged out since the last call."""
+    stored = summary_cache.get(session_id)
+    start = 0
+    if (
+        stored
+        and stored["turns"] <= len(older)
+        and stored["turns"] > 0
+        and stored["fingerprint"] == _turn_fingerprint(older[stored["turns"] - 1])
+    ):
+        start = stored["turns"]
+        summary = {"facts": dict(stored["facts"]), "lines": list(stored["lines"])}
+    else:
+        summary = {"facts": {}, "lines": []}
+
+    for turn in older[start:]:
+        _update_facts(summary["facts"], turn)
+        summary["lines"].extend(_summarize_turn(turn))
+    summary["lines"] = summary["lines"][-SUMMARY_MAX_LINES:]
+
+    if older and start < len(older):
+        summary_cache.set(session_id, {
+            "turns": len(older),
+            "fingerprint": _turn_fingerprint(older[-1]),
+            **summary,
+        })
+    return summary
+
+
+def render_summary(summary: dict, context=None) -> str:
+    """System instruction text for the folded part of the conversation."""
+    facts = []
+    corridor = corridor_label(context) if context is not None else None
+    if corridor:
+        facts.append(f"- Corridor: {corridor}")
+    stage = get_context_value(context, "stage") if context is not None else None
+    if stage:
+        facts.append(f"- Stage: {stage}")
+    labels = {"visa": "Visa", "housing": "Housing", "progress": "Progress"}
+    facts.extend(f"- {labels[k]}: {v}" for k, v in summary["facts"].items() if k in labels)
+
+    sections = ["## EARLIER IN THIS CONVERSATION (summarized)"]
+    if facts:
+        sections.append("Key facts:\n" + "\n".join(facts))
+    if summary["lines"]:
+        sections.append("Earlier turns:\n" + "\n".join(summary["lines"]))
+    return "\n".join(sections)
+
+
+def _compact_tool_results(turn: list[types.Content]) -> list[types.Content]:
+    """Replace bulky tool results with digests, keeping call/response pairing intact."""
+    compacted = []
+    for content in turn:
+        parts = content.parts or []
+        if not any(p.function_response for p in parts):
+            compacted.append(content)
+            continue
+        new_parts = []
+        for part in parts:
+            response = part.function_response
+            if response and estimate_tokens(response.response) > TOOL_RESULT_MAX_TOKENS:
+                part = types.Part(function_response=types.FunctionResponse(
+                    id=response.id,
+                    name=response.name,
+                    response={"digest": digest_tool_result(response.name, response.response)},
+                ))
+            new_parts.append(part)
+        compacted.append(types.Content(role=content.role, parts=new_parts))
+    return compacted
+
+
+def before_model_callback(
+    callback_context: CallbackContext, llm_request: LlmRequest
+) -> Optional[LlmResponse]:
+    """Fold old turns into a rolling summary and cap the prompt size."""
+    if not HISTORY_COMPACTION_ENABLED or not llm_request.contents:
+        return None
+
+    turns = split_turns(llm_request.contents)
+    tokens_before = _tokens(llm_request.contents)
+    if len(turns) <= HISTORY_KEEP_TURNS and tokens_before <= HISTORY_TOKEN_BUDGET:
+        return None
+
+    keep = min(HISTORY_KEEP_TURNS, len(turns))
+    # The current turn stays untouched; earlier kept turns lose bulky tool results
+    kept = [_compact_tool_results(turn) for turn in turns[-keep:-1]] + [turns[-1]]
+    kept_tokens = [_tokens(turn) for turn in kept]
+    while len(kept) > 1 and sum(kept_tokens) > HISTORY_TOKEN_BUDGET:
+        kept.pop(0)
+        kept_tokens.pop(0)
+    older = turns[: len(turns) - len(kept)]
+
+    session_id = getattr(callback_context.session, "id", None) or callback_context.invocation_id
+    contents = [content for turn in kept for content in turn]
+    llm_request.contents = contents
+    tokens_after = _tokens(contents)
+    if older:
+        summary_text = render_summary(_rolling_summary(session_id, older), callback_context)
+        llm_request.append_instructions([summary_text])
+        tokens_after += estimate_tokens(summary_text)
+
+    _compactions.inc()
+    _tokens_saved.inc(max(tokens_before - tokens_after, 0))
+    logger.info(
+        "History compacted",
+        extra={
+            "session_id": session_id,
+            "turns_total": len(turns),
+            "turns_summarized": len(older),
+            "tokens_before": tokens_before,
+            "tokens_after": tokens_after,
+        },
+    )
+    return None
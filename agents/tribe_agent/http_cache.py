@@ -0,0 +1,112 @@
+"""
+HTTP caching for the direct REST lookups (/api/housing, /api/visa)
+
+`cached_json_response` serializes a payload once and makes it cacheable by
+browsers and CDNs:
+
+- strong ETag: sha256 of the exact JSON bytes, with a "-gzip" suffix for
+  the compressed representation (a strong validator is per representation)
+- Cache-Control: public, max-age and stale-while-revalidate per endpoint
+- 304 Not Modified when If-None-Match matches either representation
+- gzip when the client accepts it and the body is worth compressing;
+  compressed bodies are kept in a small LRU keyed by ETag so hot lookups
+  are compressed once
+
+Compression is done here rather than with GZipMiddleware so the /agui SSE
+stream is never buffered by a compressor.
+
+Error payloads use `error_response`, which is never cached.
+"""
+
+import collections
+import gzip
+import hashlib
+import threading
+from typing import Any
+
+from fastapi import Request
+from fastapi.responses import Response
+
+import serialization
+
+GZIP_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+GZIP_CACHE_ENTRIES = 256
+
+_gzip_cache: collections.OrderedDict = collections.OrderedDict()
+_gzip_lock = threading.Lock()
+
+
+def _encode(payload: Any) -> bytes:
+    return serialization.dumps(payload, sort_keys=True)
+
+
+def _compressed(etag: str, body: bytes) -> bytes:
+    with _gzip_lock:
+        if etag in _gzip_cache:
+            _gzip_cache.move_to_end(etag)
+            return _gzip_cache[etag]
+    # mtime=0 keeps the bytes (and so the ETag) stable across workers
+    data = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    with _gzip_lock:
+        _gzip_cache[etag] = data
+        if len(_gzip_cache) > GZIP_CACHE_ENTRIES:
+            _gzip_cache.popitem(last=False)
+    return data
+
+
+def _accepts_gzip(request: Request) -> bool:
+    for coding in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = coding.strip().partition(";")
+        if name.strip().lower() in ("gzip", "*"):
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+def _not_modified(request: Request, tags: tuple[str, ...]) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so W/ prefixes added by proxies still match
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return any(tag in candidates for tag in tags)
+
+
+def cached_json_response(
+    request: Request,
+    payload: Any,
+    max_age: int,
+    stale_while_revalidate: int = 0,
+) -> Response:
+    """JSON response with ETag, Cache-Control, conditional GET and optional gzip."""
+    body = _encode(payload)
+    digest = hashlib.sha256(body).hexdigest()[:32]
+    etag = f'"{digest}"'
+    gzip_etag = f'"{digest}-gzip"'
+
+    use_gzip = len(body) >= GZIP_MIN_BYTES and _accepts_gzip(request)
+    cache_control = f"public, max-age={max_age}"
+    if stale_while_revalidate:
+        cache_control += f", stale-while-revalidate={stale_while_revalidate}"
+    headers = {
+        "ETag": gzip_etag if use_gzip else etag,
+        "Cache-Control": cache_control,
+        "Vary": "Accept-Encoding",
+    }
+
+    if _not_modified(request, (etag, gzip_etag)):
+        return Response(status_code=304, headers=headers)
+
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        body = _compressed(gzip_etag, body)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def error_response(status_code: int, payload: dict) -> serialization.FastJSONResponse:
+    """Error JSON that caches must not store."""
+    return serialization.FastJSONResponse(
+        payload, status_code=status_code, headers={"Cache-Control": "no-store"}
+    )
@@ -0,0 +1,400 @@
+"""
+Idempotency-Key support for retried POSTs (pure ASGI)
+
+Mobile clients retry POSTs on flaky networks. Without this, every retried
+/api/live-search spends Perplexity quota again and every retried /agui turn
+reruns the Gemini + tools loop. For POSTs to IDEMPOTENCY_PATHS carrying an
+`Idempotency-Key` header:
+
+- the first request runs normally; its response (status, headers, body or
+  the whole SSE stream) is recorded as it is sent
+- a duplicate arriving while it is still running attaches to it and
+  receives the same events live, from the beginning
+- a duplicate arriving after it completed gets the stored response replayed
+  (`Idempotent-Replayed: true`) for IDEMPOTENCY_TTL_SECONDS
+- reusing a key with a different body is rejected with 422
+
+When the original client disconnects (typically to retry), the run is kept
+going for up to IDEMPOTENCY_ATTACH_GRACE_SECONDS waiting for a duplicate to
+attach, and to the end once one has; the app only sees the disconnect when
+nobody is listening.
+
+Responses with 5xx status, or cut short, are not stored so the client can
+retry for real; duplicates attached to such a request end with a 503 (or an
+SSE RUN_ERROR event if streaming had started) instead of a silently
+truncated response. A request whose body upload is interrupted is dropped
+before it runs, so its partial body never claims the key. Responses beyond
+IDEMPOTENCY_MAX_RESPONSE_BYTES stop being buffered: duplicates already
+attached keep receiving them live, later ones get a 409.
+
+Stores are pluggable (IdempotencyStore); the default keeps at most
+IDEMPOTENCY_MAX_BYTES of responses in memory, and with CACHE_BACKEND=shared
+completed responses are stored in the shared cache so a retry landing on
+another worker is replayed too. Attaching to an in-flight request only works
+within one worker.
+"""
+
+import abc
+import asyncio
+import base64
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import cache
+import metrics
+import serialization
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+IDEMPOTENCY_PATHS = ("/agui", "/api/live-search")
+IDEMPOTENCY_TTL_SECONDS = float(os.environ.get("IDEMPOTENCY_TTL_SECONDS", 600))
+IDEMPOTENCY_MAX_BYTES = int(os.environ.get("IDEMPOTENCY_MAX_BYTES", 64 * 1024 * 1024))
+IDEMPOTENCY_MAX_RESPONSE_BYTES = int(
+    os.environ.get("IDEMPOTENCY_MAX_RESPONSE_BYTES", 2 * 1024 * 1024)
+)
+IDEMPOTENCY_ATTACH_GRACE_SECONDS = float(os.environ.get("IDEMPOTENCY_ATTACH_GRACE_SECONDS", 10))
+
+IDEMPOTENCY_HEADER = b"idempotency-key"
+REPLAYED_HEADER = (b"idempotent-replayed", b"true")
+_KEY_PATTERN = re.compile(rb"^[A-Za-z0-9._:-]{1,128}$")
+
+_requests = metrics.counter(
+    "idempotency_requests_total", "Requests carrying an Idempotency-Key by outcome"
+)
+
+
+class IdempotencyStore(abc.ABC):
+    """Storage for completed responses. Records are JSON-serializable dicts."""
+
+    @abc.abstractmethod
+    def get(self, key: str) -> Optional[dict]:
+        """The record stored under key, or None if missing or expired."""
+
+    @abc.abstractmethod
+    def put(self, key: str, record: dict) -> None:
+        """Store record under key for the store's TTL."""
+
+
+class MemoryIdempotencyStore(IdempotencyStore):
+    """Per-process store with TTL, evicting the oldest records beyond max_bytes."""
+
+    def __init__(
+        self, max_bytes: int = IDEMPOTENCY_MAX_BYTES, ttl: float = IDEMPOTENCY_TTL_SECONDS
+    ):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._records: OrderedDict[str, tuple[float, int, dict]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._records.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                self._bytes -= self._records.pop(key)[1]
+                return None
+            return entry[2]
+
+    def put(self, key: str, record: dict) -> None:
+        size = len(record["body"]) + 256
+        with self._lock:
+            if key in self._records:
+                self._bytes -= self._records.pop(key)[1]
+            self._records[key] = (time.monotonic() + self.ttl, size, record)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._records:
+                self._bytes -= self._records.popitem(last=False)[1][1]
+
+
+class CacheIdempotencyStore(IdempotencyStore):
+    """Adapter storing records in a cache.py namespace (shared across workers when configured)."""
+
+    def __init__(self, namespace: str = "idempotency", ttl: float = IDEMPOTENCY_TTL_SECONDS):
+        self._cache = cache.get_cache(namespace, max_entries=4096, default_ttl=ttl)
+
+    def get(self, key: str) -> Optional[dict]:
+        return self._cache.get(key)
+
+    def put(self, key: str, record: dict) -> None:
+        self._cache.set(key, record)
+
+
+def default_store() -> IdempotencyStore:
+    if cache.CACHE_BACKEND == "shared":
+        return CacheIdempotencyStore()
+    return MemoryIdempotencyStore()
+
+
+class _Flight:
+    """
+    A request in progress, fanning its response messages out to attached duplicates.
+
+    Messages are buffered for duplicates that attach later (and for the store)
+    until the body passes IDEMPOTENCY_MAX_RESPONSE_BYTES; past that, only
+    duplicates already attached receive the rest.
+    """
+
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.start: Optional[dict] = None
+        self.messages: list[dict] = []
+        self.buffered = True
+        self.complete = False  # Start and final body message were sent
+        self.done = False
+        self._size = 0
+        self._followers: list[asyncio.Queue] = []
+        self._attached = asyncio.Event()
+        self._finished = asyncio.Event()
+
+    def add(self, message: dict) -> None:
+        if message["type"] == "http.response.start":
+            self.start = message
+        elif message["type"] == "http.response.body":
+            self._size += len(message.get("body", b""))
+            self.complete = self.start is not None and not message.get("more_body", False)
+        if self.buffered and self._size > IDEMPOTENCY_MAX_RESPONSE_BYTES:
+            self.buffered = False
+            self.messages = []
+        elif self.buffered:
+            self.messages.append(message)
+        for queue in self._followers:
+            queue.put_nowait(message)
+
+    def finish(self) -> None:
+        self.done = True
+        self._finished.set()
+        for queue in self._followers:
+            queue.put_nowait(None)
+
+    async def wait_for_follower(self, timeout: float) -> bool:
+        """True once a duplicate has attached, waiting up to timeout for one."""
+        try:
+            await asyncio.wait_for(self._attached.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def wait_finished(self) -> None:
+        await self._finished.wait()
+
+    async def follow(self, send) -> bool:
+        """
+        Send every message of the flight, then new ones live until it finishes.
+
+        Only valid while the flight is buffered. Returns False if the flight
+        finished without a complete response.
+        """
+        backlog = list(self.messages)
+        queue: asyncio.Queue = asyncio.Queue()
+        if not self.done:
+            self._followers.append(queue)
+            self._attached.set()
+        try:
+            for message in backlog:
+                await send(_replayed(message))
+            while not self.done or not queue.empty():
+                message = await queue.get()
+                if message is None:
+                    break
+                await send(_replayed(message))
+            return self.complete
+        finally:
+            if queue in self._followers:
+                self._followers.remove(queue)
+
+
+def _replayed(message: dict) -> dict:
+    if message["type"] == "http.response.start":
+        return {**message, "headers": [*message["headers"], REPLAYED_HEADER]}
+    return message
+
+
+def _fingerprint(scope, body: bytes) -> str:
+    digest = hashlib.sha256(f"{scope['method']} {scope['path']}\n".encode())
+    digest.update(body)
+    return digest.hexdigest()
+
+
+async def _read_body(receive) -> Optional[bytes]:
+    """The full request body, or None if the client disconnected mid-upload."""
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            return None
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            return b"".join(chunks)
+
+
+async def _send_json(send, status: int, payload: dict, extra_headers=()) -> None:
+    body = serialization.dumps(payload)
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            *extra_headers,
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _fail_follower(send, flight: _Flight) -> None:
+    """End an attached duplicate whose original request did not complete."""
+    start = flight.start
+    if start is None:
+        await _send_json(
+            send,
+            503,
+            {"detail": "The original request did not complete; retry"},
+            [REPLAYED_HEADER, (b"retry-after", b"1")],
+        )
+        return
+    content_type = dict(start.get("headers", ())).get(b"content-type", b"")
+    if not content_type.startswith(b"text/event-stream"):
+        # Status and part of the body are already out; abort the connection
+        raise RuntimeError("Original request for this Idempotency-Key did not complete")
+    event = {"type": "RUN_ERROR", "message": "The original request did not complete; retry"}
+    await send({
+        "type": "http.response.body",
+        "body": b"data: " + serialization.dumps(event) + b"\n\n",
+        "more_body": False,
+    })
+
+
+async def _replay(send, record: dict) -> None:
+    headers = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in record["headers"]]
+    await send({
+        "type": "http.response.start",
+        "status": record["status"],
+        "headers": [*headers, REPLAYED_HEADER],
+    })
+    await send({"type": "http.response.body", "body": base64.b64decode(record["body"])})
+
+
+class IdempotencyMiddleware:
+    """ASGI middleware deduplicating POSTs that carry an Idempotency-Key."""
+
+    def __init__(
+        self,
+        app,
+        paths: tuple[str, ...] = IDEMPOTENCY_PATHS,
+        store: Optional[IdempotencyStore] = None,
+    ):
+        self.app = app
+        self.paths = paths
+        self.store = store or default_store()
+        self._inflight: dict[str, _Flight] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        key = next((v for k, v in scope["headers"] if k == IDEMPOTENCY_HEADER), None)
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+        if not _KEY_PATTERN.match(key):
+            _requests.inc(result="invalid")
+            await _send_json(send, 400, {"detail": "Invalid Idempotency-Key"})
+            return
+
+        body = await _read_body(receive)
+        if body is None:
+            _requests.inc(result="disconnected")
+            return
+        fingerprint = _fingerprint(scope, body)
+        store_key = f"{scope['path']}:{key.decode('latin-1')}"
+
+        record = self.store.get(store_key)
+        flight = self._inflight.get(store_key)
+        previous = record["fingerprint"] if record else flight.fingerprint if flight else None
+        if previous is not None and previous != fingerprint:
+            _requests.inc(result="conflict")
+            await _send_json(
+                send, 422, {"detail": "Idempotency-Key was already used with a different request"}
+            )
+            return
+        if record is not None:
+            _requests.inc(result="replayed")
+            await _replay(send, record)
+            return
+        if flight is not None and not flight.buffered:
+            # Too large to replay from the start; it won't be stored either
+            _requests.inc(result="busy")
+            await _send_json(
+                send,
+                409,
+                {"detail": "A request with this Idempotency-Key is still in progress"},
+                [(b"retry-after", b"1")],
+            )
+            return
+        if flight is not None:
+            _requests.inc(result="attached")
+            if not await flight.follow(send):
+                await _fail_follower(send, flight)
+            return
+
+        _requests.inc(result="new")
+        await self._run(scope, receive, send, store_key, fingerprint, body)
+
+    async def _run(self, scope, receive, send, store_key: str, fingerprint: str, body: bytes):
+        flight = _Flight(fingerprint)
+        self._inflight[store_key] = flight
+        body_sent = False
+        client_gone = False
+
+        async def replay_receive():
+            nonlocal body_sent, client_gone
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                client_gone = True
+                # A retry usually follows the disconnect; keep the run going for it
+                if await flight.wait_for_follower(IDEMPOTENCY_ATTACH_GRACE_SECONDS):
+                    await flight.wait_finished()
+            return message
+
+        async def send_wrapper(message):
+            flight.add(message)
+            if not client_gone:
+                await send(message)
+
+        try:
+            await self.app(scope, replay_receive, send_wrapper)
+        finally:
+            flight.finish()
+            del self._inflight[store_key]
+            self._save(store_key, flight)
+
+    def _save(self, store_key: str, flight: _Flight) -> None:
+        if not flight.complete or not flight.buffered:
+            return  # Cut short or too large
+        status = flight.start["status"]
+        if status >= 500:
+            return  # Failed; let the client retry for real
+        body = b"".join(m.get("body", b"") for m in flight.messages[1:])
+        headers = [
+            (k.decode("latin-1"), v.decode("latin-1"))
+            for k, v in flight.start.get("headers", ())
+            if k.lower() != b"content-length"
+        ]
+        self.store.put(store_key, {
+            "fingerprint": flight.fingerprint,
+            "status": status,
+            "headers": headers + [("content-length", str(len(body)))],
+            "body": base64.b64encode(body).decode("ascii"),
+        })
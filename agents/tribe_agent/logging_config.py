@@ -5,11 +5,18 @@ Provides consistent log formatting for Cloud Logging integration.
 """
 
 import logging
-import json
 import sys
 from datetime import datetime
 from typing import Any
 
+import serialization
+
+
+# Attributes every LogRecord has; everything else on a record came from extra={...}
+_RESERVED_ATTRS = (
+    set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+)
+
 
 class JSONFormatter(logging.Formatter):
     """JSON formatter for structured logging compatible with Cloud Logging."""
@@ -25,25 +32,16 @@ class JSONFormatter(logging.Formatter):
             "line": record.lineno,
         }
 
-        # Add extra fields if present
-        if hasattr(record, "request_id"):
-            log_record["request_id"] = record.request_id
-        if hasattr(record, "user_id"):
-            log_record["user_id"] = record.user_id
-        if hasattr(record, "duration_ms"):
-            log_record["duration_ms"] = record.duration_ms
-        if hasattr(record, "path"):
-            log_record["path"] = record.path
-        if hasattr(record, "method"):
-            log_record["method"] = record.method
-        if hasattr(record, "status"):
-            log_record["status"] = record.status
+        # Add extra fields if present (anything passed via extra={...})
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                log_record[key] = value
 
         # Add exception info if present
         if record.exc_info:
             log_record["exception"] = self.formatException(record.exc_info)
 
-        return json.dumps(log_record)
+        return serialization.dumps_str(log_record)
 
 
 def setup_logging(level: str = "INFO") -> logging.Logger:
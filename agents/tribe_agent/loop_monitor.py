@@ -0,0 +1,132 @@
+"""
+Event loop health monitor
+
+Every request in a worker shares one asyncio loop, so any synchronous step
+that runs long (a big json.dumps, a heavy comprehension, an accidental
+blocking call) stalls every concurrent user. The monitor has two parts:
+
+- a heartbeat task that sleeps LOOP_MONITOR_INTERVAL and measures how late
+  it wakes up (loop lag), and counts live tasks
+- a watchdog thread that notices when the heartbeat is overdue by more than
+  SLOW_CALLBACK_SECONDS and logs the loop thread's current stack, i.e. the
+  callback that is blocking it, while it is still running
+
+Results are exposed in /health (event_loop) and as metrics.
+"""
+
+import asyncio
+import collections
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+import metrics
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+LOOP_MONITOR_ENABLED = os.environ.get("LOOP_MONITOR_ENABLED", "true").lower() == "true"
+LOOP_MONITOR_INTERVAL = float(os.environ.get("LOOP_MONITOR_INTERVAL", 0.25))
+SLOW_CALLBACK_SECONDS = float(os.environ.get("SLOW_CALLBACK_SECONDS", 0.1))
+
+# Lag samples kept for the max reported in /health (~1 minute at the default interval)
+_RECENT_SAMPLES = 240
+STACK_LIMIT = 30
+
+_lag = metrics.histogram(
+    "event_loop_lag_seconds",
+    "How late the loop monitor heartbeat woke up",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+_slow_callbacks = metrics.counter(
+    "event_loop_slow_callbacks_total", "Loop stalls longer than SLOW_CALLBACK_SECONDS"
+)
+
+_state = {
+    "loop_thread": None,
+    "heartbeat": None,
+    "lag": 0.0,
+    "tasks": 0,
+}
+_recent: collections.deque = collections.deque(maxlen=_RECENT_SAMPLES)
+_stop = threading.Event()
+
+
+metrics.gauge(
+    "event_loop_lag_last_seconds", "Most recent loop lag sample", callback=lambda: _state["lag"]
+)
+metrics.gauge(
+    "event_loop_tasks", "Live asyncio tasks in this worker", callback=lambda: _state["tasks"]
+)
+
+
+async def _heartbeat() -> None:
+    _state["loop_thread"] = threading.get_ident()
+    while True:
+        _state["heartbeat"] = time.monotonic()
+        await asyncio.sleep(LOOP_MONITOR_INTERVAL)
+        lag = max(time.monotonic() - _state["heartbeat"] - LOOP_MONITOR_INTERVAL, 0.0)
+        _state["lag"] = lag
+        _state["tasks"] = len(asyncio.all_tasks())
+        _recent.append(lag)
+        _lag.observe(lag)
+        if lag > SLOW_CALLBACK_SECONDS:
+            _slow_callbacks.inc()
+            logger.warning(
+                "Event loop stall",
+                extra={"lag_ms": round(lag * 1000, 1), "tasks": _state["tasks"]},
+            )
+
+
+def _watchdog() -> None:
+    """Log the loop thread's stack while a callback overruns the threshold."""
+    reported = None
+    poll = max(SLOW_CALLBACK_SECONDS / 2, 0.01)
+    while not _stop.wait(poll):
+        beat = _state["heartbeat"]
+        thread_id = _state["loop_thread"]
+        if beat is None or thread_id is None or beat == reported:
+            continue
+        overdue = time.monotonic() - beat - LOOP_MONITOR_INTERVAL
+        if overdue <= SLOW_CALLBACK_SECONDS:
+            continue
+
+        frame = sys._current_frames().get(thread_id)
+        if frame is None:
+            continue
+        reported = beat
+        stack = "".join(traceback.format_stack(frame, limit=STACK_LIMIT))
+        logger.warning(
+            "Slow callback blocking the event loop",
+            extra={"blocked_ms": round(overdue * 1000, 1), "stack": stack},
+        )
+
+
+def status() -> dict:
+    """Loop health for /health."""
+    return {
+        "monitored": _state["heartbeat"] is not None,
+        "lag_ms": round(_state["lag"] * 1000, 2),
+        "lag_max_ms": round(max(_recent, default=0.0) * 1000, 2),
+        "tasks": _state["tasks"],
+        "slow_callbacks": int(_slow_callbacks.value()),
+    }
+
+
+def start() -> Optional[asyncio.Task]:
+    """Start the heartbeat task and watchdog thread on the running loop."""
+    if not LOOP_MONITOR_ENABLED:
+        return None
+    _stop.clear()
+    task = asyncio.create_task(_heartbeat(), name="loop-monitor")
+    threading.Thread(target=_watchdog, name="loop-watchdog", daemon=True).start()
+    return task
+
+
+def stop(task: Optional[asyncio.Task]) -> None:
+    _stop.set()
+    if task is not None:
+        task.cancel()
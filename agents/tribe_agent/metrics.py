@@ -0,0 +1,162 @@
+"""
+In-process metrics exposed at /metrics in Prometheus text format.
+
+A deliberately small registry (counters, gauges, histograms with labels) so
+the agent doesn't need prometheus_client. Metrics are per worker process;
+Cloud Monitoring / Prometheus aggregate across instances.
+"""
+
+import threading
+from typing import Callable, Optional
+
+_lock = threading.Lock()
+_registry: dict[str, "_Metric"] = {}
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: tuple, extra: Optional[tuple] = None) -> str:
+    pairs = list(key) + list(extra or ())
+    if not pairs:
+        return ""
+    rendered = []
+    for k, v in pairs:
+        v = v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        rendered.append(f'{k}="{v}"')
+    return "{" + ",".join(rendered) + "}"
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._values: dict[tuple, float] = {}
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0.0)
+
+    def _samples(self) -> list[str]:
+        return [f"{self.name}{_format_labels(key)} {value}" for key, value in self._values.items()]
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.type_name}"]
+        with _lock:
+            lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    type_name = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = _label_key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, or is read from a callback at scrape time."""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, help_text: str, callback: Optional[Callable[[], float]] = None):
+        super().__init__(name, help_text)
+        self.callback = callback
+
+    def set(self, value: float, **labels) -> None:
+        with _lock:
+            self._values[_label_key(labels)] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = _label_key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        if self.callback is not None and not labels:
+            return float(self.callback())
+        return super().value(**labels)
+
+    def _samples(self) -> list[str]:
+        if self.callback is not None:
+            return [f"{self.name} {float(self.callback())}"]
+        return super()._samples()
+
+
+class Histogram(_Metric):
+    """Distribution of observed values (e.g. latencies in seconds)."""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = buckets
+        self._counts: dict[tuple, list[int]] = {}
+        self._sums: dict[tuple, float] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(labels)
+        with _lock:
+            counts = self._counts.setdefault(key, [0] * (len(self.buckets) + 1))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            counts[-1] += 1
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    def count(self, **labels) -> int:
+        counts = self._counts.get(_label_key(labels))
+        return counts[-1] if counts else 0
+
+    def _samples(self) -> list[str]:
+        lines = []
+        for key, counts in self._counts.items():
+            for bound, count in zip(self.buckets, counts):
+                labels = _format_labels(key, (("le", str(bound)),))
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            lines.append(f"{self.name}_bucket{_format_labels(key, (('le', '+Inf'),))} {counts[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {self._sums[key]}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {counts[-1]}")
+        return lines
+
+
+def _register(metric_class, name: str, help_text: str, **kwargs):
+    with _lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = metric_class(name, help_text, **kwargs)
+            _registry[name] = metric
+    return metric
+
+
+def counter(name: str, help_text: str) -> Counter:
+    """Get or create a counter."""
+    return _register(Counter, name, help_text)
+
+
+def gauge(name: str, help_text: str, callback: Optional[Callable[[], float]] = None) -> Gauge:
+    """Get or create a gauge, optionally computed by a callback at scrape time."""
+    return _register(Gauge, name, help_text, callback=callback)
+
+
+def histogram(name: str, help_text: str, buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+    """Get or create a histogram."""
+    return _register(Histogram, name, help_text, buckets=buckets)
+
+
+def render() -> str:
+    """All metrics in Prometheus text exposition format."""
+    with _lock:
+        metrics = list(_registry.values())
+    return "\n".join(metric.render() for metric in metrics) + "\n"
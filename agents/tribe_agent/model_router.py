@@ -0,0 +1,178 @@
+"""
+Tiered Model Router
+
+Classifies each model call with cheap local heuristics and picks a model
+configuration for it:
+
+- chitchat: a message that is only a greeting, thanks or goodbye, and does
+  not answer a question or offer from the previous model turn. Light model,
+  no tools, short output.
+- simple: short follow-ups without data needs, including confirmations
+  ("yes please", "ok do it") which may accept an offer to call a tool.
+  Light model, tools kept.
+- complex: anything mentioning visas, housing, costs, documents or tasks,
+  long or multi-part questions, and every call that continues a tool loop.
+  Full model.
+
+The router runs as a before_model_callback and rewrites llm_request.model,
+which is what the Gemini backend sends, so no second agent is needed. Each
+decision is logged and counted in the model_route_total metric.
+"""
+
+import os
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.genai import types
+
+import metrics
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+FULL_MODEL = os.environ.get("AGENT_MODEL", "gemini-2.5-flash")
+LIGHT_MODEL = os.environ.get("ROUTER_LIGHT_MODEL", "gemini-2.5-flash-lite")
+ROUTER_ENABLED = os.environ.get("ROUTER_ENABLED", "true").lower() == "true"
+
+CHITCHAT_MAX_WORDS = 6
+SIMPLE_MAX_WORDS = 12
+CHITCHAT_MAX_OUTPUT_TOKENS = 256
+
+# The whole message must be chitchat. Confirmations (yes, ok, sure, ...) are
+# deliberately absent: they often accept an offer that needs the tools.
+_CHITCHAT_PHRASE = (
+    r"(hi|hello|hey|hiya|good (morning|afternoon|evening)|thanks?( you)?( so much)?|thank you"
+    r"|thx|ty|cool|great|awesome|nice|bye|goodbye|see you|cheers|there|again)"
+)
+CHITCHAT_PATTERN = re.compile(rf"{_CHITCHAT_PHRASE}( {_CHITCHAT_PHRASE})*")
+
+# A previous model turn ending like this is waiting for the user's answer
+OFFER_PATTERN = re.compile(
+    r"(\?\s*$|would you like|do you want|want me to|shall i|should i|let me know if)"
+)
+
+# Topics that need tools, personal context or careful reasoning
+COMPLEX_KEYWORDS = frozenset(
+    """
+    visa visas permit permits passport document documents requirement requirements
+    apply application eligibility eligible sponsor sponsorship residency citizenship
+    housing house apartment rent rental landlord lease accommodation neighborhood
+    cost costs price fee fees budget salary tax taxes bank money
+    task tasks todo todos progress checklist deadline timeline
+    compare difference between plan steps
+    """.split()
+)
+
+_routes = metrics.counter("model_route_total", "Model calls by routing tier")
+
+
+@dataclass(frozen=True)
+class Route:
+    tier: str
+    model: str
+    reason: str
+
+
+def classify(
+    text: str, continues_tool_loop: bool = False, replies_to_offer: bool = False
+) -> Route:
+    """
+    Classify a user turn into a routing tier.
+
+    Args:
+        text: The latest user message
+        continues_tool_loop: True when the model is being called with tool results
+        replies_to_offer: True when the previous model turn asked a question or
+                          offered to do something
+
+    Returns:
+        Route with tier ('chitchat', 'simple' or 'complex'), model and reason
+    """
+    if continues_tool_loop:
+        return Route("complex", FULL_MODEL, "tool_results")
+
+    normalized = " ".join(re.sub(r"[^\w\s?]", " ", text.lower()).split())
+    words = normalized.replace("?", " ").split()
+
+    if not words:
+        return Route("complex", FULL_MODEL, "no_text")
+    if COMPLEX_KEYWORDS.intersection(words):
+        return Route("complex", FULL_MODEL, "keyword")
+    if normalized.count("?") > 1:
+        return Route("complex", FULL_MODEL, "multi_question")
+    chitchat = CHITCHAT_PATTERN.fullmatch(normalized.replace("?", "").strip())
+    if len(words) <= CHITCHAT_MAX_WORDS and chitchat and not replies_to_offer:
+        return Route("chitchat", LIGHT_MODEL, "chitchat")
+    if len(words) <= SIMPLE_MAX_WORDS:
+        return Route("simple", LIGHT_MODEL, "short")
+    return Route("complex", FULL_MODEL, "long")
+
+
+def _text(content: types.Content) -> str:
+    return " ".join(p.text for p in content.parts or [] if p.text)
+
+
+def _latest_turn(llm_request: LlmRequest) -> tuple[str, bool, bool]:
+    """
+    Text of the latest user message, whether the call carries tool results and
+    whether the previous model turn asked a question or made an offer.
+    """
+    contents = llm_request.contents
+    if not contents:
+        return "", False, False
+    parts = contents[-1].parts or []
+    if any(p.function_response for p in parts):
+        return "", True, False
+    if contents[-1].role != "user":
+        return "", False, False
+    previous = next(
+        (c for c in reversed(contents[:-1]) if c.role == "model" and _text(c)), None
+    )
+    replies_to_offer = previous is not None and bool(
+        OFFER_PATTERN.search(_text(previous).lower())
+    )
+    return _text(contents[-1]), False, replies_to_offer
+
+
+def apply_route(route: Route, llm_request: LlmRequest) -> None:
+    """Rewrite the request for the chosen tier."""
+    llm_request.model = route.model
+    if route.tier == "complex":
+        return
+
+    config = llm_request.config or types.GenerateContentConfig()
+    # Light turns don't benefit from thinking; it only adds latency
+    config.thinking_config = types.ThinkingConfig(thinking_budget=0)
+    if route.tier == "chitchat":
+        config.tools = None
+        config.max_output_tokens = CHITCHAT_MAX_OUTPUT_TOKENS
+        llm_request.tools_dict = {}
+    llm_request.config = config
+
+
+def before_model_callback(
+    callback_context: CallbackContext, llm_request: LlmRequest
+) -> Optional[LlmResponse]:
+    """Route the model call to the light or full model configuration."""
+    if not ROUTER_ENABLED:
+        return None
+
+    text, continues_tool_loop, replies_to_offer = _latest_turn(llm_request)
+    route = classify(text, continues_tool_loop, replies_to_offer)
+    apply_route(route, llm_request)
+
+    _routes.inc(tier=route.tier)
+    logger.info(
+        "Model route",
+        extra={
+            "invocation_id": callback_context.invocation_id,
+            "tier": route.tier,
+            "model": route.model,
+            "reason": route.reason,
+            "words": len(text.split()),
+        },
+    )
+    return None
@@ -0,0 +1,185 @@
+"""
+On-demand sampling profiler
+
+Backs GET /debug/profile. Two modes:
+
+- cpu: a background thread samples every thread's stack with
+  sys._current_frames() at 100 Hz and, via call_soon_threadsafe, the await
+  chain of every asyncio task on the server's loop at TASK_INTERVAL (walking
+  every task runs on the loop itself, so it is sampled less often and never
+  queued again while the previous walk is still pending). Each task walk
+  returns its own Counter through a future, merged at the end, so the two
+  threads never share a mutable counter. Output is collapsed stacks
+  ("frame;frame;frame count" per line), the input format of flamegraph.pl,
+  speedscope and inferno. Thread sampling costs a few percent of one CPU and
+  only reads frames, so it is safe under live traffic.
+- alloc: a tracemalloc snapshot diff over the window, top N allocation sites
+  by growth. tracemalloc slows allocation while it traces, so it is only
+  enabled for the duration of the request (unless it was already running).
+
+Only one profile runs at a time per worker.
+"""
+
+import asyncio
+import collections
+import concurrent.futures
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from types import FrameType
+from typing import Optional
+
+MAX_SECONDS = 60.0
+DEFAULT_INTERVAL = 0.01
+TASK_INTERVAL = 0.1
+TRACEMALLOC_FRAMES = 10
+
+_busy = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    """Another profile is already running in this worker."""
+
+
+def _frame_label(frame: FrameType) -> str:
+    module = frame.f_globals.get("__name__") or os.path.basename(frame.f_code.co_filename)
+    return f"{module}:{frame.f_code.co_name}"
+
+
+def _thread_stack(frame: Optional[FrameType]) -> list[str]:
+    """Frame labels from the outermost call to the innermost."""
+    stack = []
+    while frame is not None:
+        stack.append(_frame_label(frame))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def _task_stack(task: asyncio.Task) -> list[str]:
+    """Await chain of a suspended task, outermost coroutine first."""
+    stack = []
+    coro = task.get_coro()
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "ag_frame", None)
+        if frame is None:
+            break
+        stack.append(_frame_label(frame))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "ag_await", None)
+    return stack
+
+
+def _sample_tasks(loop: asyncio.AbstractEventLoop, result: concurrent.futures.Future) -> None:
+    """Runs on the event loop: count the await chain of every pending task."""
+    counts: collections.Counter = collections.Counter()
+    for task in asyncio.all_tasks(loop):
+        stack = _task_stack(task)
+        if stack:
+            counts[";".join([f"task:{task.get_name()}", *stack])] += 1
+    result.set_result(counts)
+
+
+def _sample_cpu(seconds: float, interval: float, loop: Optional[asyncio.AbstractEventLoop]):
+    counts: collections.Counter = collections.Counter()
+    task_samples: list[concurrent.futures.Future] = []
+    me = threading.get_ident()
+    names = {}
+    samples = 0
+
+    deadline = time.monotonic() + seconds
+    next_task_sample = 0.0
+    while time.monotonic() < deadline:
+        for thread in threading.enumerate():
+            names[thread.ident] = thread.name
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == me:
+                continue
+            stack = _thread_stack(frame)
+            counts[";".join([f"thread:{names.get(thread_id, thread_id)}", *stack])] += 1
+        now = time.monotonic()
+        if loop is not None and loop.is_running() and now >= next_task_sample:
+            # Sampled on the loop itself; while the previous walk is pending the
+            # loop is blocked, and queueing more would only add to its backlog
+            if not task_samples or task_samples[-1].done():
+                result = concurrent.futures.Future()
+                loop.call_soon_threadsafe(_sample_tasks, loop, result)
+                task_samples.append(result)
+            next_task_sample = now + TASK_INTERVAL
+        samples += 1
+        time.sleep(interval)
+
+    concurrent.futures.wait(task_samples, timeout=TASK_INTERVAL)
+    for result in task_samples:
+        if result.done():
+            counts.update(result.result())
+    return counts, samples
+
+
+async def profile_cpu(seconds: float, interval: float = DEFAULT_INTERVAL) -> tuple[str, int]:
+    """
+    Sample all threads and asyncio tasks for `seconds`.
+
+    Returns:
+        (collapsed stacks text, number of sampling ticks)
+    """
+    if not _busy.acquire(blocking=False):
+        raise ProfilerBusy()
+    try:
+        seconds = min(max(seconds, 0.1), MAX_SECONDS)
+        loop = asyncio.get_running_loop()
+        counts, samples = await asyncio.to_thread(_sample_cpu, seconds, interval, loop)
+    finally:
+        _busy.release()
+
+    lines = [f"{stack} {count}" for stack, count in counts.most_common()]
+    return "\n".join(lines) + "\n", samples
+
+
+# Leave the profiler's own bookkeeping out of the report
+_SNAPSHOT_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+]
+
+
+async def profile_allocations(seconds: float, top: int = 25) -> str:
+    """
+    Diff tracemalloc snapshots taken `seconds` apart and report the top growth sites.
+
+    Returns:
+        Text report, one allocation site per line with size and count deltas
+    """
+    if not _busy.acquire(blocking=False):
+        raise ProfilerBusy()
+    started_here = not tracemalloc.is_tracing()
+    try:
+        seconds = min(max(seconds, 0.1), MAX_SECONDS)
+        if started_here:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        before = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+        await asyncio.sleep(seconds)
+        after = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+        traced, peak = tracemalloc.get_traced_memory()
+    finally:
+        if started_here:
+            tracemalloc.stop()
+        _busy.release()
+
+    stats = after.compare_to(before, "traceback")
+    lines = [
+        f"# tracemalloc diff over {seconds:.1f}s: traced={traced / 1024:.0f} KiB "
+        f"peak={peak / 1024:.0f} KiB (started_here={started_here})"
+    ]
+    for stat in stats[:top]:
+        # Tracebacks are ordered oldest call first; the last frame allocated
+        frames = list(stat.traceback)
+        site = frames[-1]
+        lines.append(
+            f"{stat.size_diff / 1024:+10.1f} KiB {stat.count_diff:+8d} blocks  "
+            f"{site.filename}:{site.lineno}"
+        )
+        for caller in reversed(frames[-4:-1]):
+            lines.append(f"{'':30}<- {caller.filename}:{caller.lineno}")
+    return "\n".join(lines) + "\n"
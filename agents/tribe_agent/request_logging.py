@@ -0,0 +1,117 @@
+"""
+Request logging middleware (pure ASGI)
+
+Logs every HTTP request with an X-Request-ID, time to first byte and total
+duration. Unlike @app.middleware("http") (BaseHTTPMiddleware) it does not
+run the endpoint in a separate task or re-wrap the response body, so the
+/agui SSE stream flows through untouched; the `send` callable is only
+wrapped to add the header and timestamp the first and last body chunks.
+
+- ttfb_ms: until the first non-empty body chunk (first SSE event on /agui)
+- duration_ms: until the last body chunk, i.e. when the stream finished
+"""
+
+import re
+import time
+import uuid
+
+import analytics
+import metrics
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+REQUEST_ID_HEADER = b"x-request-id"
+
+# Accept caller-supplied request IDs (e.g. from the Next.js route) when sane
+_REQUEST_ID_PATTERN = re.compile(rb"^[A-Za-z0-9._-]{1,64}$")
+
+_ttfb = metrics.histogram("http_ttfb_seconds", "Time to first response body byte")
+_duration = metrics.histogram(
+    "http_request_duration_seconds", "Time until the response body (or stream) finished"
+)
+
+
+def _request_id(scope) -> str:
+    for name, value in scope.get("headers", ()):
+        if name == REQUEST_ID_HEADER and _REQUEST_ID_PATTERN.match(value):
+            return value.decode("latin-1")
+    return uuid.uuid4().hex[:8]
+
+
+def _route_label(scope) -> str:
+    """Route template for metric labels, so unknown paths don't add series."""
+    route = scope.get("route")
+    return getattr(route, "path", None) or "other"
+
+
+class RequestLoggingMiddleware:
+    """ASGI middleware logging request start/completion with TTFB and stream duration."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = _request_id(scope)
+        scope.setdefault("state", {})["request_id"] = request_id
+        path = scope["path"]
+        method = scope["method"]
+        start = time.perf_counter()
+        timing = {"status": None, "ttfb": None, "end": None, "bytes": 0}
+
+        logger.info(
+            f"Request started: {method} {path}",
+            extra={"request_id": request_id, "path": path, "method": method},
+        )
+
+        async def send_wrapper(message):
+            message_type = message["type"]
+            if message_type == "http.response.start":
+                timing["status"] = message["status"]
+                headers = list(message.get("headers", ()))
+                headers.append((REQUEST_ID_HEADER, request_id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            elif message_type == "http.response.body":
+                body = message.get("body", b"")
+                if body and timing["ttfb"] is None:
+                    timing["ttfb"] = time.perf_counter() - start
+                timing["bytes"] += len(body)
+                if not message.get("more_body", False):
+                    timing["end"] = time.perf_counter() - start
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Client disconnects end the stream without a final body chunk
+            duration = timing["end"] if timing["end"] is not None else time.perf_counter() - start
+            ttfb = timing["ttfb"] if timing["ttfb"] is not None else duration
+            route = _route_label(scope)
+            _ttfb.observe(ttfb, route=route)
+            _duration.observe(duration, route=route)
+            analytics.emit(
+                "request",
+                route=route,
+                method=method,
+                status=timing["status"],
+                ttfb_ms=round(ttfb * 1000, 2),
+                duration_ms=round(duration * 1000, 2),
+                bytes=timing["bytes"],
+                completed=timing["end"] is not None,
+            )
+            logger.info(
+                f"Request completed: {timing['status']}",
+                extra={
+                    "request_id": request_id,
+                    "path": path,
+                    "status": timing["status"],
+                    "ttfb_ms": round(ttfb * 1000, 2),
+                    "duration_ms": round(duration * 1000, 2),
+                    "bytes": timing["bytes"],
+                    "completed": timing["end"] is not None,
+                },
+            )
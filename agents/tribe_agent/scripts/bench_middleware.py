@@ -0,0 +1,129 @@
+"""
+Throughput of the request logging middleware: BaseHTTPMiddleware vs pure ASGI.
+
+Builds two minimal apps that differ only in the logging middleware (the
+previous @app.middleware("http") log_requests and RequestLoggingMiddleware)
+and drives them in-process through httpx.ASGITransport with a small JSON
+endpoint and an SSE-style stream of many events. Logging goes to a null
+handler at INFO so both pay for building their log records.
+
+Usage:
+    python scripts/bench_middleware.py [--requests 2000] [--concurrency 50] [--events 200]
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx  # noqa: E402
+from fastapi import FastAPI, Request  # noqa: E402
+from fastapi.responses import StreamingResponse  # noqa: E402
+
+from request_logging import RequestLoggingMiddleware  # noqa: E402
+
+logger = logging.getLogger("bench")
+
+
+def add_routes(app: FastAPI, events: int) -> None:
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    @app.get("/stream")
+    async def stream():
+        async def generate():
+            for i in range(events):
+                yield f'data: {{"type":"TEXT_MESSAGE_CONTENT","delta":"token {i}"}}\n\n'
+
+        return StreamingResponse(generate(), media_type="text/event-stream")
+
+
+def legacy_app(events: int) -> FastAPI:
+    """The logging middleware as it was in server.py before the ASGI rewrite."""
+    app = FastAPI()
+
+    @app.middleware("http")
+    async def log_requests(request: Request, call_next):
+        request_id = str(uuid.uuid4())[:8]
+        start_time = time.time()
+        logger.info(
+            f"Request started: {request.method} {request.url.path}",
+            extra={
+                "request_id": request_id,
+                "path": str(request.url.path),
+                "method": request.method,
+            },
+        )
+        response = await call_next(request)
+        duration_ms = (time.time() - start_time) * 1000
+        logger.info(
+            f"Request completed: {response.status_code}",
+            extra={
+                "request_id": request_id,
+                "status": response.status_code,
+                "duration_ms": round(duration_ms, 2),
+            },
+        )
+        response.headers["X-Request-ID"] = request_id
+        return response
+
+    add_routes(app, events)
+    return app
+
+
+def asgi_app(events: int) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(RequestLoggingMiddleware)
+    add_routes(app, events)
+    return app
+
+
+async def drive(app: FastAPI, path: str, requests: int, concurrency: int) -> float:
+    """Requests per second for `requests` GETs of path with bounded concurrency."""
+    transport = httpx.ASGITransport(app=app)
+    semaphore = asyncio.Semaphore(concurrency)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one():
+            async with semaphore:
+                response = await client.get(path)
+                assert response.headers.get("x-request-id")
+
+        await one()  # Warm up routing and middleware stacks
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        return requests / (time.perf_counter() - start)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--events", type=int, default=200, help="Events per streamed response")
+    args = parser.parse_args()
+
+    root = logging.getLogger()
+    root.handlers = [logging.NullHandler()]
+    root.setLevel(logging.INFO)
+
+    apps = {"BaseHTTPMiddleware": legacy_app(args.events), "pure ASGI": asgi_app(args.events)}
+    print(f"{'middleware':<20} {'json req/s':>11} {'stream req/s':>13}")
+    results = {}
+    for name, app in apps.items():
+        json_rps = asyncio.run(drive(app, "/health", args.requests, args.concurrency))
+        stream_rps = asyncio.run(drive(app, "/stream", args.requests // 4, args.concurrency))
+        results[name] = (json_rps, stream_rps)
+        print(f"{name:<20} {json_rps:>11.0f} {stream_rps:>13.0f}")
+
+    before, after = results["BaseHTTPMiddleware"], results["pure ASGI"]
+    print(f"{'speedup':<20} {after[0] / before[0]:>10.2f}x {after[1] / before[1]:>12.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
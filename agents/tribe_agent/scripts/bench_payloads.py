@@ -0,0 +1,123 @@
+"""
+Token cost of tool payloads per detail level.
+
+Runs representative housing searches against the bundled dataset and shapes
+representative visa and user-context results, then prints the estimated input
+tokens each adds to the model context at 'full' (before) versus 'standard'
+and 'summary' (after).
+
+Usage:
+    python scripts/bench_payloads.py
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from tools.housing import search_housing_resources  # noqa: E402
+from tools.payloads import estimate_tokens, shape_result  # noqa: E402
+
+VISA_RESULT = {
+    "success": True,
+    "origin": "NGA",
+    "destination": "CAN",
+    "visaRequired": True,
+    "visaType": "Work Permit",
+    "stayDuration": "Up to 3 years",
+    "requirements": [
+        "Valid passport with at least 6 months validity beyond the intended stay",
+        "Job offer letter from a Canadian employer with a positive Labour Market Impact "
+        "Assessment (LMIA), unless the position is LMIA-exempt under an international "
+        "agreement or Canadian interest category",
+        "Proof of funds sufficient to support yourself and accompanying family members "
+        "during the first months",
+        "Police clearance certificates from every country lived in for 6+ months since age 18",
+        "Immigration medical examination by a panel physician",
+        "Biometrics (fingerprints and photo) at a Visa Application Centre",
+        "Educational credential assessment for regulated occupations",
+        "Completed application forms IMM 1295 and IMM 5645",
+    ],
+    "estimatedCost": "CAD 255 (permit) + CAD 85 (biometrics)",
+    "cached": True,
+    "quotaRemaining": None,
+    "processingTime": {"averageDays": 84, "source": "IRCC", "cached": True},
+}
+
+USER_CONTEXT_RESULT = {
+    "success": True,
+    "todos": [
+        {
+            "_id": f"k57{i:04d}abcdefghij",
+            "_creationTime": 1735600000000 + i,
+            "title": title,
+            "description": (
+                "Gather everything listed on the official checklist and keep scanned copies."
+            ),
+            "column": "todo" if i % 3 else "in_progress",
+            "priority": "high" if i < 4 else "medium",
+            "category": "documents" if i % 2 else "visa",
+            "corridorId": "jd7corridor000001",
+            "userId": "user_2abcdefghijklmnop",
+            "order": i,
+            "createdAt": 1735600000000 + i,
+            "updatedAt": 1735600000000 + i,
+        }
+        for i, title in enumerate([
+            "Renew passport", "Request police clearance", "Book medical exam",
+            "Get ECA for degree", "Collect reference letters", "Open Canadian bank account",
+            "Research neighborhoods in Toronto", "Translate birth certificate", "Take IELTS exam",
+            "Apply for LMIA-exempt job", "Book biometrics appointment", "Save settlement funds",
+            "Arrange temporary housing", "Ship belongings",
+        ])
+    ],
+    "progress": {"completed": 3, "total": 12, "percentage": 25},
+    "summary": "The user has 14 active tasks including: Renew passport, Request police clearance, "
+    "Book medical exam, and more. Migration progress: 3/12 protocols completed (25%).",
+}
+
+HOUSING_QUERIES = [
+    {"country": "Canada"},
+    {"country": "Germany"},
+    {"continent": "Europe"},
+    {"resource_type": "NGO"},
+]
+
+
+async def collect_cases() -> list[tuple[str, str, dict]]:
+    cases = []
+    for query in HOUSING_QUERIES:
+        label = ", ".join(f"{k}={v}" for k, v in query.items())
+        raw = await search_housing_resources(**query, detail="full")
+        cases.append(("search_housing_resources", label, raw))
+    cases.append(("search_visa_options", "NGA→CAN", VISA_RESULT))
+    cases.append(("get_user_context", "14 todos", USER_CONTEXT_RESULT))
+    return cases
+
+
+def main() -> int:
+    cases = asyncio.run(collect_cases())
+
+    print(f"{'tool':<26} {'case':<22} {'full':>6} {'standard':>9} {'summary':>8} {'saved':>7}")
+    totals = {"full": 0, "standard": 0, "summary": 0}
+    for tool, label, raw in cases:
+        tokens = {detail: estimate_tokens(shape_result(tool, raw, detail)) for detail in totals}
+        for detail, count in tokens.items():
+            totals[detail] += count
+        saved = 1 - tokens["standard"] / tokens["full"]
+        print(
+            f"{tool:<26} {label:<22} {tokens['full']:>6} {tokens['standard']:>9} "
+            f"{tokens['summary']:>8} {saved:>6.0%}"
+        )
+
+    saved = 1 - totals["standard"] / totals["full"]
+    print(
+        f"{'total':<26} {'':<22} {totals['full']:>6} {totals['standard']:>9} "
+        f"{totals['summary']:>8} {saved:>6.0%}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+"""
+Latency and cost mix of the tiered model router, offline.
+
+Runs a scripted set of turns through tribe_agent with the Gemini backend
+replaced by a fake model whose latency and price depend on the model name
+the router selects. Prints per-turn routing and the totals with the router
+disabled (every call on the full model) and enabled.
+
+Latency and price profiles are illustrative, not measurements; edit
+PROFILES to match current Gemini pricing and observed latencies.
+
+Usage:
+    python scripts/bench_router.py [--time-scale 0.05]
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import AsyncGenerator
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse  # noqa: E402
+from google.adk.runners import InMemoryRunner  # noqa: E402
+from google.genai import types  # noqa: E402
+
+import answer_cache  # noqa: E402
+import model_router  # noqa: E402
+from agent import tribe_agent  # noqa: E402
+from tools.payloads import CHARS_PER_TOKEN  # noqa: E402
+
+# Per model: time to first token (s), seconds per output token, extra latency
+# when thinking is enabled, USD per 1M input / output tokens
+PROFILES = {
+    model_router.FULL_MODEL: {
+        "ttft": 0.6, "per_token": 0.004, "thinking": 0.5, "input": 0.30, "output": 2.50,
+    },
+    model_router.LIGHT_MODEL: {
+        "ttft": 0.25, "per_token": 0.002, "thinking": 0.3, "input": 0.10, "output": 0.40,
+    },
+}
+
+TURNS = [
+    "Hi there!",
+    "What documents do I need for a work visa to Canada?",
+    "thanks",
+    "Can you find housing resources in Canada for newcomers?",
+    "ok sounds good",
+    "What should I pack first?",
+    "How long does the whole thing usually take and what are the costs?",
+    "Tell me something encouraging about moving abroad",
+    "bye",
+]
+
+OUTPUT_TOKENS = {"chitchat": 30, "simple": 120, "complex": 400}
+
+
+class FakeGemini(BaseLlm):
+    """Stands in for Gemini; behaviour keyed on llm_request.model."""
+
+    time_scale: float = 0.05
+    calls: list = []
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        profile = PROFILES[llm_request.model]
+        config = llm_request.config
+        thinking_off = bool(
+            config and config.thinking_config and config.thinking_config.thinking_budget == 0
+        )
+        prompt = str(config.system_instruction if config else "") + "".join(
+            str(c.model_dump(exclude_none=True)) for c in llm_request.contents
+        )
+        input_tokens = len(prompt) // CHARS_PER_TOKEN
+
+        last = llm_request.contents[-1]
+        text = " ".join(p.text for p in last.parts or [] if p.text).lower()
+        wants_housing = "housing" in text and "search_housing_resources" in llm_request.tools_dict
+
+        if wants_housing:
+            output_tokens = 20
+            content = types.Content(role="model", parts=[types.Part(
+                function_call=types.FunctionCall(
+                    name="search_housing_resources", args={"country": "Canada"}
+                )
+            )])
+        else:
+            tier = model_router.classify(text).tier if text else "complex"
+            output_tokens = OUTPUT_TOKENS[tier]
+            content = types.Content(role="model", parts=[types.Part(text="x " * output_tokens)])
+
+        latency = profile["ttft"] + profile["per_token"] * output_tokens
+        if not thinking_off:
+            latency += profile["thinking"]
+        await asyncio.sleep(latency * self.time_scale)
+
+        cost = (input_tokens * profile["input"] + output_tokens * profile["output"]) / 1e6
+        self.calls.append({"model": llm_request.model, "latency": latency, "cost": cost})
+        yield LlmResponse(content=content)
+
+
+async def run_turns(router_enabled: bool, time_scale: float) -> list[dict]:
+    model_router.ROUTER_ENABLED = router_enabled
+    fake = FakeGemini(model=model_router.FULL_MODEL, time_scale=time_scale, calls=[])
+    runner = InMemoryRunner(agent=tribe_agent.clone(update={"model": fake}), app_name="bench")
+    session = await runner.session_service.create_session(
+        app_name="bench",
+        user_id="bench",
+        state={"corridor": {"origin": "NGA", "destination": "CAN"}, "language": "en"},
+    )
+
+    results = []
+    for turn in TURNS:
+        start = len(fake.calls)
+        wall = time.perf_counter()
+        message = types.Content(role="user", parts=[types.Part(text=turn)])
+        events = runner.run_async(user_id="bench", session_id=session.id, new_message=message)
+        async for _ in events:
+            pass
+        calls = fake.calls[start:]
+        results.append({
+            "turn": turn,
+            "models": [c["model"] for c in calls],
+            "latency": sum(c["latency"] for c in calls),
+            "cost": sum(c["cost"] for c in calls),
+            "overhead": time.perf_counter() - wall - sum(c["latency"] for c in calls) * time_scale,
+        })
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--time-scale",
+        type=float,
+        default=0.05,
+        help="Fraction of the simulated model latency to actually sleep",
+    )
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger("google_adk").setLevel(logging.ERROR)
+    answer_cache.ANSWER_CACHE_ENABLED = False
+    baseline = asyncio.run(run_turns(False, args.time_scale))
+    routed = asyncio.run(run_turns(True, args.time_scale))
+
+    light = model_router.LIGHT_MODEL
+    print(f"{'turn':<60} {'calls':>5} {'light':>5} {'full ms':>8} {'routed ms':>9}")
+    for before, after in zip(baseline, routed):
+        print(
+            f"{before['turn'][:60]:<60} {len(after['models']):>5} "
+            f"{after['models'].count(light):>5} {before['latency'] * 1000:>8.0f} "
+            f"{after['latency'] * 1000:>9.0f}"
+        )
+
+    for label, results in (("full model only", baseline), ("routed", routed)):
+        calls = [m for r in results for m in r["models"]]
+        latency = sum(r["latency"] for r in results)
+        cost = sum(r["cost"] for r in results)
+        overhead = sum(r["overhead"] for r in results) / len(results)
+        print(
+            f"{label:<16} calls={len(calls)} light={calls.count(light) / len(calls):.0%} "
+            f"model_latency={latency:.2f}s cost=${cost * 1000:.3f}/1k convs "
+            f"agent_overhead={overhead * 1000:.1f}ms/turn"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
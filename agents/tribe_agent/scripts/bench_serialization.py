@@ -0,0 +1,149 @@
+"""
+JSON encoding cost per backend for representative payloads.
+
+Encodes the payloads the server serializes most often (a full housing search,
+a visa result, a user context with many todos, an /api response with sorted
+keys for the ETag, a structured log line and an analytics batch) with each
+serialization.py backend that is installed, and prints microseconds per
+encode and the speedup over the json module.
+
+Usage:
+    python scripts/bench_serialization.py [--repeat 2000]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import serialization  # noqa: E402
+from tools.housing import search_housing_resources  # noqa: E402
+
+VISA_RESULT = {
+    "success": True,
+    "origin": "NGA",
+    "destination": "CAN",
+    "visaRequired": True,
+    "visaType": "Work Permit",
+    "stayDuration": "Up to 3 years",
+    "requirements": [
+        "Valid passport with at least 6 months validity beyond the intended stay",
+        "Job offer letter from a Canadian employer with a positive Labour Market Impact "
+        "Assessment (LMIA), unless the position is LMIA-exempt",
+        "Proof of funds sufficient to support yourself and accompanying family members",
+        "Police clearance certificates from every country lived in for 6+ months since age 18",
+        "Immigration medical examination by a panel physician",
+        "Biometrics (fingerprints and photo) at a Visa Application Centre",
+    ],
+    "estimatedCost": "CAD 255 (permit) + CAD 85 (biometrics)",
+    "cached": False,
+    "quotaRemaining": 87,
+    "processingTime": {"averageDays": 84, "source": "IRCC", "cached": True},
+}
+
+USER_CONTEXT_RESULT = {
+    "success": True,
+    "summary": "The user has 40 active tasks including: Get passport, Book biometrics, "
+    "Translate diploma, and more. Migration progress: 12/30 protocols completed (40%).",
+    "progress": {"total": 30, "completed": 12, "percentage": 40},
+    "todos": [
+        {
+            "title": f"Task {i}: gather documents for step {i}",
+            "column": ("todo", "in_progress", "done")[i % 3],
+            "priority": ("high", "medium", "low")[i % 3],
+            "category": "documents",
+            "description": "Collect certified copies and translations " * 3,
+            "createdAt": 1760000000000 + i,
+        }
+        for i in range(40)
+    ],
+}
+
+
+def log_line_payload() -> dict:
+    """A request log line as JSONFormatter builds it (base fields plus extras)."""
+    return {
+        "timestamp": "2026-10-19T12:00:00Z",
+        "severity": "INFO",
+        "message": "Request completed: GET /api/visa",
+        "logger": "request_logging",
+        "module": "request_logging",
+        "function": "send_wrapper",
+        "line": 88,
+        "request_id": "3f2a9c1b",
+        "path": "/api/visa",
+        "method": "GET",
+        "status_code": 200,
+        "duration_ms": 12.4,
+    }
+
+
+def analytics_batch() -> list[dict]:
+    return [
+        {
+            "ts": 1760875200.123 + i,
+            "event": "tool_call",
+            "tool": "search_visa_options",
+            "corridor": "NGA-CAN",
+            "stage": "planning",
+            "language": "en",
+            "duration_ms": 412.7,
+            "ok": True,
+        }
+        for i in range(100)
+    ]
+
+
+def backends() -> dict:
+    found = {"json": serialization._stdlib_dumps}
+    for name, build in serialization._BACKENDS.items():
+        try:
+            found[name] = build()
+        except ImportError:
+            pass
+    return found
+
+
+def time_per_call(dumps, payload, sort_keys: bool, repeat: int) -> float:
+    dumps(payload, sort_keys)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        dumps(payload, sort_keys)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    housing = asyncio.run(search_housing_resources(detail="full"))
+    payloads = [
+        ("housing (full)", housing, False),
+        ("housing /api (sorted)", housing, True),
+        ("visa", VISA_RESULT, False),
+        ("user context", USER_CONTEXT_RESULT, False),
+        ("log line", log_line_payload(), False),
+        ("analytics x100", analytics_batch(), False),
+    ]
+    encoders = backends()
+
+    print(f"default backend: {serialization.BACKEND}")
+    header = f"{'payload':<24} {'bytes':>8}" + "".join(f" {name + ' us':>12}" for name in encoders)
+    print(header + f" {'best speedup':>13}")
+    for label, payload, sort_keys in payloads:
+        size = len(serialization._stdlib_dumps(payload, sort_keys))
+        timings = {
+            name: time_per_call(dumps, payload, sort_keys, args.repeat)
+            for name, dumps in encoders.items()
+        }
+        row = f"{label:<24} {size:>8}" + "".join(f" {t:>12.1f}" for t in timings.values())
+        print(row + f" {timings['json'] / min(timings.values()):>12.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""
+Wall time of a parallel function-call batch, sequential versus concurrent.
+
+A fake model answers the first call of a turn with three function calls in
+one response (visa, housing, user context), each backed by a stub tool that
+sleeps for a fixed delay. The turn runs through the real tribe_agent
+callbacks with TOOL_CONCURRENCY=1 (sequential) and with the configured
+limit, and the time from the function-call event to the merged
+function-response event is printed for each.
+
+Usage:
+    python scripts/bench_tool_batch.py [--concurrency 4]
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+import time
+import warnings
+from pathlib import Path
+from typing import AsyncGenerator
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse  # noqa: E402
+from google.adk.runners import InMemoryRunner  # noqa: E402
+from google.adk.tools import FunctionTool  # noqa: E402
+from google.genai import types  # noqa: E402
+
+import answer_cache  # noqa: E402
+from agent import tribe_agent  # noqa: E402
+from tools import batching  # noqa: E402
+
+DELAYS = {
+    "search_visa_options": 0.8,
+    "search_housing_resources": 0.3,
+    "get_user_context": 0.5,
+}
+
+
+async def search_visa_options(origin: str, destination: str) -> dict:
+    """Stub visa search."""
+    await asyncio.sleep(DELAYS["search_visa_options"])
+    return {"success": True, "origin": origin, "destination": destination}
+
+
+async def search_housing_resources(country: str) -> dict:
+    """Stub housing search."""
+    await asyncio.sleep(DELAYS["search_housing_resources"])
+    return {"total_found": 0, "results": [], "country": country}
+
+
+async def get_user_context(corridor_id: str, tool_context=None) -> dict:
+    """Stub user context."""
+    await asyncio.sleep(DELAYS["get_user_context"])
+    return {"success": True, "todos": [], "corridor": corridor_id}
+
+
+CALLS = [
+    ("search_visa_options", {"origin": "NGA", "destination": "CAN"}),
+    ("search_housing_resources", {"country": "Canada"}),
+    ("get_user_context", {"corridor_id": "c1"}),
+]
+
+
+class FakeGemini(BaseLlm):
+    """Requests all three tools at once, then answers."""
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        parts = llm_request.contents[-1].parts or []
+        if any(p.function_response for p in parts):
+            yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text="done")]))
+            return
+        yield LlmResponse(content=types.Content(role="model", parts=[
+            types.Part(function_call=types.FunctionCall(id=f"call-{i}", name=name, args=args))
+            for i, (name, args) in enumerate(CALLS)
+        ]))
+
+
+async def run_turn(concurrency: int) -> tuple[float, list[str]]:
+    batching.TOOL_CONCURRENCY = concurrency
+    agent = tribe_agent.clone(update={
+        "model": FakeGemini(model="fake"),
+        "tools": [
+            FunctionTool(batching.batched(search_visa_options)),
+            FunctionTool(batching.batched(search_housing_resources)),
+            FunctionTool(batching.batched(get_user_context)),
+        ],
+    })
+    runner = InMemoryRunner(agent=agent, app_name="bench")
+    session = await runner.session_service.create_session(app_name="bench", user_id="bench")
+
+    message = types.Content(role="user", parts=[types.Part(text="Plan my NGA to CAN move")])
+    calls_at = responses_at = None
+    order: list[str] = []
+    events = runner.run_async(user_id="bench", session_id=session.id, new_message=message)
+    async for event in events:
+        if event.get_function_calls():
+            calls_at = time.perf_counter()
+        if event.get_function_responses():
+            responses_at = time.perf_counter()
+            order = [r.name for r in event.get_function_responses()]
+    return responses_at - calls_at, order
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--concurrency", type=int, default=batching.TOOL_CONCURRENCY)
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore", category=UserWarning)
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger("google_adk").setLevel(logging.ERROR)
+    answer_cache.ANSWER_CACHE_ENABLED = False
+
+    print(f"stub delays: {', '.join(f'{k}={v}s' for k, v in DELAYS.items())}")
+    print(f"sum of calls: {sum(DELAYS.values()):.2f}s, slowest call: {max(DELAYS.values()):.2f}s")
+    for concurrency in (1, args.concurrency):
+        wall, order = asyncio.run(run_turn(concurrency))
+        print(f"TOOL_CONCURRENCY={concurrency:<3} batch wall={wall:.2f}s  responses={order}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
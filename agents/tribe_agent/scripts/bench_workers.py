@@ -0,0 +1,140 @@
+"""
+Throughput scaling benchmark for the preforked server.
+
+Starts `serve.py` with an increasing number of workers, drives it with several
+load-generator processes (so the client is not the bottleneck) and reports
+requests per second and speedup relative to one worker.
+
+Usage:
+    python scripts/bench_workers.py
+    python scripts/bench_workers.py --workers 1 2 4 --path "/health" --duration 10
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+AGENT_DIR = Path(__file__).resolve().parent.parent
+
+
+async def _load(url: str, connections: int, duration: float) -> tuple[int, int]:
+    """Issue requests on `connections` keep-alive connections for `duration` seconds."""
+    ok = 0
+    errors = 0
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+
+    async with httpx.AsyncClient(limits=limits, timeout=10.0) as client:
+
+        async def worker():
+            nonlocal ok, errors
+            while time.perf_counter() < deadline:
+                try:
+                    response = await client.get(url)
+                    if response.status_code < 400:
+                        ok += 1
+                    else:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+
+        await asyncio.gather(*(worker() for _ in range(connections)))
+    return ok, errors
+
+
+def _load_process(url: str, connections: int, duration: float, results) -> None:
+    results.put(asyncio.run(_load(url, connections, duration)))
+
+
+def wait_until_ready(base_url: str, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/health/ready", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("Server did not become ready in time")
+
+
+def run_case(workers: int, args) -> tuple[float, int]:
+    """Benchmark one worker count. Returns (requests/sec, errors)."""
+    base_url = f"http://127.0.0.1:{args.port}"
+    server = subprocess.Popen(
+        [
+            sys.executable, "serve.py", "--host", "127.0.0.1", "--port", str(args.port),
+            "--workers", str(workers),
+            "--allow-per-worker-state",  # Only stateless paths are benchmarked
+        ],
+        cwd=AGENT_DIR,
+        env={**os.environ, "LOG_LEVEL": "WARNING"},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_until_ready(base_url)
+
+        # Warm up keep-alive connections and caches
+        asyncio.run(_load(base_url + args.path, args.connections, 1.0))
+
+        results = multiprocessing.Queue()
+        loaders = [
+            multiprocessing.Process(
+                target=_load_process,
+                args=(base_url + args.path, args.connections, args.duration, results),
+            )
+            for _ in range(args.clients)
+        ]
+        for p in loaders:
+            p.start()
+        totals = [results.get() for _ in loaders]
+        for p in loaders:
+            p.join()
+
+        ok = sum(t[0] for t in totals)
+        errors = sum(t[1] for t in totals)
+        return ok / args.duration, errors
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+
+
+def main() -> int:
+    cpus = os.cpu_count() or 1
+    default_workers = sorted({1, 2, 4, cpus} & set(range(1, cpus + 1)))
+
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--workers", type=int, nargs="+", default=default_workers)
+    parser.add_argument("--path", default="/health", help="Endpoint to request")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per case")
+    parser.add_argument(
+        "--clients", type=int, default=max(2, cpus // 2), help="Load-generator processes"
+    )
+    parser.add_argument(
+        "--connections", type=int, default=32, help="Connections per client process"
+    )
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    print(f"{'workers':>8} {'req/s':>10} {'speedup':>8} {'errors':>7}")
+    baseline = None
+    for workers in args.workers:
+        rps, errors = run_case(workers, args)
+        baseline = baseline or rps
+        print(f"{workers:>8} {rps:>10.0f} {rps / baseline:>7.2f}x {errors:>7}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
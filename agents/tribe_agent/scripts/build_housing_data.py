@@ -0,0 +1,430 @@
+"""
+Build and validate the housing dataset.
+
+Ingests one or more source files, normalizes them and writes, in one pass:
+
+- data/migrant_housing_resources.json: the dataset, with metadata
+  (total_resources, total_countries, continents_covered, resource_types)
+  recomputed from the contents
+- data/migrant_housing_index.json: the prebuilt search index loaded by
+  tools/housing.py when it matches the dataset file
+- data/housing_build_manifest.json: per-record content hashes and URL check
+  results, which make rebuilds incremental
+
+Sources are dataset-shaped JSON ({"housing_resources": [...]}) or CSV with
+one resource per row (country, continent, country_code, organization_name,
+url, description, resource_type, services separated by ';').
+
+Normalization:
+- country codes are upper-cased and resolved to ISO3 with the country tables
+  in tools/visa.py (stored as `iso3`); regional entries (GLOBAL, EU, ...)
+  have none; name/code mismatches and unknown countries are reported
+- segments with the same country_code are merged, and organizations within a
+  segment are deduplicated by name or URL (services are unioned, the longest
+  description wins)
+
+With --check-urls, resource URLs are checked concurrently (HEAD, falling back
+to GET) with at most --concurrency requests in flight. Only records whose
+content changed since the last build, or whose last check is older than
+--recheck-days, are checked again.
+
+Usage:
+    python scripts/build_housing_data.py [--source FILE ...] [--check-urls]
+        [--concurrency 16] [--recheck-days 7] [--fail-on-broken] [--dry-run]
+"""
+
+import argparse
+import asyncio
+import csv
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlsplit, urlunsplit
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx  # noqa: E402
+
+from tools.housing import DATA_PATH, INDEX_PATH, build_housing_index  # noqa: E402
+from tools.visa import COUNTRY_CODES  # noqa: E402
+
+MANIFEST_PATH = DATA_PATH.with_name("housing_build_manifest.json")
+MANIFEST_VERSION = 1
+
+# Multi-country entries; not ISO countries, so they have no iso3
+REGION_CODES = {"GLOBAL", "EU", "ASIA", "AF", "LATAM"}
+
+URL_TIMEOUT_SECONDS = 10.0
+USER_AGENT = "TRIBE-housing-etl/1.0 (+https://github.com/tmoody1973/tribe-ai)"
+
+
+def canonical_json(value) -> bytes:
+    return json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def sha256(value) -> str:
+    return hashlib.sha256(canonical_json(value)).hexdigest()
+
+
+def clean_text(value) -> str:
+    return re.sub(r"\s+", " ", str(value or "")).strip()
+
+
+def normalize_url(url: str) -> str:
+    url = clean_text(url)
+    if url and "://" not in url:
+        url = f"https://{url}"
+    parts = urlsplit(url)
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, parts.query, ""))
+
+
+def url_key(url: str) -> str:
+    """Scheme-, www- and trailing-slash-insensitive form for duplicate detection."""
+    parts = urlsplit(url)
+    key = parts.netloc.removeprefix("www.") + parts.path.rstrip("/")
+    return f"{key}?{parts.query}" if parts.query else key
+
+
+def org_key(name: str) -> str:
+    """Organization name without case, punctuation or a trailing '(ACRONYM)'."""
+    name = re.sub(r"\s*\([^)]*\)\s*$", "", name.casefold())
+    return re.sub(r"[^a-z0-9]+", " ", name).strip()
+
+
+# ---------------------------------------------------------------------------
+# Ingest
+
+
+def load_source(path: Path) -> list[dict]:
+    """Country segments from a dataset JSON or a one-resource-per-row CSV."""
+    if path.suffix.lower() == ".csv":
+        segments: dict[tuple, dict] = {}
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                country, code = row.get("country", ""), row.get("country_code", "")
+                continent = row.get("continent", "")
+                segment = segments.setdefault((country, code, continent), {
+                    "country": country,
+                    "country_code": code,
+                    "continent": continent,
+                    "resources": [],
+                })
+                segment["resources"].append({
+                    "organization_name": row.get("organization_name", ""),
+                    "url": row.get("url", ""),
+                    "description": row.get("description", ""),
+                    "resource_type": row.get("resource_type", ""),
+                    "services": [s for s in (row.get("services") or "").split(";") if s.strip()],
+                })
+        return list(segments.values())
+
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return data["housing_resources"] if isinstance(data, dict) else data
+
+
+def source_metadata(paths: list[Path]) -> dict:
+    """Descriptive metadata (version, description, ...) from the first JSON source."""
+    for path in paths:
+        if path.suffix.lower() == ".json":
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                return dict(data.get("metadata", {}))
+    return {}
+
+
+# ---------------------------------------------------------------------------
+# Normalize
+
+
+def resolve_iso3(country: str, code: str, issues: list[str]) -> Optional[str]:
+    """ISO3 for a segment from its name and code, using the visa country tables."""
+    base = code.split("_")[0]
+    by_name = COUNTRY_CODES.get(country.lower())
+    by_code = COUNTRY_CODES.get(base.lower()) if len(base) == 2 else None
+    if by_name is None and base in REGION_CODES:
+        return None
+    if by_name and by_code and by_name != by_code:
+        issues.append(f"{country} ({code}): name maps to {by_name} but code maps to {by_code}")
+    elif by_code and by_name is None:
+        issues.append(f"{country} ({code}): name not in the country tables, using {by_code}")
+    iso3 = by_name or by_code
+    if iso3 is None:
+        issues.append(f"{country} ({code}): not in the tools/visa.py country tables")
+    return iso3
+
+
+def normalize_resource(resource: dict) -> dict:
+    services = []
+    for service in resource.get("services") or []:
+        service = clean_text(service)
+        if service and service.casefold() not in {s.casefold() for s in services}:
+            services.append(service)
+    return {
+        "organization_name": clean_text(resource.get("organization_name")) or "Unknown",
+        "url": normalize_url(resource.get("url", "")),
+        "description": clean_text(resource.get("description")),
+        "resource_type": clean_text(resource.get("resource_type")) or "Unknown",
+        "services": services,
+    }
+
+
+def merge_resource(existing: dict, duplicate: dict) -> None:
+    if len(duplicate["description"]) > len(existing["description"]):
+        existing["description"] = duplicate["description"]
+    seen = {s.casefold() for s in existing["services"]}
+    existing["services"].extend(s for s in duplicate["services"] if s.casefold() not in seen)
+    if not existing["url"]:
+        existing["url"] = duplicate["url"]
+
+
+def normalize(raw_segments: list[dict], issues: list[str]) -> tuple[list[dict], int]:
+    """
+    Merge segments by country_code and deduplicate their organizations.
+
+    Returns:
+        (normalized segments in first-seen order, number of duplicates merged)
+    """
+    segments: dict[str, dict] = {}
+    keys: dict[str, dict[str, dict]] = {}
+    duplicates = 0
+
+    for raw in raw_segments:
+        country = clean_text(raw.get("country"))
+        code = clean_text(raw.get("country_code")).upper()
+        if not code:
+            iso3 = COUNTRY_CODES.get(country.lower())
+            iso2 = [k for k, v in COUNTRY_CODES.items() if v == iso3 and len(k) == 2]
+            code = iso2[0].upper() if iso2 else country.upper().replace(" ", "_")
+            issues.append(f"{country}: missing country_code, using {code}")
+
+        segment = segments.get(code)
+        if segment is None:
+            segment = segments[code] = {
+                "country": country,
+                "continent": clean_text(raw.get("continent")),
+                "country_code": code,
+                "iso3": resolve_iso3(country, code, issues),
+                "resources": [],
+            }
+            keys[code] = {}
+        seen = keys[code]
+
+        for resource in map(normalize_resource, raw.get("resources", [])):
+            match_keys = [f"org:{org_key(resource['organization_name'])}"]
+            if resource["url"]:
+                match_keys.append(f"url:{url_key(resource['url'])}")
+            existing = next((seen[k] for k in match_keys if k in seen), None)
+            if existing is not None:
+                merge_resource(existing, resource)
+                duplicates += 1
+                target = existing
+            else:
+                segment["resources"].append(resource)
+                target = resource
+            for k in match_keys:
+                seen.setdefault(k, target)
+
+    for segment in segments.values():
+        if segment["iso3"] is None:
+            del segment["iso3"]
+        for resource in segment["resources"]:
+            if not resource["url"]:
+                issues.append(f"{segment['country']}: {resource['organization_name']} has no URL")
+    return list(segments.values()), duplicates
+
+
+def record_key(segment: dict, resource: dict) -> str:
+    return f"{segment['country_code']}/{org_key(resource['organization_name'])}"
+
+
+def build_metadata(base: dict, segments: list[dict]) -> dict:
+    resources = [r for s in segments for r in s["resources"]]
+    metadata = dict(base)
+    metadata["total_countries"] = len({s["country"] for s in segments})
+    metadata["total_resources"] = len(resources)
+    metadata["continents_covered"] = list(dict.fromkeys(s["continent"] for s in segments))
+    metadata["resource_types"] = list(dict.fromkeys(r["resource_type"] for r in resources))
+    return metadata
+
+
+# ---------------------------------------------------------------------------
+# URL checks
+
+
+async def check_url(client: httpx.AsyncClient, url: str) -> dict:
+    """HEAD the URL (GET when HEAD is refused) and classify the outcome."""
+    try:
+        response = await client.head(url)
+        if response.status_code >= 400:  # Many sites refuse HEAD (403/405/501)
+            async with client.stream("GET", url) as streamed:
+                response = streamed
+        final_url = str(response.url)
+        if response.status_code >= 400:
+            status = "broken"
+        elif url_key(normalize_url(final_url)) != url_key(url):
+            status = "redirect"
+        else:
+            status = "ok"
+        return {"url_status": status, "http_status": response.status_code, "final_url": final_url}
+    except httpx.TimeoutException:
+        return {"url_status": "error", "error": "timeout"}
+    except httpx.HTTPError as e:
+        return {"url_status": "error", "error": type(e).__name__}
+
+
+async def check_urls(urls: list[str], concurrency: int) -> dict[str, dict]:
+    """Check URLs with at most `concurrency` requests in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+    checked_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+    async with httpx.AsyncClient(
+        timeout=URL_TIMEOUT_SECONDS,
+        follow_redirects=True,
+        headers={"User-Agent": USER_AGENT},
+    ) as client:
+        async def one(url: str) -> tuple[str, dict]:
+            async with semaphore:
+                return url, {**await check_url(client, url), "checked_at": checked_at}
+
+        return dict(await asyncio.gather(*(one(url) for url in urls)))
+
+
+def check_is_stale(entry: dict, recheck_days: float) -> bool:
+    checked_at = entry.get("checked_at")
+    if not checked_at:
+        return True
+    age = datetime.now(timezone.utc) - datetime.fromisoformat(checked_at)
+    return age.total_seconds() > recheck_days * 86400
+
+
+# ---------------------------------------------------------------------------
+# Output
+
+
+def write_json(path: Path, value, indent: Optional[int] = 2) -> bytes:
+    """Write atomically; returns the bytes written."""
+    payload = json.dumps(value, ensure_ascii=False, indent=indent).encode("utf-8") + b"\n"
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_bytes(payload)
+    os.replace(tmp, path)
+    return payload
+
+
+def load_manifest() -> dict:
+    try:
+        manifest = json.loads(MANIFEST_PATH.read_text(encoding="utf-8"))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"version": MANIFEST_VERSION, "records": {}}
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {"version": MANIFEST_VERSION, "records": {}}
+    return manifest
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--source", type=Path, action="append",
+                        help=f"Source JSON/CSV file (repeatable; default {DATA_PATH.name})")
+    parser.add_argument("--check-urls", action="store_true", help="Check resource URLs")
+    parser.add_argument("--concurrency", type=int, default=16, help="URL checks in flight")
+    parser.add_argument("--recheck-days", type=float, default=7.0,
+                        help="Re-check unchanged records' URLs after this many days")
+    parser.add_argument("--fail-on-broken", action="store_true",
+                        help="Exit 1 if any URL is broken or unreachable")
+    parser.add_argument("--dry-run", action="store_true", help="Report without writing files")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    sources = args.source or [DATA_PATH]
+    issues: list[str] = []
+
+    raw_segments = [segment for path in sources for segment in load_source(path)]
+    segments, duplicates = normalize(raw_segments, issues)
+
+    manifest = load_manifest()
+    previous = manifest["records"]
+    records = {}
+    changed = []
+    for segment in segments:
+        country_fields = {k: v for k, v in segment.items() if k != "resources"}
+        for resource in segment["resources"]:
+            key = record_key(segment, resource)
+            digest = sha256({**country_fields, **resource})
+            entry = previous.get(key, {})
+            if entry.get("hash") != digest:
+                changed.append(key)
+                # URL checks only carry over when the URL itself is unchanged
+                entry = {} if entry.get("url") != resource["url"] else entry
+            records[key] = {**entry, "hash": digest, "url": resource["url"]}
+    removed = sorted(set(previous) - set(records))
+
+    if args.check_urls:
+        urls = sorted({
+            r["url"] for key, r in records.items()
+            if r["url"] and (key in changed or check_is_stale(r, args.recheck_days))
+        })
+        results = asyncio.run(check_urls(urls, args.concurrency))
+        for record in records.values():
+            if record["url"] in results:
+                record.update(results[record["url"]])
+                if record["url_status"] != "error":
+                    record.pop("error", None)
+        print(f"Checked {len(urls)} URLs (concurrency {args.concurrency})")
+
+    content = [dict(segment) for segment in segments]
+    content_sha256 = sha256(content)
+    base_metadata = source_metadata(sources)
+    if content_sha256 != manifest.get("content_sha256"):
+        base_metadata["last_updated"] = date.today().isoformat()
+    dataset = {"housing_resources": content, "metadata": build_metadata(base_metadata, content)}
+
+    broken = {k: r for k, r in records.items() if r.get("url_status") in ("broken", "error")}
+    redirects = {k: r for k, r in records.items() if r.get("url_status") == "redirect"}
+
+    meta = dataset["metadata"]
+    print(
+        f"{meta['total_countries']} countries, {meta['total_resources']} resources, "
+        f"{duplicates} duplicates merged; {len(changed)} changed, {len(removed)} removed records"
+    )
+    for issue in issues:
+        print(f"  issue: {issue}")
+    for key, record in sorted(redirects.items()):
+        print(f"  redirect: {key} {record['url']} -> {record['final_url']}")
+    for key, record in sorted(broken.items()):
+        detail = record.get("http_status") or record.get("error")
+        print(f"  broken: {key} {record['url']} ({detail})")
+
+    up_to_date = (
+        not changed and not removed and not args.check_urls
+        and content_sha256 == manifest.get("content_sha256")
+        and DATA_PATH.exists() and INDEX_PATH.exists()
+    )
+    if args.dry_run or up_to_date:
+        print("Dry run; nothing written" if args.dry_run else "Up to date; nothing written")
+    else:
+        dataset_bytes = write_json(DATA_PATH, dataset)
+        write_json(INDEX_PATH, {
+            "dataset_sha256": hashlib.sha256(dataset_bytes).hexdigest(),
+            "entries": build_housing_index(dataset),
+        }, indent=None)
+        write_json(MANIFEST_PATH, {
+            "version": MANIFEST_VERSION,
+            "content_sha256": content_sha256,
+            "built_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "records": dict(sorted(records.items())),
+        })
+        print(f"Wrote {DATA_PATH.name}, {INDEX_PATH.name}, {MANIFEST_PATH.name}")
+
+    print(f"Done in {time.perf_counter() - started:.2f}s")
+    return 1 if args.fail_on_broken and broken else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""
+Import-time profile for the TRIBE agent server.
+
+Runs `python -X importtime -c "import server"` in a fresh interpreter, reports
+the slowest modules by cumulative import time and appends the result to a
+JSONL history file so startup cost can be tracked over time.
+
+Usage:
+    python scripts/profile_imports.py
+    python scripts/profile_imports.py --module agent --top 30
+    LAZY_INIT=true python scripts/profile_imports.py --fail-over-ms 800
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+AGENT_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_HISTORY = AGENT_DIR / "importtime_history.jsonl"
+
+
+def run_importtime(module: str) -> list[dict]:
+    """Import a module under -X importtime and parse the per-module timings."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=AGENT_DIR,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+    )
+    if proc.returncode != 0:
+        raise SystemExit(f"Importing {module} failed:\n{proc.stderr[-2000:]}")
+
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        # Format: "import time: <self us> | <cumulative us> | <indented module name>"
+        self_us, cumulative_us, name = line.split(":", 1)[1].split("|")
+        name = name[1:]
+        entries.append({
+            "module": name.rstrip(),
+            "depth": (len(name) - len(name.lstrip())) // 2,
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+        })
+    return entries
+
+
+def git_revision() -> str:
+    """Short commit hash of the working tree, if available."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=AGENT_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def load_last_record(history: Path, module: str) -> dict | None:
+    """Most recent history record for the same module and mode."""
+    if not history.exists():
+        return None
+    last = None
+    lazy = os.environ.get("LAZY_INIT", "false").lower() == "true"
+    for line in history.read_text().splitlines():
+        record = json.loads(line)
+        if record.get("module") == module and record.get("lazy_init") == lazy:
+            last = record
+    return last
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--module", default="server", help="Module to import (default: server)")
+    parser.add_argument("--top", type=int, default=20, help="Number of slowest modules to show")
+    parser.add_argument("--history", type=Path, default=DEFAULT_HISTORY,
+                        help="JSONL history file")
+    parser.add_argument("--no-record", action="store_true",
+                        help="Do not append to the history file")
+    parser.add_argument("--fail-over-ms", type=float,
+                        help="Exit non-zero if total import time exceeds this")
+    args = parser.parse_args()
+
+    entries = run_importtime(args.module)
+    root = next((e for e in reversed(entries) if e["module"].strip() == args.module), None)
+    total_ms = root["cumulative_ms"] if root else sum(e["self_ms"] for e in entries)
+
+    # Top-level packages are the actionable unit ("google.adk", not one of its submodules)
+    packages: dict[str, float] = {}
+    for entry in entries:
+        if entry["depth"] == 1:
+            top = entry["module"].strip().split(".")[0]
+            packages[top] = packages.get(top, 0.0) + entry["cumulative_ms"]
+
+    print(f"import {args.module}: {total_ms:.1f} ms ({len(entries)} modules)")
+    print("\nSlowest direct dependencies (cumulative):")
+    for name, ms in sorted(packages.items(), key=lambda item: item[1], reverse=True)[: args.top]:
+        print(f"  {ms:9.1f} ms  {name}")
+
+    print("\nSlowest modules (self):")
+    for entry in sorted(entries, key=lambda e: e["self_ms"], reverse=True)[: args.top]:
+        print(f"  {entry['self_ms']:9.1f} ms  {entry['module'].strip()}")
+
+    record = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "revision": git_revision(),
+        "module": args.module,
+        "lazy_init": os.environ.get("LAZY_INIT", "false").lower() == "true",
+        "python": sys.version.split()[0],
+        "total_ms": round(total_ms, 1),
+        "modules": len(entries),
+        "top_packages": {
+            name: round(ms, 1)
+            for name, ms in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:10]
+        },
+    }
+
+    previous = load_last_record(args.history, args.module)
+    if previous:
+        delta = record["total_ms"] - previous["total_ms"]
+        since = f"{previous['revision']} ({previous['timestamp'][:10]})"
+        print(f"\nChange since {since}: {delta:+.1f} ms")
+
+    if not args.no_record:
+        with open(args.history, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+    if args.fail_over_ms is not None and total_ms > args.fail_over_ms:
+        print(f"\nImport time {total_ms:.1f} ms exceeds budget of {args.fail_over_ms:.1f} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
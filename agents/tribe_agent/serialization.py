@@ -0,0 +1,106 @@
+"""
+Fast JSON encoding with a stdlib fallback
+
+API responses, log lines, cache validators and analytics events are all
+JSON. orjson (or msgspec) encodes the dict/list payloads we produce several
+times faster than the json module; both are optional, and without them the
+stdlib encoder is used with the same output settings (compact separators,
+UTF-8 rather than \\u escapes, unknown types as str).
+
+JSON_BACKEND selects the encoder: auto (default: orjson, then msgspec, then
+json), orjson, msgspec or json. An unavailable backend falls back to json.
+
+- `dumps(obj, sort_keys=False) -> bytes` and `dumps_str(obj) -> str`
+- `FastJSONResponse`: FastAPI default_response_class using `dumps`
+
+Payloads a fast backend rejects (e.g. integers beyond 64 bits) are retried
+with the json module, so switching backends never turns into a 500.
+"""
+
+import json
+import logging
+import os
+from typing import Any, Callable
+
+from starlette.responses import JSONResponse
+
+# Plain logging: logging_config itself encodes log lines with this module
+logger = logging.getLogger(__name__)
+
+JSON_BACKEND = os.environ.get("JSON_BACKEND", "auto").lower()
+
+
+def _default(value: Any) -> str:
+    return str(value)
+
+
+def _stdlib_dumps(obj: Any, sort_keys: bool = False) -> bytes:
+    return json.dumps(
+        obj, ensure_ascii=False, separators=(",", ":"), sort_keys=sort_keys, default=_default
+    ).encode("utf-8")
+
+
+def _orjson_backend() -> Callable[[Any, bool], bytes]:
+    import orjson
+
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    sorted_options = options | orjson.OPT_SORT_KEYS
+
+    def dumps(obj: Any, sort_keys: bool = False) -> bytes:
+        try:
+            option = sorted_options if sort_keys else options
+            return orjson.dumps(obj, default=_default, option=option)
+        except TypeError:
+            return _stdlib_dumps(obj, sort_keys)
+
+    return dumps
+
+
+def _msgspec_backend() -> Callable[[Any, bool], bytes]:
+    import msgspec
+
+    encoder = msgspec.json.Encoder(enc_hook=_default)
+    sorted_encoder = msgspec.json.Encoder(enc_hook=_default, order="sorted")
+
+    def dumps(obj: Any, sort_keys: bool = False) -> bytes:
+        try:
+            return (sorted_encoder if sort_keys else encoder).encode(obj)
+        except (TypeError, OverflowError, msgspec.EncodeError):
+            return _stdlib_dumps(obj, sort_keys)
+
+    return dumps
+
+
+_BACKENDS = {"orjson": _orjson_backend, "msgspec": _msgspec_backend}
+
+
+def _select_backend() -> tuple[str, Callable[[Any, bool], bytes]]:
+    candidates = ["orjson", "msgspec"] if JSON_BACKEND == "auto" else [JSON_BACKEND]
+    for name in candidates:
+        if name not in _BACKENDS:
+            continue
+        try:
+            return name, _BACKENDS[name]()
+        except ImportError:
+            if JSON_BACKEND != "auto":
+                logger.warning(f"JSON_BACKEND={name} is not installed; using json")
+    return "json", _stdlib_dumps
+
+
+BACKEND, _dumps = _select_backend()
+
+
+def dumps(obj: Any, sort_keys: bool = False) -> bytes:
+    """Encode obj as compact UTF-8 JSON."""
+    return _dumps(obj, sort_keys)
+
+
+def dumps_str(obj: Any, sort_keys: bool = False) -> str:
+    return _dumps(obj, sort_keys).decode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with the fastest available encoder."""
+
+    def render(self, content: Any) -> bytes:
+        return _dumps(content, False)
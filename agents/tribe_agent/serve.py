@@ -0,0 +1,257 @@
+"""
+TRIBE ADK Agent - Preforked Production Server
+
+Loads the application and its immutable data (housing index, country code
+tables, the ADK agent definition) once in a master process, then forks
+uvicorn workers that share that memory copy-on-write and accept connections
+from one listening socket. The master restarts workers that die and forwards
+SIGTERM/SIGINT for graceful shutdown.
+
+Usage:
+    python serve.py                      # workers sized from available CPUs
+    python serve.py --workers 4
+    WEB_CONCURRENCY=2 python serve.py
+
+Several workers need state shared between them: SESSION_DB_URL, or a
+conversation whose requests land on different workers loses its history, and
+CACHE_BACKEND=shared, or /internal/invalidate only evicts from the worker that
+received it. Without both, 'auto' runs one worker and an explicit count above
+one is refused (--allow-per-worker-state overrides this for stateless
+benchmarks).
+
+With LAZY_INIT=true only the app module is imported before forking; each
+worker builds the ADK stack in its background warm-up task, so the port is
+bound as quickly as with plain uvicorn.
+"""
+
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Load environment variables BEFORE importing server (tools read env at import time)
+load_dotenv()
+
+from logging_config import get_logger  # noqa: E402
+
+logger = get_logger(__name__)
+
+# Don't respawn a worker more often than this, to avoid crash loops
+RESPAWN_BACKOFF_SECONDS = 1.0
+
+
+def available_cpus() -> int:
+    """
+    CPUs this process may actually use.
+
+    Honors CPU affinity and cgroup v2 quotas (Cloud Run and Docker --cpus set
+    cpu.max), which os.cpu_count() ignores.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    cpu_max = Path("/sys/fs/cgroup/cpu.max")
+    try:
+        quota, period = cpu_max.read_text().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, int(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+
+    return max(1, cpus)
+
+
+def missing_shared_state() -> list[str]:
+    """Settings that must be present before requests can move between workers."""
+    import cache
+
+    missing = []
+    if not os.environ.get("SESSION_DB_URL"):
+        missing.append("SESSION_DB_URL")
+    if cache.CACHE_BACKEND != "shared":
+        missing.append("CACHE_BACKEND=shared")
+    return missing
+
+
+def resolve_workers(requested: str, missing: list[str] = ()) -> int:
+    """
+    Resolve a worker count from 'auto' or an explicit number.
+
+    With shared state `missing`, 'auto' means one worker and more are refused.
+
+    Raises:
+        ValueError: More than one worker was requested without shared state
+    """
+    if requested == "auto":
+        return 1 if missing else available_cpus()
+    workers = max(1, int(requested))
+    if workers > 1 and missing:
+        raise ValueError(
+            f"{workers} workers need {' and '.join(missing)}: sessions and caches are "
+            "otherwise per worker, so conversations lose history when requests change "
+            "workers and invalidations only reach one worker"
+        )
+    return workers
+
+
+def preload():
+    """Import the app and build shared read-only data before forking."""
+    start_time = time.perf_counter()
+
+    import server
+    import warmup
+
+    # In lazy mode the ADK stack is left to each worker's warm-up task, so the
+    # port is bound without waiting for it (the point of LAZY_INIT on Cloud Run)
+    if not warmup.LAZY_INIT:
+        warmup.load_heavy_modules()
+
+    # Move everything allocated so far out of the GC's tracked generations so
+    # collections in workers don't touch (and copy) the shared pages
+    gc.collect()
+    gc.freeze()
+
+    logger.info(
+        "Preloaded application before fork",
+        extra={"duration_ms": round((time.perf_counter() - start_time) * 1000, 2)},
+    )
+    return server.app
+
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    """Create the listening socket shared by all workers."""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app, sock: socket.socket) -> None:
+    """Serve the preloaded app on the inherited socket (runs in a child)."""
+    import uvicorn
+
+    # Drop the master's handlers; uvicorn installs its own for graceful shutdown
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+    config = uvicorn.Config(
+        app,
+        log_config=None,  # Keep the JSON logging configured by server.py
+        proxy_headers=True,
+        forwarded_allow_ips="*",
+        timeout_graceful_shutdown=30,
+    )
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+class Master:
+    """Forks and supervises the worker processes."""
+
+    def __init__(self, app, sock: socket.socket, workers: int):
+        self.app = app
+        self.sock = sock
+        self.workers = workers
+        self.children: dict[int, float] = {}  # pid -> start time
+        self.stopping = False
+
+    def spawn(self) -> None:
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                run_worker(self.app, self.sock)
+            except BaseException:
+                logger.exception("Worker crashed")
+                code = 1
+            finally:
+                os._exit(code)
+        self.children[pid] = time.monotonic()
+        logger.info("Worker started", extra={"pid": pid})
+
+    def stop(self, signum, frame) -> None:
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self) -> int:
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        for _ in range(self.workers):
+            self.spawn()
+
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+
+            started_at = self.children.pop(pid, None)
+            if started_at is None:
+                continue
+
+            if not self.stopping:
+                logger.warning(
+                    "Worker exited unexpectedly, restarting",
+                    extra={"pid": pid, "status": os.waitstatus_to_exitcode(status)},
+                )
+                uptime = time.monotonic() - started_at
+                if uptime < RESPAWN_BACKOFF_SECONDS:
+                    time.sleep(RESPAWN_BACKOFF_SECONDS - uptime)
+                self.spawn()
+
+        logger.info("All workers stopped")
+        return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run the TRIBE agent with preforked workers")
+    parser.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 8000)))
+    parser.add_argument(
+        "--workers",
+        default=os.environ.get("WEB_CONCURRENCY", "auto"),
+        help="Number of worker processes, or 'auto' to use available CPUs (default)",
+    )
+    parser.add_argument(
+        "--allow-per-worker-state",
+        action="store_true",
+        help="Allow several workers without shared sessions and caches (benchmarks only)",
+    )
+    args = parser.parse_args()
+
+    missing = [] if args.allow_per_worker_state else missing_shared_state()
+    try:
+        workers = resolve_workers(args.workers, missing)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.workers == "auto" and missing and available_cpus() > 1:
+        logger.warning(f"{' and '.join(missing)} not set; running a single worker")
+    app = preload()
+    sock = bind_socket(args.host, args.port)
+
+    logger.info(
+        f"Serving on {args.host}:{args.port} with {workers} worker(s)",
+        extra={"workers": workers},
+    )
+    return Master(app, sock, workers).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
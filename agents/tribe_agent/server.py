@@ -5,24 +5,37 @@ FastAPI server exposing the ADK agent via AG-UI protocol.
 Designed to be consumed by CopilotKit in the Next.js frontend.
 """
 
+import asyncio
+import hashlib
+import hmac
 import os
 import time
-import uuid
 from contextlib import asynccontextmanager
 from typing import Optional
 
 from dotenv import load_dotenv
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, ValidationError
 
 # Load environment variables BEFORE importing agent (tools read env at import time)
 load_dotenv()
 
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from ag_ui_adk import ADKAgent, add_adk_fastapi_endpoint
-
-from agent import tribe_agent
+from fastapi.responses import PlainTextResponse
+
+import analytics
+import cache
+import cache_warmer
+import deadline
+import http_cache
+import idempotency
+import loop_monitor
+import metrics
+import profiler
+import serialization
+import warmup
 from logging_config import setup_logging, get_logger
+from request_logging import RequestLoggingMiddleware
 
 # Setup structured logging
 log_level = os.environ.get("LOG_LEVEL", "INFO")
@@ -34,7 +47,25 @@ logger = get_logger(__name__)
 async def lifespan(app: FastAPI):
     """Application lifespan handler."""
     logger.info("Starting TRIBE ADK Agent", extra={"environment": os.environ.get("ENVIRONMENT", "development")})
+
+    monitor_task = loop_monitor.start()
+    analytics_task = analytics.start()
+
+    # In lazy mode, build the agent in the background so /health answers immediately
+    warmup_task = None
+    if warmup.LAZY_INIT:
+        warmup_task = asyncio.create_task(warmup.warm_up())
+
+    # Keep the busiest corridors' visa data cached ahead of user requests
+    warmer_task = cache_warmer.start()
+
     yield
+
+    if warmup_task and not warmup_task.done():
+        warmup_task.cancel()
+    cache_warmer.stop(warmer_task)
+    loop_monitor.stop(monitor_task)
+    await analytics.stop(analytics_task)
     logger.info("Shutting down TRIBE ADK Agent")
 
 
@@ -44,6 +75,7 @@ app = FastAPI(
     description="Migration assistance agent powered by Google Gemini",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=serialization.FastJSONResponse,
 )
 
 # CORS configuration - allow all origins for API endpoints
@@ -57,55 +89,22 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# Each AG-UI turn gets a time budget shared by its model and tool calls
+app.add_middleware(deadline.DeadlineMiddleware)
 
-# Request logging middleware
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    """Log all HTTP requests with timing information."""
-    request_id = str(uuid.uuid4())[:8]
-    start_time = time.time()
-
-    # Log request start
-    logger.info(
-        f"Request started: {request.method} {request.url.path}",
-        extra={
-            "request_id": request_id,
-            "path": str(request.url.path),
-            "method": request.method,
-        }
-    )
-
-    response = await call_next(request)
-
-    # Calculate duration
-    duration_ms = (time.time() - start_time) * 1000
-
-    # Log request completion
-    logger.info(
-        f"Request completed: {response.status_code}",
-        extra={
-            "request_id": request_id,
-            "status": response.status_code,
-            "duration_ms": round(duration_ms, 2),
-        }
-    )
-
-    # Add request ID to response headers for tracing
-    response.headers["X-Request-ID"] = request_id
-    return response
+# Retried POSTs with an Idempotency-Key attach to or replay the original response
+app.add_middleware(idempotency.IdempotencyMiddleware)
 
+# Request logging with X-Request-ID (pure ASGI; does not buffer the SSE stream)
+app.add_middleware(RequestLoggingMiddleware)
 
-# Wrap the ADK agent for AG-UI protocol
-adk_agent = ADKAgent(
-    adk_agent=tribe_agent,
-    app_name="tribe_ai",
-    user_id="default_user",  # Will be overridden by CopilotKit context
-    session_timeout_seconds=3600,
-    use_in_memory_services=True,
-)
 
 # Mount AG-UI endpoint at /agui
-add_adk_fastapi_endpoint(app, adk_agent, path="/agui")
+# In lazy mode the ADK stack is imported by the warm-up task instead of here
+if warmup.LAZY_INIT:
+    warmup.mount_lazy_agui(app)
+else:
+    warmup.mount_agui(app)
 
 
 @app.get("/")
@@ -122,16 +121,34 @@ async def root():
 
 @app.get("/health")
 async def health():
-    """Health check endpoint for monitoring."""
+    """Liveness check - the process is up, even if the agent is still warming up."""
     return {
         "status": "ok",
         "agent": "tribe_agent",
         "model": "gemini-2.5-flash",
         "environment": os.environ.get("ENVIRONMENT", "development"),
         "version": "2024-12-31-v8",  # Track deployment version - removed ADK live_search tool, use frontend tool
+        **warmup.readiness(),
+        "event_loop": loop_monitor.status(),
     }
 
 
+@app.get("/health/ready")
+async def health_ready():
+    """Readiness check - 503 until the agent can serve AG-UI requests."""
+    readiness = warmup.readiness()
+    return serialization.FastJSONResponse(
+        status_code=200 if readiness["ready"] else 503,
+        content={"status": "ready" if readiness["ready"] else "warming_up", **readiness},
+    )
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Per-worker metrics in Prometheus text format."""
+    return metrics.render()
+
+
 @app.get("/debug/env")
 async def debug_env():
     """Debug endpoint to check which env vars are set (not values)."""
@@ -171,6 +188,43 @@ async def test_search():
         }
 
 
+# Bearer token for /debug/profile; the profiler is disabled when unset
+DEBUG_TOKEN = os.environ.get("DEBUG_TOKEN", "")
+
+
+@app.get("/debug/profile", response_class=PlainTextResponse)
+async def debug_profile(
+    request: Request,
+    seconds: float = 10.0,
+    mode: str = "cpu",
+    interval_ms: float = 10.0,
+    top: int = 25,
+):
+    """
+    Profile this worker for `seconds` (max 60) under live traffic.
+
+    mode=cpu returns collapsed stacks of all threads and asyncio tasks
+    (flamegraph.pl / speedscope input); mode=alloc returns the top `top`
+    allocation sites by growth (tracemalloc snapshot diff). Requires
+    'Authorization: Bearer <DEBUG_TOKEN>'.
+    """
+    if not DEBUG_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    authorization = request.headers.get("authorization", "")
+    if not hmac.compare_digest(authorization.encode(), f"Bearer {DEBUG_TOKEN}".encode()):
+        raise HTTPException(status_code=401, detail="Invalid debug token")
+
+    try:
+        if mode == "cpu":
+            stacks, samples = await profiler.profile_cpu(seconds, max(interval_ms, 1.0) / 1000)
+            return PlainTextResponse(stacks, headers={"X-Profile-Samples": str(samples)})
+        if mode == "alloc":
+            return await profiler.profile_allocations(seconds, top)
+    except profiler.ProfilerBusy:
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    raise HTTPException(status_code=422, detail="mode must be 'cpu' or 'alloc'")
+
+
 # ============================================
 # API Endpoints for Frontend Tool Calls
 # ============================================
@@ -199,9 +253,212 @@ async def api_live_search(request: LiveSearchRequest):
     )
 
     result = await search_live_data(request.query, request.target_country)
+    analytics.emit(
+        "api_lookup",
+        endpoint="live_search",
+        target_country=request.target_country,
+        ok=bool(result.get("success")),
+        cached=result.get("cached"),
+    )
     return result
 
 
+# Browser/CDN freshness for the direct lookups; Convex invalidations reach
+# clients within max-age, stale copies are served while revalidating
+API_CACHE_MAX_AGE = int(os.environ.get("API_CACHE_MAX_AGE", 300))
+API_CACHE_STALE_SECONDS = int(os.environ.get("API_CACHE_STALE_SECONDS", 3600))
+
+# Per-request upstream details that would change the ETag without changing the answer
+_VISA_VOLATILE_FIELDS = ("cached", "quotaRemaining")
+
+
+@app.get("/api/housing")
+async def api_housing(
+    request: Request,
+    country: Optional[str] = None,
+    continent: Optional[str] = None,
+    resource_type: Optional[str] = None,
+    detail: str = "standard",
+    overview: bool = False,
+):
+    """
+    Housing resources for frontend cards, without an LLM turn.
+
+    Same filters and detail levels as the search_housing_resources tool.
+    With overview=true, returns the get_housing_overview facet counts for the
+    country or continent instead (404 when neither is covered).
+    Responses carry a strong ETag and Cache-Control for browsers and CDNs.
+    """
+    from tools.housing import get_housing_overview, search_housing_resources
+
+    if overview:
+        result = await get_housing_overview(continent, country)
+        analytics.emit(
+            "api_lookup",
+            endpoint="housing_overview",
+            country=country,
+            continent=continent,
+            total_found=result.get("total_resources"),
+        )
+        if result.get("error"):
+            return http_cache.error_response(404, result)
+    else:
+        result = await search_housing_resources(country, continent, resource_type, detail)
+        analytics.emit(
+            "api_lookup",
+            endpoint="housing",
+            country=country,
+            continent=continent,
+            resource_type=resource_type,
+            total_found=result.get("total_found"),
+        )
+    return http_cache.cached_json_response(
+        request, result, API_CACHE_MAX_AGE, API_CACHE_STALE_SECONDS
+    )
+
+
+@app.get("/api/visa")
+async def api_visa(
+    request: Request,
+    origin: str,
+    destination: str,
+    detail: str = "standard",
+    processing_times: bool = False,
+):
+    """
+    Visa requirements for a corridor, without an LLM turn.
+
+    Same result as the search_visa_options tool. Unknown countries return
+    400 with suggestions; upstream failures return 502/503 and are not cached.
+    """
+    from tools import visa
+
+    for field, country in (("origin", origin), ("destination", destination)):
+        _, error = visa.normalize_country_code(country)
+        if error:
+            return http_cache.error_response(400, {
+                "error": True,
+                "message": f"Invalid {field} country: {error}",
+                "suggestions": visa.get_country_suggestions(country) or None,
+            })
+    if not visa.CONVEX_SITE_URL:
+        return http_cache.error_response(503, {
+            "error": True,
+            "message": "Visa search is not configured.",
+        })
+
+    result = await visa.search_visa_options(origin, destination, processing_times, detail)
+    analytics.emit(
+        "api_lookup",
+        endpoint="visa",
+        origin=result.get("origin", origin),
+        destination=result.get("destination", destination),
+        ok=not result.get("error"),
+        cached=result.get("cached"),
+    )
+    if result.get("error"):
+        return http_cache.error_response(502, result)
+
+    result = {k: v for k, v in result.items() if k not in _VISA_VOLATILE_FIELDS}
+    if isinstance(result.get("processingTime"), dict):
+        result["processingTime"] = {
+            k: v for k, v in result["processingTime"].items() if k not in _VISA_VOLATILE_FIELDS
+        }
+    return http_cache.cached_json_response(
+        request, result, API_CACHE_MAX_AGE, API_CACHE_STALE_SECONDS
+    )
+
+
+# ============================================
+# Internal Endpoints (called by Convex)
+# ============================================
+
+# Shared secret for signing invalidation webhooks; the endpoint is disabled when unset
+INVALIDATION_SECRET = os.environ.get("INVALIDATION_SECRET", "")
+
+# Reject signed requests older than this to limit replay
+SIGNATURE_MAX_AGE_SECONDS = 300
+
+
+class InvalidationRequest(BaseModel):
+    """Request model for cache invalidation. Any combination of selectors may be given."""
+    # e.g. ["visa", "user_context", "live_search"]; default all
+    namespaces: Optional[list[str]] = None
+    keys: list[str] = Field(default_factory=list)
+    prefixes: list[str] = Field(default_factory=list)
+    # e.g. "corridor:<id>", "iso3:NGA:CAN", "country:CAN"
+    tags: list[str] = Field(default_factory=list)
+
+
+def verify_signature(body: bytes, timestamp: str, signature: str) -> bool:
+    """
+    Verify an HMAC-SHA256 webhook signature.
+
+    The signed message is '<timestamp>.<raw body>' and the header value is
+    'sha256=<hex digest>', computed with INVALIDATION_SECRET.
+    """
+    try:
+        age = abs(time.time() - int(timestamp))
+    except ValueError:
+        return False
+    if age > SIGNATURE_MAX_AGE_SECONDS:
+        return False
+
+    expected = hmac.new(
+        INVALIDATION_SECRET.encode("utf-8"),
+        timestamp.encode("utf-8") + b"." + body,
+        hashlib.sha256,
+    ).hexdigest()
+    return hmac.compare_digest(f"sha256={expected}", signature)
+
+
+@app.post("/internal/invalidate")
+async def internal_invalidate(request: Request):
+    """
+    Evict cached tool results after upstream data changes.
+
+    Convex calls this when a user's todos change (tag 'corridor:<id>') or a
+    corridor's visa data is refreshed (tag 'iso3:<origin>:<destination>'), so
+    caches can use long TTLs without serving stale data. Requests must carry
+    X-Tribe-Timestamp and X-Tribe-Signature headers (see verify_signature).
+    """
+    if not INVALIDATION_SECRET:
+        raise HTTPException(status_code=503, detail="Cache invalidation is not configured")
+
+    body = await request.body()
+    if not verify_signature(
+        body,
+        request.headers.get("x-tribe-timestamp", ""),
+        request.headers.get("x-tribe-signature", ""),
+    ):
+        raise HTTPException(status_code=401, detail="Invalid signature")
+
+    try:
+        invalidation = InvalidationRequest.model_validate_json(body or b"{}")
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors())
+    try:
+        evicted = cache.invalidate(
+            namespaces=invalidation.namespaces,
+            keys=invalidation.keys,
+            prefixes=invalidation.prefixes,
+            tags=invalidation.tags,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    logger.info(
+        "Cache invalidated",
+        extra={
+            "keys": invalidation.keys,
+            "prefixes": invalidation.prefixes,
+            "tags": invalidation.tags,
+            "evicted": evicted,
+        },
+    )
+    return {"success": True, "evicted": evicted}
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -0,0 +1,47 @@
+"""The analytics sink writes everything on stop, one write at a time."""
+
+import asyncio
+import gzip
+import json
+import threading
+import time
+
+import analytics
+
+
+async def test_stop_flushes_after_the_write_in_progress(tmp_path, monkeypatch):
+    monkeypatch.setattr(analytics, "ANALYTICS_DIR", str(tmp_path))
+    monkeypatch.setattr(analytics, "ANALYTICS_FLUSH_SECONDS", 60)
+    writing, max_writing = 0, 0
+    lock = threading.Lock()
+    write = analytics.RotatingGzipWriter.write
+
+    def slow_write(self, events):
+        nonlocal writing, max_writing
+        with lock:
+            writing += 1
+            max_writing = max(max_writing, writing)
+        time.sleep(0.1)
+        write(self, events)
+        with lock:
+            writing -= 1
+
+    monkeypatch.setattr(analytics.RotatingGzipWriter, "write", slow_write)
+
+    task = analytics.start()
+    for i in range(3):
+        analytics.emit("tool_call", n=i)
+    analytics._wakeup.set()
+    await asyncio.sleep(0.02)  # The first batch is being written in a thread
+    for i in range(3, 5):
+        analytics.emit("tool_call", n=i)
+
+    await analytics.stop(task)
+
+    assert max_writing == 1
+    assert not analytics._buffer
+    events = []
+    for path in sorted(tmp_path.glob("events-*.jsonl.gz")):
+        with gzip.open(path, "rt") as f:
+            events += [json.loads(line) for line in f]
+    assert [e["n"] for e in events] == [0, 1, 2, 3, 4]
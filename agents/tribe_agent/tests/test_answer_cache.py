@@ -0,0 +1,87 @@
+"""The answer cache must only store real answers."""
+
+from types import SimpleNamespace
+
+import pytest
+from google.adk.models import LlmResponse
+from google.genai import types
+
+import answer_cache
+import cache
+import deadline
+
+
+@pytest.fixture
+def stored(monkeypatch):
+    calls = []
+    monkeypatch.setattr(answer_cache.answer_cache, "store", lambda *args: calls.append(args))
+    return calls
+
+
+def _finish_turn(response: LlmResponse) -> None:
+    context = SimpleNamespace(invocation_id="inv-1")
+    answer_cache._pending["inv-1"] = {
+        "question": "what do I need to move to canada",
+        "scope": ("NGA-CAN", "planning", "en"),
+        "cacheable": True,
+        "tags": set(),
+    }
+    answer_cache.after_model_callback(context, response)
+
+
+def test_stores_final_answer(stored):
+    text = "You will need a work permit or permanent residence."
+    _finish_turn(LlmResponse(content=types.Content(role="model", parts=[types.Part(text=text)])))
+    assert len(stored) == 1
+
+
+def test_degraded_answer_is_not_stored(stored):
+    _finish_turn(deadline._degraded_response())
+    assert stored == []
+
+
+def test_degraded_text_without_error_code_is_not_stored(stored):
+    part = types.Part(text=deadline.DEGRADED_ANSWER)
+    _finish_turn(LlmResponse(content=types.Content(role="model", parts=[part])))
+    assert stored == []
+
+
+def test_invalidating_a_corridor_drops_its_answers():
+    store = answer_cache.AnswerCache(max_entries=8)
+    scope = ("Nigeria→Canada", "planning", "en")
+    question = "what documents do I need for a work visa"
+    store.store(question, scope, "A passport and a job offer.", ["iso3:NGA:CAN"])
+    store.store("how do I rent a flat in toronto", scope, "Start with Padmapper.")
+    assert store.lookup(question, scope) is not None
+
+    evicted = cache.invalidate(namespaces=["answer"], tags=["iso3:NGA:CAN"])
+
+    assert evicted == {"answer": 1}
+    assert store.lookup(question, scope) is None
+    assert store.lookup("how do I rent a flat in toronto", scope) is not None
+
+
+def test_answers_are_tagged_with_the_data_they_used(stored):
+    context = SimpleNamespace(
+        invocation_id="inv-2",
+        state={"corridor": {"origin": "Nigeria", "destination": "Canada", "_id": "c1"}},
+    )
+    answer_cache._pending["inv-2"] = {
+        "question": "what do I need to move to canada",
+        "scope": ("Nigeria→Canada", "planning", "en"),
+        "cacheable": True,
+        "tags": answer_cache._scope_tags(context),
+    }
+    calls = [
+        types.FunctionCall(name="search_visa_options", args={"origin": "NG", "destination": "DE"}),
+        types.FunctionCall(name="search_live_data", args={"query": "x", "target_country": "CA"}),
+    ]
+    answer_cache.after_model_callback(context, LlmResponse(content=types.Content(
+        role="model", parts=[types.Part(function_call=call) for call in calls]
+    )))
+    text = types.Part(text="You will need a work permit.")
+    answer_cache.after_model_callback(
+        context, LlmResponse(content=types.Content(role="model", parts=[text]))
+    )
+
+    assert stored[0][3] == {"iso3:NGA:CAN", "corridor:c1", "iso3:NGA:DEU", "country:CAN"}
@@ -0,0 +1,135 @@
+"""A batch of function calls from one model response runs concurrently."""
+
+import asyncio
+import time
+from typing import AsyncGenerator
+
+import pytest
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.adk.runners import InMemoryRunner
+from google.adk.tools import FunctionTool
+from google.genai import types
+
+import answer_cache
+from agent import tribe_agent
+from tools import batching
+
+DELAYS = {"search_visa_options": 0.8, "search_housing_resources": 0.3, "get_user_context": 0.5}
+
+
+async def search_visa_options(origin: str, destination: str) -> dict:
+    """Stub visa search."""
+    await asyncio.sleep(DELAYS["search_visa_options"])
+    return {"success": True}
+
+
+async def search_housing_resources(country: str) -> dict:
+    """Stub housing search."""
+    await asyncio.sleep(DELAYS["search_housing_resources"])
+    return {"total_found": 0, "results": []}
+
+
+async def get_user_context(corridor_id: str, tool_context=None) -> dict:
+    """Stub user context."""
+    await asyncio.sleep(DELAYS["get_user_context"])
+    return {"success": True}
+
+
+CALLS = [
+    ("search_visa_options", {"origin": "NGA", "destination": "CAN"}),
+    ("search_housing_resources", {"country": "Canada"}),
+    ("get_user_context", {"corridor_id": "c1"}),
+]
+
+
+class FakeGemini(BaseLlm):
+    """Requests all three tools in one response, then answers."""
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        parts = llm_request.contents[-1].parts or []
+        if any(p.function_response for p in parts):
+            yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text="done")]))
+            return
+        calls = [
+            types.Part(function_call=types.FunctionCall(id=f"call-{i}", name=name, args=args))
+            for i, (name, args) in enumerate(CALLS)
+        ]
+        yield LlmResponse(content=types.Content(role="model", parts=calls))
+
+
+async def _batch_wall(concurrency: int, monkeypatch) -> tuple[float, list[str]]:
+    monkeypatch.setattr(batching, "TOOL_CONCURRENCY", concurrency)
+    agent = tribe_agent.clone(update={
+        "model": FakeGemini(model="fake"),
+        "tools": [
+            FunctionTool(batching.batched(search_visa_options)),
+            FunctionTool(batching.batched(search_housing_resources)),
+            FunctionTool(batching.batched(get_user_context)),
+        ],
+    })
+    runner = InMemoryRunner(agent=agent, app_name="test")
+    session = await runner.session_service.create_session(app_name="test", user_id="u1")
+
+    message = types.Content(role="user", parts=[types.Part(text="Plan my NGA to CAN move")])
+    calls_at = responses_at = None
+    order: list[str] = []
+    async for event in runner.run_async(user_id="u1", session_id=session.id, new_message=message):
+        if event.get_function_calls():
+            calls_at = time.perf_counter()
+        if event.get_function_responses():
+            responses_at = time.perf_counter()
+            order = [r.name for r in event.get_function_responses()]
+    return responses_at - calls_at, order
+
+
+@pytest.fixture(autouse=True)
+def no_answer_cache(monkeypatch):
+    monkeypatch.setattr(answer_cache, "ANSWER_CACHE_ENABLED", False)
+
+
+async def test_batch_takes_the_slowest_call_not_the_sum(monkeypatch):
+    wall, order = await _batch_wall(4, monkeypatch)
+
+    assert max(DELAYS.values()) <= wall < 1.2  # 0.8s, not the 1.6s sum
+    assert order == [name for name, _ in CALLS]
+
+
+async def test_concurrency_one_runs_the_batch_sequentially(monkeypatch):
+    wall, _ = await _batch_wall(1, monkeypatch)
+
+    assert wall >= sum(DELAYS.values())
+
+
+def test_turn_state_evicts_least_recently_used(monkeypatch):
+    monkeypatch.setattr(batching, "_turns", batching.OrderedDict())
+    monkeypatch.setattr(batching, "_TURNS_MAX", 3)
+    running = batching._turn("a")
+    batching._turn("b")
+    batching._turn("c")
+    assert batching._turn("a") is running  # Still running: touched again
+
+    batching._turn("d")
+
+    assert list(batching._turns) == ["c", "a", "d"]
+
+
+async def test_failed_turn_drops_its_state(monkeypatch):
+    async def search_visa_options(origin: str, destination: str) -> dict:
+        """Stub visa search that fails."""
+        raise RuntimeError("upstream exploded")
+
+    agent = tribe_agent.clone(update={
+        "model": FakeGemini(model="fake"),
+        "tools": [FunctionTool(batching.batched(search_visa_options))],
+    })
+    runner = InMemoryRunner(agent=agent, app_name="test")
+    session = await runner.session_service.create_session(app_name="test", user_id="u1")
+    message = types.Content(role="user", parts=[types.Part(text="Plan my NGA to CAN move")])
+
+    with pytest.raises(RuntimeError):
+        async for _ in runner.run_async(user_id="u1", session_id=session.id, new_message=message):
+            pass
+
+    assert batching._turns == {}
@@ -0,0 +1,113 @@
+"""URL checks in the housing build: bounded concurrency, unchanged records skipped."""
+
+import csv
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from scripts import build_housing_data as build
+
+
+class StubSite:
+    """Local HTTP server answering 200 after a delay; records requests in flight."""
+
+    def __init__(self, delay: float = 0.1):
+        self.delay = delay
+        self.requests: Counter[str] = Counter()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _answer(self, body: bool) -> None:
+                with site._lock:
+                    site.requests[self.path] += 1
+                    site.in_flight += 1
+                    site.max_in_flight = max(site.max_in_flight, site.in_flight)
+                time.sleep(site.delay)
+                with site._lock:
+                    site.in_flight -= 1
+                self.send_response(200)
+                self.send_header("Content-Length", "2")
+                self.end_headers()
+                if body:
+                    self.wfile.write(b"ok")
+
+            def do_HEAD(self):
+                self._answer(body=False)
+
+            def do_GET(self):
+                self._answer(body=True)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def site():
+    stub = StubSite()
+    yield stub
+    stub.close()
+
+
+@pytest.fixture
+def build_paths(tmp_path, monkeypatch):
+    monkeypatch.setattr(build, "DATA_PATH", tmp_path / "migrant_housing_resources.json")
+    monkeypatch.setattr(build, "INDEX_PATH", tmp_path / "migrant_housing_index.json")
+    monkeypatch.setattr(build, "MANIFEST_PATH", tmp_path / "housing_build_manifest.json")
+    return tmp_path
+
+
+def _write_source(path, site: StubSite, descriptions: list[str]) -> None:
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["country", "continent", "country_code", "organization_name", "url",
+                         "description", "resource_type", "services"])
+        for i, description in enumerate(descriptions):
+            writer.writerow(["Canada", "North America", "CA", f"Org {i}", f"{site.url}/org-{i}",
+                             description, "Settlement", "Housing search"])
+
+
+def _run_build(monkeypatch, source) -> int:
+    monkeypatch.setattr("sys.argv", [
+        "build_housing_data.py", "--source", str(source), "--check-urls", "--concurrency", "2",
+    ])
+    return build.main()
+
+
+async def test_check_urls_bounds_requests_in_flight(site):
+    urls = [f"{site.url}/page-{i}" for i in range(8)]
+
+    results = await build.check_urls(urls, concurrency=3)
+
+    assert site.max_in_flight == 3
+    assert sum(site.requests.values()) == 8
+    assert {r["url_status"] for r in results.values()} == {"ok"}
+
+
+def test_rebuild_checks_only_changed_records(site, build_paths, monkeypatch):
+    source = build_paths / "source.csv"
+    _write_source(source, site, ["First", "Second", "Third"])
+    assert _run_build(monkeypatch, source) == 0
+    assert site.requests == {"/org-0": 1, "/org-1": 1, "/org-2": 1}
+    assert site.max_in_flight <= 2
+
+    site.requests.clear()
+    assert _run_build(monkeypatch, source) == 0
+    assert site.requests == {}
+
+    _write_source(source, site, ["First", "Second, updated", "Third"])
+    assert _run_build(monkeypatch, source) == 0
+    assert site.requests == {"/org-1": 1}
@@ -0,0 +1,61 @@
+"""Cache tag bookkeeping and invalidation."""
+
+import sqlite3
+import time
+
+import pytest
+
+import cache
+from cache import SharedCache
+
+
+@pytest.fixture
+def shared(tmp_path):
+    return SharedCache("visa", max_entries=3, default_ttl=60, path=tmp_path / "cache.sqlite3")
+
+
+def _tag_rows(shared: SharedCache) -> int:
+    conn = sqlite3.connect(shared.path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM cache_tags").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_trim_removes_tag_rows(shared):
+    for i in range(10):
+        shared.set(f"k{i}", i, tags=[f"tag:{i}", "all"])
+    assert len(shared) == 3
+    assert _tag_rows(shared) == 6
+
+
+def test_expiry_removes_tag_rows(shared):
+    shared.set("old", 1, ttl=0.01, tags=["a", "b"])
+    time.sleep(0.02)
+    shared.set("new", 2, tags=["c"])
+    assert _tag_rows(shared) == 1
+
+
+def test_delete_and_invalidate_remove_all_tag_rows(shared):
+    shared.max_entries = 10
+    shared.set("a", 1, tags=["x", "y"])
+    shared.set("b", 2, tags=["x"])
+    shared.set("c", 3, tags=["z"])
+    shared.set("pre:1", 4, tags=["p"])
+    assert shared.invalidate_tag("x") == 2
+    assert shared.get("a") is None and shared.get("c") == 3
+    assert shared.delete("c")
+    assert shared.delete_prefix("pre:") == 1
+    assert _tag_rows(shared) == 0
+
+
+def test_invalidate_rejects_unknown_namespace():
+    with pytest.raises(ValueError, match="nope"):
+        cache.invalidate(namespaces=["visa", "nope"], tags=["x"])
+    assert "nope" not in cache._caches
+
+
+def test_invalidate_known_namespace_not_created_yet(monkeypatch):
+    monkeypatch.setattr(cache, "_caches", {})
+    assert cache.invalidate(namespaces=["live_search"], tags=["x"]) == {"live_search": 0}
+    assert cache._caches == {}
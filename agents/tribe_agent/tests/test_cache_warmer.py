@@ -0,0 +1,52 @@
+"""Which corridors the cache warmer refreshes, and which it learns."""
+
+import collections
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import cache_warmer
+from cache import MemoryCache
+from tools import visa
+
+
+@pytest.fixture
+def fake_visa():
+    return SimpleNamespace(
+        visa_cache=MemoryCache("visa", default_ttl=3600),
+        requirements_key=visa.requirements_key,
+    )
+
+
+def test_entry_filled_elsewhere_is_fresh_until_close_to_expiry(fake_visa, monkeypatch):
+    monkeypatch.setattr(cache_warmer, "WARM_REFRESH_AHEAD_SECONDS", 600)
+    corridor = ("NGA", "CAN")
+    now = time.time()
+    assert cache_warmer._is_due(fake_visa, corridor, now)
+
+    # Filled by a user request (or before a restart): fresh, not re-fetched
+    fake_visa.visa_cache.set(visa.requirements_key(*corridor), {"visaType": "Work"})
+    assert not cache_warmer._is_due(fake_visa, corridor, now)
+    assert cache_warmer._is_due(fake_visa, corridor, time.time() + 3600 - 600)
+
+
+def test_corridor_hits_count_known_codes_only(monkeypatch):
+    monkeypatch.setattr(visa, "corridor_hits", collections.Counter())
+    visa._record_hit("NGA", "CAN")
+    visa._record_hit("ZZZ", "CAN")
+
+    assert visa.corridor_hits == {("NGA", "CAN"): 1}
+
+
+def test_corridor_hits_are_trimmed_to_the_busiest(monkeypatch):
+    monkeypatch.setattr(visa, "corridor_hits", collections.Counter())
+    monkeypatch.setattr(visa, "CORRIDOR_HITS_MAX", 4)
+    codes = sorted(visa.VALID_ISO3_CODES)[:5]
+    for _ in range(3):
+        visa._record_hit("NGA", "CAN")
+    for code in codes:
+        visa._record_hit("IND", code)
+
+    assert len(visa.corridor_hits) <= 4
+    assert visa.corridor_hits[("NGA", "CAN")] == 3
@@ -0,0 +1,100 @@
+"""get_user_context revalidation against a fake Convex endpoint."""
+
+import json
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from tools import context
+
+
+class FakeConvex:
+    """Serves /api/user/context with an ETag and answers 304 when it matches."""
+
+    def __init__(self):
+        self.todos = [{"title": "Get passport", "column": "todo"}]
+        self.progress = {"total": 4, "completed": 1, "percentage": 25}
+        self.etag = '"v1"'
+        self.statuses: list[int] = []
+        convex = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.headers.get("If-None-Match") == convex.etag:
+                    convex.statuses.append(304)
+                    self.send_response(304)
+                    self.send_header("ETag", convex.etag)
+                    self.end_headers()
+                    return
+                body = json.dumps({"todos": convex.todos, "progress": convex.progress}).encode()
+                convex.statuses.append(200)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", convex.etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def convex(monkeypatch):
+    fake = FakeConvex()
+    monkeypatch.setattr(context, "CONVEX_SITE_URL", fake.url)
+    yield fake
+    fake.close()
+
+
+@pytest.fixture
+def summaries(monkeypatch):
+    built = []
+    build_summary = context.build_summary
+
+    def counting(todos, progress):
+        built.append(todos)
+        return build_summary(todos, progress)
+
+    monkeypatch.setattr(context, "build_summary", counting)
+    return built
+
+
+async def test_304_reuses_cached_context(convex, summaries):
+    corridor = f"corridor-{uuid.uuid4().hex}"
+    first = await context.get_user_context(corridor)
+    second = await context.get_user_context(corridor)
+
+    assert convex.statuses == [200, 304]
+    assert second["unchanged"] is True
+    assert second["summary"] == first["summary"]
+    assert second["progress"] == first["progress"]
+    assert len(summaries) == 1
+
+
+async def test_summary_rebuilt_only_when_content_changes(convex, summaries):
+    corridor = f"corridor-{uuid.uuid4().hex}"
+    await context.get_user_context(corridor)
+
+    # New ETag, same todos and progress: the cached summary is reused
+    convex.etag = '"v2"'
+    result = await context.get_user_context(corridor)
+    assert convex.statuses == [200, 200]
+    assert "unchanged" not in result
+    assert len(summaries) == 1
+
+    convex.todos = [*convex.todos, {"title": "Book biometrics", "column": "todo"}]
+    convex.etag = '"v3"'
+    result = await context.get_user_context(corridor)
+    assert len(summaries) == 2
+    assert "2 active task(s)" in result["summary"]
@@ -0,0 +1,38 @@
+"""Housing facets must cover every segment of a country."""
+
+from tools import housing
+
+
+def _segment(code: str, organizations: list[str]) -> dict:
+    return {
+        "country": "France",
+        "country_code": code,
+        "iso3": "FRA",
+        "continent": "Europe",
+        "resources": [
+            {"organization_name": name, "resource_type": "NGO", "services": ["Housing search"]}
+            for name in organizations
+        ],
+    }
+
+
+def test_country_facets_merge_segments():
+    data = {"housing_resources": [
+        _segment("FR", ["Action Logement", "Cimade"]),
+        _segment("FR_STUDENTS", ["CROUS", "Studapart", "Lokaviz"]),
+    ]}
+
+    facets = housing.build_housing_facets(housing.build_housing_index(data))
+
+    france = facets["countries"]["france"]
+    assert france["scope"] == "France"
+    assert france["total_resources"] == 5
+    for alias in ("fr", "fr_students", "fra"):
+        assert facets["country_aliases"][alias] == "france"
+
+
+async def test_overview_matches_search_for_multi_segment_country():
+    overview = await housing.get_housing_overview(country="France")
+    search = await housing.search_housing_resources(country="France")
+
+    assert overview["total_resources"] == search["total_found"]
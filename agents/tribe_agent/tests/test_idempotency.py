@@ -0,0 +1,226 @@
+"""IdempotencyMiddleware: interrupted uploads and interrupted originals must not claim the key."""
+
+import asyncio
+
+from starlette.responses import StreamingResponse
+
+import idempotency
+from idempotency import IdempotencyMiddleware, MemoryIdempotencyStore
+
+KEY_HEADER = (b"idempotency-key", b"key-1")
+
+
+def _scope(path: str = "/agui") -> dict:
+    return {"type": "http", "method": "POST", "path": path, "headers": [KEY_HEADER]}
+
+
+def _receive_from(messages: list[dict]):
+    queue = list(messages)
+
+    async def receive():
+        if queue:
+            return queue.pop(0)
+        await asyncio.Event().wait()  # Never returns, like an idle connection
+
+    return receive
+
+
+def _collector():
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    return sent, send
+
+
+async def test_disconnect_during_upload_does_not_run_or_store():
+    calls = []
+
+    async def app(scope, receive, send):
+        calls.append(await receive())
+
+    middleware = IdempotencyMiddleware(app, store=MemoryIdempotencyStore())
+    sent, send = _collector()
+    receive = _receive_from([
+        {"type": "http.request", "body": b'{"query": "par', "more_body": True},
+        {"type": "http.disconnect"},
+    ])
+    await middleware(_scope(), receive, send)
+
+    assert calls == [] and sent == []
+    assert middleware.store.get("/agui:key-1") is None
+    assert middleware._inflight == {}
+
+    # The real retry with the full body runs normally
+    async def ok_app(scope, receive, send):
+        await receive()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    middleware.app = ok_app
+    sent, send = _collector()
+    body = {"type": "http.request", "body": b'{"query": "paris"}', "more_body": False}
+    await middleware(_scope(), _receive_from([body]), send)
+    assert sent[0]["status"] == 200
+
+
+async def test_follower_of_interrupted_stream_gets_error_event():
+    release = asyncio.Event()
+
+    async def streaming_app(scope, receive, send):
+        await receive()
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"text/event-stream")],
+        })
+        await send({"type": "http.response.body", "body": b"data: 1\n\n", "more_body": True})
+        await release.wait()
+        raise asyncio.CancelledError  # The original client went away mid-stream
+
+    middleware = IdempotencyMiddleware(streaming_app, store=MemoryIdempotencyStore())
+    body = {"type": "http.request", "body": b"{}", "more_body": False}
+    _, original_send = _collector()
+    original = asyncio.create_task(middleware(_scope(), _receive_from([body]), original_send))
+    await asyncio.sleep(0)
+
+    follower_sent, follower_send = _collector()
+    follower = asyncio.create_task(middleware(_scope(), _receive_from([body]), follower_send))
+    await asyncio.sleep(0)
+    release.set()
+    await asyncio.gather(original, return_exceptions=True)
+    await follower
+
+    last = follower_sent[-1]
+    assert last["type"] == "http.response.body" and not last.get("more_body", False)
+    assert b"RUN_ERROR" in last["body"]
+    assert middleware.store.get("/agui:key-1") is None
+
+
+async def test_follower_before_response_start_gets_retry_status():
+    release = asyncio.Event()
+
+    async def failing_app(scope, receive, send):
+        await receive()
+        await release.wait()
+        raise asyncio.CancelledError
+
+    middleware = IdempotencyMiddleware(failing_app, store=MemoryIdempotencyStore())
+    body = {"type": "http.request", "body": b"{}", "more_body": False}
+    _, original_send = _collector()
+    original = asyncio.create_task(middleware(_scope(), _receive_from([body]), original_send))
+    await asyncio.sleep(0)
+
+    follower_sent, follower_send = _collector()
+    follower = asyncio.create_task(middleware(_scope(), _receive_from([body]), follower_send))
+    await asyncio.sleep(0)
+    release.set()
+    await asyncio.gather(original, return_exceptions=True)
+    await follower
+
+    assert follower_sent[0]["status"] == 503
+
+
+def _disconnecting_receive(body: dict, disconnect: asyncio.Event):
+    """Delivers the body, then http.disconnect once `disconnect` is set."""
+    queue = [body]
+
+    async def receive():
+        if queue:
+            return queue.pop(0)
+        await disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    return receive
+
+
+def _sse_app(release: asyncio.Event):
+    async def events():
+        yield b"data: 1\n\n"
+        await release.wait()
+        yield b"data: 2\n\n"
+
+    async def app(scope, receive, send):
+        await receive()
+        response = StreamingResponse(events(), media_type="text/event-stream")
+        await response(scope, receive, send)
+
+    return app
+
+
+async def test_retry_attached_after_original_disconnect_gets_whole_stream():
+    release, disconnect = asyncio.Event(), asyncio.Event()
+    middleware = IdempotencyMiddleware(_sse_app(release), store=MemoryIdempotencyStore())
+    body = {"type": "http.request", "body": b"{}", "more_body": False}
+
+    original_sent, original_send = _collector()
+    original = asyncio.create_task(
+        middleware(_scope(), _disconnecting_receive(body, disconnect), original_send)
+    )
+    await asyncio.sleep(0.01)
+    disconnect.set()  # The mobile client drops mid-stream and retries
+    await asyncio.sleep(0.01)
+
+    retry_sent, retry_send = _collector()
+    retry = asyncio.create_task(middleware(_scope(), _receive_from([body]), retry_send))
+    await asyncio.sleep(0.01)
+    release.set()
+    await asyncio.wait_for(asyncio.gather(original, retry), 1)
+
+    assert retry_sent[0]["status"] == 200
+    assert b"".join(m.get("body", b"") for m in retry_sent) == b"data: 1\n\ndata: 2\n\n"
+    assert b"data: 2" not in b"".join(m.get("body", b"") for m in original_sent)
+    assert middleware.store.get("/agui:key-1") is not None
+
+
+async def test_disconnect_without_retry_cancels_the_run(monkeypatch):
+    monkeypatch.setattr(idempotency, "IDEMPOTENCY_ATTACH_GRACE_SECONDS", 0.05)
+    release, disconnect = asyncio.Event(), asyncio.Event()
+    middleware = IdempotencyMiddleware(_sse_app(release), store=MemoryIdempotencyStore())
+    body = {"type": "http.request", "body": b"{}", "more_body": False}
+    _, send = _collector()
+
+    disconnect.set()
+    await asyncio.wait_for(middleware(_scope(), _disconnecting_receive(body, disconnect), send), 1)
+
+    assert middleware._inflight == {}
+    assert middleware.store.get("/agui:key-1") is None
+
+
+async def test_response_over_size_cap_is_not_buffered(monkeypatch):
+    monkeypatch.setattr(idempotency, "IDEMPOTENCY_MAX_RESPONSE_BYTES", 12)
+    past_cap, release = asyncio.Event(), asyncio.Event()
+
+    async def events():
+        yield b"data: 1\n\n"
+        await past_cap.wait()
+        yield b"data: 2\n\n"
+        await release.wait()
+        yield b"data: 3\n\n"
+
+    async def app(scope, receive, send):
+        await receive()
+        await StreamingResponse(events(), media_type="text/event-stream")(scope, receive, send)
+
+    middleware = IdempotencyMiddleware(app, store=MemoryIdempotencyStore())
+    body = {"type": "http.request", "body": b"{}", "more_body": False}
+    _, original_send = _collector()
+    original = asyncio.create_task(middleware(_scope(), _receive_from([body]), original_send))
+    await asyncio.sleep(0.01)
+    early_sent, early_send = _collector()
+    early = asyncio.create_task(middleware(_scope(), _receive_from([body]), early_send))
+    await asyncio.sleep(0.01)
+    past_cap.set()
+    await asyncio.sleep(0.01)
+
+    flight = middleware._inflight["/agui:key-1"]
+    assert not flight.buffered and flight.messages == []
+    late_sent, late_send = _collector()
+    await middleware(_scope(), _receive_from([body]), late_send)
+    assert late_sent[0]["status"] == 409
+
+    release.set()
+    await asyncio.wait_for(asyncio.gather(original, early), 1)
+    assert b"".join(m.get("body", b"") for m in early_sent) == b"data: 1\n\ndata: 2\n\ndata: 3\n\n"
+    assert middleware.store.get("/agui:key-1") is None
@@ -0,0 +1,67 @@
+"""Routing must never strip the tools from a turn that may need them."""
+
+import pytest
+from google.adk.models import LlmRequest
+from google.genai import types
+
+import model_router
+from model_router import classify
+
+
+@pytest.mark.parametrize("text", ["hi", "Hello there!", "thanks so much", "bye", "cheers"])
+def test_pure_chitchat(text):
+    assert classify(text).tier == "chitchat"
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["yes please", "sure, go ahead", "ok do it", "yes look it up", "no, Germany instead", "yes"],
+)
+def test_confirmations_keep_tools(text):
+    assert classify(text).tier == "simple"
+
+
+def test_greeting_prefix_is_not_enough():
+    assert classify("hi, what about Toronto then").tier == "simple"
+
+
+def test_chitchat_after_offer_keeps_tools():
+    assert classify("thanks", replies_to_offer=True).tier == "simple"
+
+
+def _request(model_text: str, user_text: str) -> LlmRequest:
+    return LlmRequest(
+        contents=[
+            types.Content(role="user", parts=[types.Part(text="Moving from Lagos to Toronto")]),
+            types.Content(role="model", parts=[types.Part(text=model_text)]),
+            types.Content(role="user", parts=[types.Part(text=user_text)]),
+        ],
+        config=types.GenerateContentConfig(tools=[types.Tool(function_declarations=[])]),
+    )
+
+
+@pytest.mark.parametrize(
+    "model_text",
+    [
+        "Shall I look up the visa requirements?",
+        "I can check housing programs for you - let me know if you want that.",
+    ],
+)
+def test_reply_to_offer_is_routed_with_tools(model_text):
+    request = _request(model_text, "great")
+    text, tool_loop, replies_to_offer = model_router._latest_turn(request)
+    route = classify(text, tool_loop, replies_to_offer)
+    model_router.apply_route(route, request)
+
+    assert replies_to_offer
+    assert route.tier == "simple"
+    assert request.config.tools
+
+
+def test_chitchat_after_statement_drops_tools():
+    request = _request("Good luck with the move.", "thanks")
+    route = classify(*model_router._latest_turn(request))
+    model_router.apply_route(route, request)
+
+    assert route.tier == "chitchat"
+    assert request.config.tools is None
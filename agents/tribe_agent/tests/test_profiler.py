@@ -0,0 +1,31 @@
+"""CPU profiling samples threads and tasks without sharing state across threads."""
+
+import asyncio
+
+import profiler
+
+
+async def test_profile_cpu_counts_tasks_at_task_interval(monkeypatch):
+    monkeypatch.setattr(profiler, "TASK_INTERVAL", 0.05)
+    walks = 0
+    sample_tasks = profiler._sample_tasks
+
+    def counting_sample_tasks(loop, result):
+        nonlocal walks
+        walks += 1
+        sample_tasks(loop, result)
+
+    monkeypatch.setattr(profiler, "_sample_tasks", counting_sample_tasks)
+
+    async def sleeper():
+        await asyncio.sleep(10)
+
+    task = asyncio.create_task(sleeper(), name="sleeper")
+    try:
+        text, samples = await profiler.profile_cpu(0.5, interval=0.005)
+    finally:
+        task.cancel()
+
+    assert samples > walks > 0
+    assert walks <= 0.5 / 0.05 + 1
+    assert "task:sleeper;" in text
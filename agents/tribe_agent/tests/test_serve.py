@@ -0,0 +1,27 @@
+"""Worker count resolution for the preforked server."""
+
+import pytest
+
+import serve
+
+
+def test_auto_without_shared_state_runs_one_worker(monkeypatch):
+    monkeypatch.setattr(serve, "available_cpus", lambda: 4)
+    assert serve.resolve_workers("auto", missing=["SESSION_DB_URL"]) == 1
+    assert serve.resolve_workers("auto", missing=[]) == 4
+
+
+def test_explicit_workers_need_shared_state():
+    with pytest.raises(ValueError, match="SESSION_DB_URL and CACHE_BACKEND=shared"):
+        serve.resolve_workers("2", missing=["SESSION_DB_URL", "CACHE_BACKEND=shared"])
+    assert serve.resolve_workers("1", missing=["CACHE_BACKEND=shared"]) == 1
+    assert serve.resolve_workers("3", missing=[]) == 3
+
+
+def test_missing_shared_state(monkeypatch):
+    monkeypatch.delenv("SESSION_DB_URL", raising=False)
+    monkeypatch.setattr("cache.CACHE_BACKEND", "memory")
+    assert serve.missing_shared_state() == ["SESSION_DB_URL", "CACHE_BACKEND=shared"]
+    monkeypatch.setenv("SESSION_DB_URL", "sqlite:////tmp/sessions.db")
+    monkeypatch.setattr("cache.CACHE_BACKEND", "shared")
+    assert serve.missing_shared_state() == []
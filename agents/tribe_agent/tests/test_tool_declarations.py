@@ -0,0 +1,29 @@
+"""Every agent tool must produce a function declaration for both Gemini API and Vertex AI."""
+
+import inspect
+
+import pytest
+from google.adk.tools._automatic_function_calling_util import build_function_declaration
+from google.adk.utils.variant_utils import GoogleLLMVariant
+
+from agent import tribe_agent
+
+TOOLS = [tool for tool in tribe_agent.tools if hasattr(tool, "func")]
+
+
+@pytest.mark.parametrize("tool", TOOLS, ids=lambda tool: tool.name)
+def test_tool_returns_plain_dict(tool):
+    # ADK 1.x fails on Vertex AI for Union[<TypedDict>, ...] return annotations
+    assert inspect.signature(tool.func).return_annotation is dict
+
+
+@pytest.mark.parametrize("json_schema", [True, False], ids=["json_schema", "legacy_schema"])
+@pytest.mark.parametrize("variant", list(GoogleLLMVariant), ids=lambda v: v.name)
+@pytest.mark.parametrize("tool", TOOLS, ids=lambda tool: tool.name)
+def test_tool_declaration_builds(tool, variant, json_schema, monkeypatch):
+    toggle = "ENABLE" if json_schema else "DISABLE"
+    monkeypatch.setenv(f"ADK_{toggle}_JSON_SCHEMA_FOR_FUNC_DECL", "1")
+    declaration = build_function_declaration(
+        func=tool.func, ignore_params=["tool_context"], variant=variant
+    )
+    assert declaration.name == tool.name
@@ -1,12 +1,23 @@
 # TRIBE Agent Tools
 # Tools are imported in agent.py
+#
+# Exports are resolved lazily (PEP 562) so that importing one tool module does
+# not pull in every other tool and google.adk on cold start.
 
-from .housing import search_housing_resources_tool
-from .live_search import search_live_data_tool
-from .visa import search_visa_options_tool
+import importlib
 
-__all__ = [
-    "search_housing_resources_tool",
-    "search_live_data_tool",
-    "search_visa_options_tool",
-]
+_TOOL_MODULES = {
+    "get_housing_overview_tool": ".housing",
+    "search_housing_resources_tool": ".housing",
+    "search_live_data_tool": ".live_search",
+    "search_visa_options_tool": ".visa",
+}
+
+__all__ = list(_TOOL_MODULES)
+
+
+def __getattr__(name: str):
+    if name in _TOOL_MODULES:
+        module = importlib.import_module(_TOOL_MODULES[name], __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
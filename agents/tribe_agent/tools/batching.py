@@ -0,0 +1,205 @@
+"""
+Concurrent tool batches
+
+When Gemini returns several function calls in one response (e.g. visa,
+housing and user context together), ADK dispatches them as concurrent tasks
+and merges the responses back in call order. This module bounds how many of
+our tools run at once per turn and records each batch's wall time against
+the sum of its calls, i.e. what the batch would have cost sequentially.
+
+- after_model_callback registers a batch for every response with function
+  calls to our tools; after_agent_callback and on_tool_error_callback drop
+  the turn's state when it ends, and the least recently used turns are
+  evicted beyond _TURNS_MAX (e.g. turns whose model call failed)
+- `batched(func)` wraps a tool function so each call takes a slot from the
+  turn's semaphore (TOOL_CONCURRENCY) and reports its duration to the batch
+  and, as a tool_call event, to the analytics sink
+"""
+
+import asyncio
+import functools
+import inspect
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmResponse
+from google.adk.tools import ToolContext
+
+import analytics
+import metrics
+from logging_config import get_logger
+from turn_context import turn_scope
+
+logger = get_logger(__name__)
+
+# Parallel tool calls allowed per turn; 1 runs batches sequentially
+TOOL_CONCURRENCY = max(1, int(os.environ.get("TOOL_CONCURRENCY", 4)))
+
+_batch_seconds = metrics.histogram(
+    "tool_batch_seconds", "Wall time of a batch of function calls from one model response"
+)
+_batch_saved_seconds = metrics.counter(
+    "tool_batch_saved_seconds_total", "Sum of call durations minus batch wall time"
+)
+
+
+@dataclass
+class _Batch:
+    expected: int
+    started_at: Optional[float] = None
+    durations: list[float] = field(default_factory=list)
+    names: list[str] = field(default_factory=list)
+
+
+@dataclass
+class _Turn:
+    semaphore: asyncio.Semaphore
+    batch: Optional[_Batch] = None
+
+
+# Turn state by invocation id, least recently used first; dropped when the turn
+# ends, and the stalest turns are evicted beyond _TURNS_MAX
+_turns: OrderedDict[str, _Turn] = OrderedDict()
+_TURNS_MAX = 10_000
+
+# Names of tools wrapped with `batched`, the only ones that report to a batch
+_batched_tools: set[str] = set()
+
+
+def _turn(invocation_id: str) -> _Turn:
+    turn = _turns.get(invocation_id)
+    if turn is not None:
+        _turns.move_to_end(invocation_id)
+        return turn
+    turn = _turns[invocation_id] = _Turn(asyncio.Semaphore(TOOL_CONCURRENCY))
+    while len(_turns) > _TURNS_MAX:
+        _turns.popitem(last=False)
+    return turn
+
+
+def after_model_callback(
+    callback_context: CallbackContext, llm_response: LlmResponse
+) -> Optional[LlmResponse]:
+    """Open a batch for the function calls in a model response."""
+    if llm_response.partial or not llm_response.content:
+        return None
+
+    calls = [
+        p.function_call
+        for p in llm_response.content.parts or []
+        if p.function_call and p.function_call.name in _batched_tools
+    ]
+    if calls:
+        _turn(callback_context.invocation_id).batch = _Batch(expected=len(calls))
+    elif not any(p.function_call for p in llm_response.content.parts or []):
+        # Final answer: the turn has no more tool calls
+        _turns.pop(callback_context.invocation_id, None)
+    return None
+
+
+def after_agent_callback(callback_context: CallbackContext) -> None:
+    """Drop the turn's state when the agent run ends or is cancelled."""
+    _turns.pop(callback_context.invocation_id, None)
+
+
+def on_tool_error_callback(tool, args: dict, tool_context: ToolContext, error: Exception) -> None:
+    """A tool raised, which fails the turn: drop its state (the error is re-raised)."""
+    _turns.pop(tool_context.invocation_id, None)
+
+
+def _finish_call(invocation_id: str, name: str, started_at: float, duration: float) -> None:
+    turn = _turns.get(invocation_id)
+    batch = turn.batch if turn else None
+    if batch is None:
+        return
+
+    batch.started_at = started_at if batch.started_at is None else min(batch.started_at, started_at)
+    batch.durations.append(duration)
+    batch.names.append(name)
+    if len(batch.durations) < batch.expected:
+        return
+
+    turn.batch = None
+    wall = time.perf_counter() - batch.started_at
+    sequential = sum(batch.durations)
+    _batch_seconds.observe(wall, size=str(batch.expected))
+    _batch_saved_seconds.inc(max(sequential - wall, 0.0))
+    logger.info(
+        "Tool batch complete",
+        extra={
+            "invocation_id": invocation_id,
+            "tools": batch.names,
+            "calls": batch.expected,
+            "wall_ms": round(wall * 1000, 1),
+            "sequential_ms": round(sequential * 1000, 1),
+            "concurrency": TOOL_CONCURRENCY,
+        },
+    )
+
+
+async def _call_tool(func, tool_context: Optional[ToolContext], args, kwargs):
+    """Run the tool and record a tool_call analytics event."""
+    started_at = time.perf_counter()
+    result = None
+    try:
+        result = await func(*args, **kwargs)
+        return result
+    finally:
+        corridor, stage, language = turn_scope(tool_context)
+        outcome = result if isinstance(result, dict) else {}
+        analytics.emit(
+            "tool_call",
+            tool=func.__name__,
+            duration_ms=round((time.perf_counter() - started_at) * 1000, 2),
+            ok=result is not None and not outcome.get("error"),
+            cached=outcome.get("cached"),
+            degraded=bool(outcome.get("degraded")),
+            corridor=corridor,
+            stage=stage,
+            language=language,
+        )
+
+
+def batched(func):
+    """
+    Wrap an async tool function so it runs under the turn's concurrency limit.
+
+    The wrapper receives the ToolContext from ADK to find its turn; it is
+    passed through only if the tool itself declares `tool_context`.
+    """
+    signature = inspect.signature(func)
+    wants_context = "tool_context" in signature.parameters
+    _batched_tools.add(func.__name__)
+
+    @functools.wraps(func)
+    async def wrapper(*args, tool_context: Optional[ToolContext] = None, **kwargs):
+        if wants_context:
+            kwargs["tool_context"] = tool_context
+        invocation_id = getattr(tool_context, "invocation_id", None)
+        if invocation_id is None:
+            return await _call_tool(func, tool_context, args, kwargs)
+
+        async with _turn(invocation_id).semaphore:
+            started_at = time.perf_counter()
+            try:
+                return await _call_tool(func, tool_context, args, kwargs)
+            finally:
+                duration = time.perf_counter() - started_at
+                _finish_call(invocation_id, func.__name__, started_at, duration)
+
+    if not wants_context:
+        # Expose tool_context so ADK passes it; it is excluded from the declaration
+        context_param = inspect.Parameter(
+            "tool_context",
+            inspect.Parameter.KEYWORD_ONLY,
+            default=None,
+            annotation=Optional[ToolContext],
+        )
+        wrapper.__signature__ = signature.replace(
+            parameters=[*signature.parameters.values(), context_param]
+        )
+    return wrapper
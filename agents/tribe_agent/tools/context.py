@@ -7,17 +7,82 @@ Fetches user's current context from Convex including:
 
 This tool is internal (not shown in UI) and used by the agent
 to provide personalized, context-aware responses.
+
+Responses are cached per session and revalidated with If-None-Match, so
+repeat calls within a conversation cost a 304 when nothing has changed and
+the summary is only rebuilt when the todos or progress change. Entries are
+tagged 'corridor:<id>' for invalidation when the user's todos change.
 """
 
+import hashlib
 import os
 from typing import Optional
 import httpx
-from google.adk.tools import FunctionTool
+from google.adk.tools import FunctionTool, ToolContext
+
+import deadline
+import serialization
+from cache import get_cache
+from tools.batching import batched
+from tools.payloads import DEFAULT_DETAIL, shape_result
 
 CONVEX_SITE_URL = os.environ.get("CONVEX_SITE_URL", "")
 
+# Upper bound per call; the turn deadline may leave less (see deadline.py)
+CONTEXT_TIMEOUT_SECONDS = 10.0
+
+# Matches the AG-UI session timeout; entries are revalidated on every call anyway
+CONTEXT_CACHE_TTL_SECONDS = 3600
+context_cache = get_cache("user_context", max_entries=4096, default_ttl=CONTEXT_CACHE_TTL_SECONDS)
+
+
+def _session_id(tool_context: Optional[ToolContext]) -> str:
+    """Session the tool call belongs to, or '-' outside an agent run."""
+    session = getattr(tool_context, "session", None)
+    return getattr(session, "id", None) or "-"
+
 
-async def get_user_context(corridor_id: str) -> dict:
+def _content_hash(todos: list, progress: dict) -> str:
+    """Stable hash of the parts of the context the summary depends on."""
+    payload = serialization.dumps({"todos": todos, "progress": progress}, sort_keys=True)
+    return hashlib.sha256(payload).hexdigest()[:16]
+
+
+def build_summary(todos: list, progress: dict) -> str:
+    """Build a natural language summary of the user's tasks and progress."""
+    summary_parts = []
+
+    if todos:
+        task_list = ", ".join([t.get("title", "Untitled") for t in todos[:3]])
+        if len(todos) > 3:
+            summary_parts.append(
+                f"The user has {len(todos)} active tasks including: {task_list}, and more."
+            )
+        else:
+            summary_parts.append(
+                f"The user has {len(todos)} active task(s): {task_list}."
+            )
+    else:
+        summary_parts.append("The user has no active tasks.")
+
+    if progress.get("total", 0) > 0:
+        pct = progress.get("percentage", 0)
+        completed = progress.get("completed", 0)
+        total = progress.get("total", 0)
+        summary_parts.append(
+            f"Migration progress: {completed}/{total} protocols completed ({pct}%)."
+        )
+    else:
+        summary_parts.append("No migration protocols have been set up yet.")
+
+    return " ".join(summary_parts)
+
+
+async def get_user_context(
+    corridor_id: str,
+    detail: str = DEFAULT_DETAIL,
+    tool_context: Optional[ToolContext] = None,
+) -> dict:
     """
     Fetch user's current context including todos, documents, and progress.
     Use this to provide personalized, context-aware responses.
@@ -29,9 +94,12 @@ async def get_user_context(corridor_id: str) -> dict:
 
     Args:
         corridor_id: The active corridor ID from the user's context
+        detail: How much to return: 'summary' (summary text and progress only),
+                'standard' (default, adds up to 10 todos) or 'full' (raw todos).
 
     Returns:
         dict with:
+        - summary: Natural language overview of tasks and progress
         - todos: List of active tasks (title, column, priority, category)
         - progress: Protocol completion stats (completed, total, percentage)
         - error: Error message if fetch failed
@@ -48,13 +116,35 @@ async def get_user_context(corridor_id: str) -> dict:
             "message": "CONVEX_SITE_URL not configured. Cannot fetch user context.",
         }
 
-    async with httpx.AsyncClient(timeout=10.0) as client:
+    cache_key = f"{_session_id(tool_context)}:{corridor_id}"
+    cached = context_cache.get(cache_key)
+
+    if deadline.expired(deadline.MIN_CALL_SECONDS):
+        return deadline.degraded_tool_result("get_user_context")
+
+    headers = {}
+    if cached and cached.get("etag"):
+        headers["If-None-Match"] = cached["etag"]
+
+    async with httpx.AsyncClient(timeout=deadline.timeout(CONTEXT_TIMEOUT_SECONDS)) as client:
         try:
             response = await client.get(
                 f"{CONVEX_SITE_URL}/api/user/context",
                 params={"corridorId": corridor_id},
+                headers=headers,
             )
 
+            # Nothing changed since the last call in this session
+            if response.status_code == 304 and cached:
+                context_cache.set(cache_key, cached, tags=[f"corridor:{corridor_id}"])  # Extend TTL
+                return shape_result("get_user_context", {
+                    "success": True,
+                    "todos": cached["todos"],
+                    "progress": cached["progress"],
+                    "summary": cached["summary"],
+                    "unchanged": True,
+                }, detail)
+
             if response.status_code != 200:
                 return {
                     "error": True,
@@ -70,40 +160,31 @@ async def get_user_context(corridor_id: str) -> dict:
             todos = data.get("todos", [])
             progress = data.get("progress", {})
 
-            # Build a natural language summary
-            summary_parts = []
-
-            if todos:
-                task_list = ", ".join([t.get("title", "Untitled") for t in todos[:3]])
-                if len(todos) > 3:
-                    summary_parts.append(
-                        f"The user has {len(todos)} active tasks including: {task_list}, and more."
-                    )
-                else:
-                    summary_parts.append(
-                        f"The user has {len(todos)} active task(s): {task_list}."
-                    )
-            else:
-                summary_parts.append("The user has no active tasks.")
-
-            if progress.get("total", 0) > 0:
-                pct = progress.get("percentage", 0)
-                completed = progress.get("completed", 0)
-                total = progress.get("total", 0)
-                summary_parts.append(
-                    f"Migration progress: {completed}/{total} protocols completed ({pct}%)."
-                )
+            # Only rebuild the summary when the todos or progress changed
+            content_hash = _content_hash(todos, progress)
+            if cached and cached.get("hash") == content_hash:
+                summary = cached["summary"]
             else:
-                summary_parts.append("No migration protocols have been set up yet.")
+                summary = build_summary(todos, progress)
 
-            return {
+            context_cache.set(cache_key, {
+                "etag": response.headers.get("etag"),
+                "hash": content_hash,
+                "todos": todos,
+                "progress": progress,
+                "summary": summary,
+            }, tags=[f"corridor:{corridor_id}"])
+
+            return shape_result("get_user_context", {
                 "success": True,
                 "todos": todos,
                 "progress": progress,
-                "summary": " ".join(summary_parts),
-            }
+                "summary": summary,
+            }, detail)
 
         except httpx.TimeoutException:
+            if deadline.expired():
+                deadline.record_exceeded("tool", "get_user_context")
             return {
                 "error": True,
                 "message": "Request timed out while fetching user context.",
@@ -116,4 +197,4 @@ async def get_user_context(corridor_id: str) -> dict:
 
 
 # Export as FunctionTool for ADK
-get_user_context_tool = FunctionTool(get_user_context)
+get_user_context_tool = FunctionTool(batched(get_user_context))
@@ -4,32 +4,206 @@ Housing Resources Search Tool
 Provides search functionality for migrant and refugee housing assistance programs.
 """
 
+import hashlib
 import json
+from collections import Counter, defaultdict
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 
 from google.adk.tools import FunctionTool
 
+from logging_config import get_logger
+from tools.batching import batched
+from tools.payloads import DEFAULT_DETAIL, shape_result
+from tools.results import HousingOverview
+
+logger = get_logger(__name__)
 
-# Load housing data at module level for efficiency
 DATA_PATH = Path(__file__).parent.parent / "data" / "migrant_housing_resources.json"
 
-try:
-    with open(DATA_PATH, "r", encoding="utf-8") as f:
-        HOUSING_DATA = json.load(f)
-    print(f"Housing data loaded: {len(HOUSING_DATA.get('housing_resources', []))} countries")
-except FileNotFoundError:
-    print(f"Warning: Housing data not found at {DATA_PATH}")
-    HOUSING_DATA = {"housing_resources": [], "metadata": {}}
-except json.JSONDecodeError as e:
-    print(f"Warning: Invalid JSON in housing data: {e}")
-    HOUSING_DATA = {"housing_resources": [], "metadata": {}}
+# Prebuilt by scripts/build_housing_data.py; used when it matches the dataset
+INDEX_PATH = DATA_PATH.with_name("migrant_housing_index.json")
+
+EMPTY_HOUSING_DATA = {"housing_resources": [], "metadata": {}}
+
+# Service tags are free text with a long tail; overviews list the most common
+OVERVIEW_TOP_SERVICES = 15
+
+# sha256 of the dataset file as loaded, to match the prebuilt index
+_dataset_sha256: Optional[str] = None
+
+
+@lru_cache(maxsize=1)
+def get_housing_data() -> dict:
+    """
+    Load the housing dataset on first use.
+
+    Parsing is deferred until the first search (or the server warm-up task)
+    so that importing this module stays cheap on cold start.
+
+    Returns:
+        The parsed dataset, or an empty dataset if the file is missing or invalid
+    """
+    global _dataset_sha256
+    try:
+        raw = DATA_PATH.read_bytes()
+        data = json.loads(raw)
+    except FileNotFoundError:
+        logger.warning(f"Housing data not found at {DATA_PATH}")
+        return EMPTY_HOUSING_DATA
+    except json.JSONDecodeError as e:
+        logger.warning(f"Invalid JSON in housing data: {e}")
+        return EMPTY_HOUSING_DATA
+
+    _dataset_sha256 = hashlib.sha256(raw).hexdigest()
+    logger.info(f"Housing data loaded: {len(data.get('housing_resources', []))} countries")
+    return data
+
+
+def build_housing_index(data: dict) -> list[dict]:
+    """
+    Build the search index over a housing dataset.
+
+    One entry per country with lower-cased match keys and its resources already
+    flattened into response format, so searches only filter.
+
+    Returns:
+        List of index entries in dataset order
+    """
+    index = []
+    for country_data in data.get("housing_resources", []):
+        resources = [
+            {
+                "country": country_data["country"],
+                "continent": country_data["continent"],
+                "organization": r.get("organization_name", "Unknown"),
+                "url": r.get("url", ""),
+                "description": r.get("description", ""),
+                "type": r.get("resource_type", "Unknown"),
+                "services": r.get("services", []),
+            }
+            for r in country_data.get("resources", [])
+        ]
+        index.append({
+            "country": country_data["country"].lower(),
+            "country_code": country_data.get("country_code", "").lower(),
+            "iso3": (country_data.get("iso3") or "").lower(),
+            "continent": country_data["continent"].lower(),
+            "resources": resources,
+            "resource_types": [
+                r.get("resource_type", "").lower() for r in country_data.get("resources", [])
+            ],
+        })
+    return index
+
+
+@lru_cache(maxsize=1)
+def get_housing_index() -> list[dict]:
+    """
+    Search index over the housing dataset.
+
+    Loads the prebuilt index (INDEX_PATH) when it was built from the current
+    dataset file, otherwise builds it. The index is read-only: the preforked
+    server builds it before forking so workers share it.
+
+    Returns:
+        List of index entries in dataset order
+    """
+    data = get_housing_data()
+    try:
+        prebuilt = json.loads(INDEX_PATH.read_bytes())
+        if prebuilt.get("dataset_sha256") == _dataset_sha256:
+            return prebuilt["entries"]
+        logger.info("Prebuilt housing index is stale; rebuilding in memory")
+    except FileNotFoundError:
+        pass
+    except (json.JSONDecodeError, KeyError) as e:
+        logger.warning(f"Invalid prebuilt housing index: {e}")
+    return build_housing_index(data)
+
+
+def _facet_block(scope: str, entries: list[dict]) -> HousingOverview:
+    continents, countries, resource_types, services = Counter(), Counter(), Counter(), Counter()
+    for entry in entries:
+        for r in entry["resources"]:
+            continents[r["continent"]] += 1
+            countries[r["country"]] += 1
+            resource_types[r["type"]] += 1
+            services.update(r["services"])
+    return {
+        "scope": scope,
+        "total_resources": sum(countries.values()),
+        "total_countries": len(countries),
+        "continents": dict(continents.most_common()),
+        "countries": dict(countries.most_common()),
+        "resource_types": dict(resource_types.most_common()),
+        "services": dict(services.most_common(OVERVIEW_TOP_SERVICES)),
+        "service_tags": len(services),
+    }
+
+
+def build_housing_facets(index: list[dict]) -> dict:
+    """
+    Facet counts over a housing index.
+
+    Counts resources by continent, country, resource type and service tag for
+    the whole catalog and for every continent and country, keyed by the
+    lower-cased names the index matches on, so an overview is a dict lookup.
+
+    Returns:
+        dict with 'all', 'continents' and 'countries' facet blocks, and
+        'country_aliases' mapping ISO2/ISO3 codes to country keys
+    """
+    by_continent, by_country = defaultdict(list), defaultdict(list)
+    for entry in index:
+        by_continent[entry["continent"]].append(entry)
+        # A country may have several segments (e.g. FR and FR_STUDENTS)
+        by_country[entry["country"]].append(entry)
+
+    def scope_name(entries: list[dict], key: str) -> str:
+        first = next((e["resources"][0] for e in entries if e["resources"]), None)
+        return first[key] if first else entries[0][key].title()
+
+    return {
+        "all": _facet_block("all", index),
+        "continents": {
+            key: _facet_block(scope_name(entries, "continent"), entries)
+            for key, entries in by_continent.items()
+        },
+        "countries": {
+            key: _facet_block(scope_name(entries, "country"), entries)
+            for key, entries in by_country.items()
+        },
+        "country_aliases": {
+            alias: entry["country"]
+            for entry in index
+            for alias in (entry["country_code"], entry["iso3"])
+            if alias
+        },
+    }
+
+
+@lru_cache(maxsize=1)
+def get_housing_facets() -> dict:
+    """Facet counts over the housing index, computed once when it loads."""
+    return build_housing_facets(get_housing_index())
+
+
+def _find_facets(blocks: dict, query: str, aliases: Optional[dict] = None) -> Optional[dict]:
+    """Exact name or code first, then the first partial name match (as searches do)."""
+    key = query.strip().lower()
+    key = (aliases or {}).get(key, key)
+    if key in blocks:
+        return blocks[key]
+    return next((block for name, block in blocks.items() if key in name), None)
 
 
 async def search_housing_resources(
     country: Optional[str] = None,
     continent: Optional[str] = None,
     resource_type: Optional[str] = None,
+    detail: str = DEFAULT_DETAIL,
 ) -> dict:
     """
     Search for housing resources and assistance programs for migrants and refugees.
@@ -39,11 +213,14 @@ async def search_housing_resources(
 
     Args:
         country: Destination country to search (e.g., 'United States', 'Canada', 'Germany').
-                 Can be full name or country code. Case-insensitive, partial match supported.
+                 Can be full name, ISO2 or ISO3 code. Case-insensitive, partial match supported.
         continent: Filter by continent (e.g., 'North America', 'Europe', 'Asia').
                    Case-insensitive.
         resource_type: Type of resource (e.g., 'Government Agency', 'NGO',
                        'Online Platform'). Case-insensitive, partial match supported.
+        detail: How much to return: 'summary' (organization, type, country and URL
+                of the top 5), 'standard' (default, adds short descriptions and
+                services) or 'full' (complete records and dataset metadata).
 
     Returns:
         dict containing:
@@ -52,80 +229,114 @@ async def search_housing_resources(
         - metadata: Information about data source and last update
         - suggestion: (Optional) Suggestion for live search if no results found
     """
-    results = HOUSING_DATA.get("housing_resources", [])
+    housing_data = get_housing_data()
+    entries = get_housing_index()
 
     # Filter by country (case-insensitive, partial match)
     if country:
         country_lower = country.lower()
-        results = [
-            r for r in results
-            if country_lower in r["country"].lower()
-            or r.get("country_code", "").lower() == country_lower
+        entries = [
+            e for e in entries
+            if country_lower in e["country"] or country_lower in (e["country_code"], e["iso3"])
         ]
 
     # Filter by continent (case-insensitive)
     if continent:
         continent_lower = continent.lower()
-        results = [
-            r for r in results
-            if continent_lower in r["continent"].lower()
-        ]
+        entries = [e for e in entries if continent_lower in e["continent"]]
 
-    # Extract all resources from filtered countries
+    # Collect resources from filtered countries,
+    # filtering by resource_type (case-insensitive, partial match)
     all_resources = []
-    for country_data in results:
-        for resource in country_data.get("resources", []):
-            all_resources.append({
-                "country": country_data["country"],
-                "continent": country_data["continent"],
-                **resource,
-            })
-
-    # Filter by resource_type (case-insensitive, partial match)
-    if resource_type:
-        type_lower = resource_type.lower()
-        all_resources = [
-            r for r in all_resources
-            if type_lower in r.get("resource_type", "").lower()
-        ]
+    type_lower = resource_type.lower() if resource_type else None
+    for entry in entries:
+        if type_lower is None:
+            all_resources.extend(entry["resources"])
+        else:
+            all_resources.extend(
+                r for r, r_type in zip(entry["resources"], entry["resource_types"])
+                if type_lower in r_type
+            )
 
     # Limit to 10 most relevant results
     limited_results = all_resources[:10]
 
     # If no results found and country was specified, suggest live search
     if len(all_resources) == 0 and country:
-        return {
+        return shape_result("search_housing_resources", {
             "total_found": 0,
             "results": [],
-            "metadata": HOUSING_DATA.get("metadata", {}),
+            "metadata": housing_data.get("metadata", {}),
             "suggestion": {
-                "message": f"No housing resources found in our database for {country}. Would you like me to search for the latest programs?",
+                "message": (
+                    f"No housing resources found in our database for {country}. "
+                    "Would you like me to search for the latest programs?"
+                ),
                 "action": "searchLiveData",
                 "actionLabel": "Search Live Data",
                 "note": "Uses 1 of 50 monthly live searches",
             },
-        }
+        }, detail)
+
+    return shape_result("search_housing_resources", {
+        "total_found": len(all_resources),
+        "results": limited_results,
+        "metadata": housing_data.get("metadata", {}),
+    }, detail)
+
+
+async def get_housing_overview(
+    continent: Optional[str] = None,
+    country: Optional[str] = None,
+) -> dict:
+    """
+    Summarize what housing help the catalog covers, without listing resources.
+
+    Use this first for broad questions (e.g., 'what housing help exists in
+    Europe?', 'which countries do you cover?') to see how many resources exist
+    per country, resource type and service. Then call search_housing_resources
+    with a country or resource_type filter only if the user needs specific
+    organizations.
+
+    Args:
+        continent: Limit the overview to a continent (e.g., 'Europe', 'Asia').
+                   Case-insensitive, partial match supported.
+        country: Limit the overview to one country. Full name, ISO2 or ISO3 code.
+                 Takes precedence over continent.
+
+    Returns:
+        dict containing:
+        - scope: The continent or country summarized, or 'all'
+        - total_resources, total_countries: Totals within the scope
+        - continents, countries, resource_types: Resource counts per value, largest first
+        - services: Counts for the most common service tags
+        - service_tags: Number of distinct service tags in the scope
+        - last_updated: When the catalog was last updated
+    """
+    facets = get_housing_facets()
 
-    # Format results for response
-    formatted_results = [
-        {
-            "country": r["country"],
-            "continent": r["continent"],
-            "organization": r.get("organization_name", "Unknown"),
-            "url": r.get("url", ""),
-            "description": r.get("description", ""),
-            "type": r.get("resource_type", "Unknown"),
-            "services": r.get("services", []),
+    if country:
+        block = _find_facets(facets["countries"], country, facets["country_aliases"])
+        missing = f"No housing resources for {country} in our database."
+    elif continent:
+        block = _find_facets(facets["continents"], continent)
+        missing = f"No housing resources for {continent} in our database."
+    else:
+        block = facets["all"]
+
+    if block is None:
+        return {
+            "error": True,
+            "message": missing,
+            "suggestions": list(facets["all"]["continents"]),
         }
-        for r in limited_results
-    ]
 
     return {
-        "total_found": len(all_resources),
-        "results": formatted_results,
-        "metadata": HOUSING_DATA.get("metadata", {}),
+        **block,
+        "last_updated": get_housing_data().get("metadata", {}).get("last_updated"),
     }
 
 
 # Wrap function as FunctionTool for ADK
-search_housing_resources_tool = FunctionTool(search_housing_resources)
+search_housing_resources_tool = FunctionTool(batched(search_housing_resources))
+get_housing_overview_tool = FunctionTool(batched(get_housing_overview))
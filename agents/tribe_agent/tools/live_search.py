@@ -11,9 +11,24 @@ from typing import Optional
 import httpx
 from google.adk.tools import FunctionTool
 
+import deadline
+from cache import get_cache
+from tools.batching import batched
+from tools.visa import normalize_country_code
+
 # Perplexity API configuration
 PERPLEXITY_API_URL = "https://api.perplexity.ai/chat/completions"
 
+# Upper bound per call; the turn deadline may leave less (see deadline.py)
+LIVE_SEARCH_TIMEOUT_SECONDS = 60.0
+
+# Repeat searches are served from cache without spending quota. Entries are
+# tagged 'country:<ISO3>' so they can be invalidated when policy data changes.
+LIVE_SEARCH_CACHE_TTL_SECONDS = float(os.environ.get("LIVE_SEARCH_CACHE_TTL_SECONDS", 6 * 60 * 60))
+live_search_cache = get_cache(
+    "live_search", max_entries=1024, default_ttl=LIVE_SEARCH_CACHE_TTL_SECONDS
+)
+
 # Simple monthly quota tracking (resets on agent restart - basic implementation)
 # For production, you'd want to persist this in a database
 _monthly_quota = {"used": 0, "limit": 50}
@@ -57,6 +72,18 @@ async def search_live_data(
             "message": "Live search is not configured. PERPLEXITY_API_KEY environment variable is missing.",
         }
 
+    cache_key = f"{(target_country or '').strip().lower()}:{' '.join(query.lower().split())}"
+    cached = live_search_cache.get(cache_key)
+    if cached:
+        return {
+            **cached,
+            "cached": True,
+            "dataFreshness": "Cached",
+            "quotaRemaining": _monthly_quota["limit"] - _monthly_quota["used"],
+            "quotaUsed": _monthly_quota["used"],
+            "quotaLimit": _monthly_quota["limit"],
+        }
+
     # Check quota (basic in-memory tracking)
     if _monthly_quota["used"] >= _monthly_quota["limit"]:
         return {
@@ -85,7 +112,10 @@ async def search_live_data(
 
 Be concise but thorough. Always cite specific sources when possible. Focus on practical, actionable information."""
 
-    async with httpx.AsyncClient(timeout=60.0) as client:
+    if deadline.expired(deadline.MIN_CALL_SECONDS):
+        return deadline.degraded_tool_result("search_live_data")
+
+    async with httpx.AsyncClient(timeout=deadline.timeout(LIVE_SEARCH_TIMEOUT_SECONDS)) as client:
         try:
             response = await client.post(
                 PERPLEXITY_API_URL,
@@ -129,6 +159,22 @@ Be concise but thorough. Always cite specific sources when possible. Focus on pr
             if "citations" in result:
                 sources = result["citations"]
 
+            tags = []
+            if target_country:
+                country_code, country_error = normalize_country_code(target_country)
+                if not country_error:
+                    tags.append(f"country:{country_code}")
+            live_search_cache.set(
+                cache_key,
+                {
+                    "success": True,
+                    "answer": answer,
+                    "sources": sources,
+                    "dataFreshness": "Real-time",
+                },
+                tags=tags,
+            )
+
             return {
                 "success": True,
                 "answer": answer,
@@ -140,6 +186,8 @@ Be concise but thorough. Always cite specific sources when possible. Focus on pr
             }
 
         except httpx.TimeoutException:
+            if deadline.expired():
+                deadline.record_exceeded("tool", "search_live_data")
             return {
                 "error": True,
                 "message": "Search timed out. Please try a more specific query or try again later.",
@@ -152,4 +200,4 @@ Be concise but thorough. Always cite specific sources when possible. Focus on pr
 
 
 # Wrap function as FunctionTool for ADK
-search_live_data_tool = FunctionTool(search_live_data)
+search_live_data_tool = FunctionTool(batched(search_live_data))
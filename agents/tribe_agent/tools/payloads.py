@@ -0,0 +1,178 @@
+"""
+Tool Payload Shaping
+
+Tool results are serialized back into the model context on every call, so
+every repeated metadata block and long description costs input tokens on
+each following turn. Each tool accepts a `detail` level and passes its raw
+result through `shape_result` before returning:
+
+- "summary":  just enough for the model to answer or decide to drill down
+- "standard": what the chat UI cards render; repeated metadata dropped,
+              long text truncated, empty fields removed (default)
+- "full":     the raw result, unchanged
+"""
+
+from typing import Any, Callable
+
+import serialization
+from logging_config import get_logger
+from tools.results import HousingSearchResult, UserContextResult, VisaResult
+
+logger = get_logger(__name__)
+
+DETAIL_LEVELS = ("summary", "standard", "full")
+DEFAULT_DETAIL = "standard"
+
+# Rough chars-per-token ratio for Gemini tokenization of JSON payloads
+CHARS_PER_TOKEN = 4
+
+DESCRIPTION_MAX_CHARS = 200
+REQUIREMENT_MAX_CHARS = 200
+SUMMARY_MAX_ITEMS = 5
+TODOS_MAX_ITEMS = 10
+TODO_FIELDS = ("title", "column", "priority", "category")
+
+
+def estimate_tokens(payload: Any) -> int:
+    """Estimate how many input tokens a payload adds to the model context."""
+    text = serialization.dumps_str(payload)
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def truncate(text: str, max_chars: int) -> str:
+    """Truncate text at a word boundary, marking the cut with an ellipsis."""
+    if not isinstance(text, str) or len(text) <= max_chars:
+        return text
+    cut = text[:max_chars].rsplit(" ", 1)[0]
+    return cut.rstrip(" ,.;:") + "…"
+
+
+def drop_empty(payload: dict) -> dict:
+    """Remove keys whose values are None or empty containers."""
+    return {k: v for k, v in payload.items() if v is not None and v != [] and v != {}}
+
+
+def normalize_detail(detail: str) -> str:
+    """Map an unknown or missing detail level to the default."""
+    detail = (detail or DEFAULT_DETAIL).lower()
+    return detail if detail in DETAIL_LEVELS else DEFAULT_DETAIL
+
+
+def _shape_housing(result: dict, detail: str) -> HousingSearchResult:
+    metadata = result.get("metadata", {})
+    shaped = {
+        "total_found": result.get("total_found", 0),
+        # Only freshness matters per call; coverage lists are the same every time
+        "metadata": drop_empty({"last_updated": metadata.get("last_updated")}),
+    }
+    if "suggestion" in result:
+        shaped["suggestion"] = result["suggestion"]
+
+    results = result.get("results", [])
+
+    # Hoist continent when every result shares it (country stays per result for the UI card)
+    continents = {r.get("continent") for r in results}
+    if len(continents) == 1:
+        shaped["continent"] = continents.pop()
+
+    if detail == "summary":
+        shaped["results"] = [
+            {
+                "organization": r.get("organization"),
+                "type": r.get("type"),
+                "country": r.get("country"),
+                "url": r.get("url"),
+            }
+            for r in results[:SUMMARY_MAX_ITEMS]
+        ]
+    else:
+        shaped["results"] = [
+            drop_empty({
+                "country": r.get("country"),
+                "continent": None if "continent" in shaped else r.get("continent"),
+                "organization": r.get("organization"),
+                "url": r.get("url"),
+                "description": truncate(r.get("description", ""), DESCRIPTION_MAX_CHARS),
+                "type": r.get("type"),
+                "services": r.get("services"),
+            })
+            for r in results
+        ]
+    return shaped
+
+
+def _shape_visa(result: dict, detail: str) -> VisaResult:
+    shaped = drop_empty(dict(result))
+    requirements = result.get("requirements") or []
+    if detail == "summary":
+        shaped["requirements"] = [
+            truncate(r, REQUIREMENT_MAX_CHARS) for r in requirements[:SUMMARY_MAX_ITEMS]
+        ]
+        if len(requirements) > SUMMARY_MAX_ITEMS:
+            shaped["requirementsTotal"] = len(requirements)
+        shaped.pop("quotaRemaining", None)
+    elif requirements:
+        shaped["requirements"] = [truncate(r, REQUIREMENT_MAX_CHARS) for r in requirements]
+    return shaped
+
+
+def _shape_user_context(result: dict, detail: str) -> UserContextResult:
+    todos = result.get("todos") or []
+    shaped = {
+        "success": result.get("success", True),
+        "summary": result.get("summary"),
+        "progress": result.get("progress"),
+        "unchanged": result.get("unchanged"),
+    }
+    if detail == "summary":
+        shaped["todosTotal"] = len(todos)
+    else:
+        shaped["todos"] = [
+            drop_empty({field: t.get(field) for field in TODO_FIELDS})
+            for t in todos[:TODOS_MAX_ITEMS]
+        ]
+        if len(todos) > TODOS_MAX_ITEMS:
+            shaped["todosTotal"] = len(todos)
+    return drop_empty(shaped)
+
+
+_SHAPERS: dict[str, Callable[[dict, str], dict]] = {
+    "search_housing_resources": _shape_housing,
+    "search_visa_options": _shape_visa,
+    "get_user_context": _shape_user_context,
+}
+
+
+def shape_result(tool_name: str, result: dict, detail: str = DEFAULT_DETAIL) -> dict:
+    """
+    Shape a tool result for the requested detail level and log the token savings.
+
+    Error results are returned unchanged so the model always sees the message.
+
+    Args:
+        tool_name: Name of the tool producing the result
+        result: Raw tool result
+        detail: 'summary', 'standard' or 'full'
+
+    Returns:
+        The shaped result
+    """
+    detail = normalize_detail(detail)
+    if detail == "full" or result.get("error") or tool_name not in _SHAPERS:
+        return result
+
+    shaped = _SHAPERS[tool_name](result, detail)
+
+    tokens_before = estimate_tokens(result)
+    tokens_after = estimate_tokens(shaped)
+    logger.info(
+        f"Tool payload shaped: {tool_name}",
+        extra={
+            "tool": tool_name,
+            "detail": detail,
+            "tokens_full": tokens_before,
+            "tokens_shaped": tokens_after,
+            "tokens_saved": tokens_before - tokens_after,
+        },
+    )
+    return shaped
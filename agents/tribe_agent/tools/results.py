@@ -0,0 +1,122 @@
+"""
+Typed result shapes for the agent tools.
+
+TypedDicts cost nothing at runtime (results stay plain dicts, which every
+JSON backend in serialization.py encodes natively), but they document the
+contract shared by the tools, tools/payloads.py, the /api endpoints and the
+frontend cards.
+
+Use them inside the tools (shapers, builders), not as the return annotation
+of a FunctionTool function: ADK 1.x cannot parse Union[<TypedDict>, ToolError]
+return annotations on Vertex AI and fails to build the tool declaration.
+Tool functions stay annotated `-> dict` (see tests/test_tool_declarations.py).
+
+Fields are optional (total=False) where detail levels or error paths omit them.
+"""
+
+from typing import Any, Optional
+
+# typing_extensions (a pydantic dependency) so pydantic can build schemas on 3.11
+from typing_extensions import Required, TypedDict
+
+
+class ToolError(TypedDict, total=False):
+    """Returned by every tool instead of raising."""
+    error: Required[bool]
+    message: Required[str]
+    suggestions: Optional[list[str]]
+    degraded: bool
+    quotaExceeded: bool
+    quotaStatus: dict[str, int]
+    suggestion: str
+
+
+class HousingResource(TypedDict, total=False):
+    country: str
+    continent: str
+    organization: str
+    url: str
+    description: str
+    type: str
+    services: list[str]
+
+
+class LiveSearchSuggestion(TypedDict):
+    message: str
+    action: str
+    actionLabel: str
+    note: str
+
+
+class HousingSearchResult(TypedDict, total=False):
+    total_found: Required[int]
+    results: Required[list[HousingResource]]
+    metadata: dict[str, Any]
+    continent: str
+    suggestion: LiveSearchSuggestion
+
+
+class HousingOverview(TypedDict, total=False):
+    scope: Required[str]
+    total_resources: Required[int]
+    total_countries: int
+    continents: dict[str, int]
+    countries: dict[str, int]
+    resource_types: dict[str, int]
+    services: dict[str, int]
+    service_tags: int
+    last_updated: Optional[str]
+
+
+class ProcessingTime(TypedDict, total=False):
+    averageDays: Optional[float]
+    source: str
+    cached: bool
+
+
+class VisaResult(TypedDict, total=False):
+    success: Required[bool]
+    origin: str
+    destination: str
+    visaRequired: bool
+    visaType: str
+    stayDuration: str
+    requirements: list[str]
+    requirementsTotal: int
+    estimatedCost: Optional[str]
+    cached: bool
+    quotaRemaining: Optional[int]
+    processingTime: ProcessingTime
+
+
+class Todo(TypedDict, total=False):
+    title: str
+    column: str
+    priority: str
+    category: str
+
+
+class Progress(TypedDict, total=False):
+    total: int
+    completed: int
+    percentage: float
+
+
+class UserContextResult(TypedDict, total=False):
+    success: Required[bool]
+    summary: str
+    progress: Progress
+    unchanged: bool
+    todos: list[Todo]
+    todosTotal: int
+
+
+class LiveSearchResult(TypedDict, total=False):
+    success: Required[bool]
+    answer: str
+    sources: list[str]
+    dataFreshness: str
+    cached: bool
+    quotaRemaining: int
+    quotaUsed: int
+    quotaLimit: int
@@ -4,16 +4,40 @@ Visa Search Tool
 Provides visa requirement discovery and pathway information for migration corridors.
 """
 
+import collections
 import os
 from typing import Optional
 
 import httpx
 from google.adk.tools import FunctionTool
 
+import deadline
+from cache import get_cache
+from tools.batching import batched
+from tools.payloads import DEFAULT_DETAIL, shape_result
+
 
 # Convex site URL for HTTP endpoints
 CONVEX_SITE_URL = os.environ.get("CONVEX_SITE_URL", "")
 
+# Upper bound per call; the turn deadline may leave less (see deadline.py)
+VISA_TIMEOUT_SECONDS = 30.0
+
+# Visa rules change rarely; cache per corridor to skip the Convex round trip.
+# Entries are tagged 'iso3:<origin>:<destination>' so Convex can invalidate a
+# corridor when its visa data is refreshed (POST /internal/invalidate).
+VISA_CACHE_TTL_SECONDS = float(os.environ.get("VISA_CACHE_TTL_SECONDS", 24 * 60 * 60))
+visa_cache = get_cache("visa", max_entries=2048, default_ttl=VISA_CACHE_TTL_SECONDS)
+
+
+# Successful lookups per known corridor in this worker; the cache warmer
+# refreshes the busiest. Trimmed to the busiest half when it reaches the cap.
+corridor_hits: collections.Counter = collections.Counter()
+CORRIDOR_HITS_MAX = 1000
+
+# Convex calls made for users right now; background refreshes wait for zero
+_user_calls_in_flight = 0
+
 
 # Comprehensive country name to ISO3 code mappings
 COUNTRY_CODES = {
@@ -21,9 +45,12 @@ COUNTRY_CODES = {
     "united states": "USA", "usa": "USA", "us": "USA", "america": "USA", "united states of america": "USA",
     "canada": "CAN", "ca": "CAN",
     "mexico": "MEX", "mx": "MEX",
+    "panama": "PAN", "pa": "PAN",
+    "costa rica": "CRI", "cr": "CRI",
 
     # Europe
     "united kingdom": "GBR", "uk": "GBR", "britain": "GBR", "england": "GBR", "great britain": "GBR",
+    "gb": "GBR",
     "germany": "DEU", "de": "DEU", "deutschland": "DEU",
     "france": "FRA", "fr": "FRA",
     "spain": "ESP", "es": "ESP",
@@ -40,6 +67,7 @@ COUNTRY_CODES = {
     "denmark": "DNK", "dk": "DNK",
     "finland": "FIN", "fi": "FIN",
     "greece": "GRC", "gr": "GRC",
+    "czech republic": "CZE", "czechia": "CZE", "cz": "CZE",
 
     # Oceania
     "australia": "AUS", "au": "AUS",
@@ -71,6 +99,7 @@ COUNTRY_CODES = {
     "ghana": "GHA", "gh": "GHA",
     "ethiopia": "ETH", "et": "ETH",
     "morocco": "MAR", "ma": "MAR",
+    "uganda": "UGA", "ug": "UGA",
 
     # South America
     "brazil": "BRA", "br": "BRA",
@@ -135,10 +164,109 @@ def get_country_suggestions(query: str) -> list[str]:
     return suggestions
 
 
+def requirements_key(origin_code: str, dest_code: str) -> str:
+    return f"requirements:{origin_code}:{dest_code}"
+
+
+def processing_times_key(origin_code: str, dest_code: str, visa_type: str) -> str:
+    return f"processing_times:{origin_code}:{dest_code}:{visa_type}"
+
+
+def _corridor_tags(origin_code: str, dest_code: str) -> list[str]:
+    return [f"iso3:{origin_code}:{dest_code}"]
+
+
+def _record_hit(origin_code: str, dest_code: str) -> None:
+    if origin_code not in VALID_ISO3_CODES or dest_code not in VALID_ISO3_CODES:
+        return  # Unrecognized codes go to Convex but are never warmed
+    corridor_hits[(origin_code, dest_code)] += 1
+    if len(corridor_hits) > CORRIDOR_HITS_MAX:
+        busiest = corridor_hits.most_common(CORRIDOR_HITS_MAX // 2)
+        corridor_hits.clear()
+        corridor_hits.update(dict(busiest))
+
+
+def user_calls_in_flight() -> int:
+    """Convex requests currently made on behalf of users in this worker."""
+    return _user_calls_in_flight
+
+
+async def _post(client: httpx.AsyncClient, path: str, payload: dict, background: bool):
+    global _user_calls_in_flight
+    if background:
+        return await client.post(f"{CONVEX_SITE_URL}{path}", json=payload)
+    _user_calls_in_flight += 1
+    try:
+        return await client.post(f"{CONVEX_SITE_URL}{path}", json=payload)
+    finally:
+        _user_calls_in_flight -= 1
+
+
+async def fetch_requirements(
+    client: httpx.AsyncClient, origin_code: str, dest_code: str, background: bool = False
+) -> dict:
+    """
+    Fetch visa requirements for a corridor from Convex and cache a successful result.
+
+    Returns:
+        The Convex result, or a dict with error: True if the request failed
+    """
+    response = await _post(
+        client,
+        "/api/visa/requirements",
+        {"origin": origin_code, "destination": dest_code},
+        background,
+    )
+    if response.status_code != 200:
+        error_data = response.json()
+        return {
+            "error": True,
+            "message": error_data.get(
+                "message", f"Request failed with status {response.status_code}"
+            ),
+        }
+
+    visa_data = response.json()
+    # The result itself may be an error
+    if not visa_data.get("error"):
+        visa_cache.set(
+            requirements_key(origin_code, dest_code),
+            visa_data,
+            tags=_corridor_tags(origin_code, dest_code),
+        )
+    return visa_data
+
+
+async def fetch_processing_times(
+    client: httpx.AsyncClient,
+    origin_code: str,
+    dest_code: str,
+    visa_type: str,
+    background: bool = False,
+) -> Optional[dict]:
+    """Fetch processing time estimates from Convex and cache them. None on failure."""
+    response = await _post(
+        client,
+        "/api/visa/processing-times",
+        {"origin": origin_code, "destination": dest_code, "visaType": visa_type},
+        background,
+    )
+    if response.status_code != 200:
+        return None
+    times_data = response.json()
+    visa_cache.set(
+        processing_times_key(origin_code, dest_code, visa_type),
+        times_data,
+        tags=_corridor_tags(origin_code, dest_code),
+    )
+    return times_data
+
+
 async def search_visa_options(
     origin: str,
     destination: str,
     get_processing_times: bool = False,
+    detail: str = DEFAULT_DETAIL,
 ) -> dict:
     """
     Discover visa requirements and pathways for migration between countries.
@@ -153,6 +281,9 @@ async def search_visa_options(
                      or ISO 3166-1 alpha-3 code like 'CAN'.
         get_processing_times: Whether to fetch real-time processing time estimates.
                               This uses additional API quota.
+        detail: How much to return: 'summary' (visa type, cost and the first few
+                requirements), 'standard' (default, all requirements) or 'full'
+                (raw result including empty fields).
 
     Returns:
         dict containing:
@@ -190,29 +321,17 @@ async def search_visa_options(
             "suggestions": suggestions if suggestions else None,
         }
 
-    async with httpx.AsyncClient(timeout=30.0) as client:
+    visa_data = visa_cache.get(requirements_key(origin_code, dest_code))
+    if visa_data is None and deadline.expired(deadline.MIN_CALL_SECONDS):
+        return deadline.degraded_tool_result("search_visa_options")
+
+    async with httpx.AsyncClient(timeout=deadline.timeout(VISA_TIMEOUT_SECONDS)) as client:
         try:
-            # Get visa requirements
-            response = await client.post(
-                f"{CONVEX_SITE_URL}/api/visa/requirements",
-                json={
-                    "origin": origin_code,
-                    "destination": dest_code,
-                },
-            )
-
-            if response.status_code != 200:
-                error_data = response.json()
-                return {
-                    "error": True,
-                    "message": error_data.get("message", f"Request failed with status {response.status_code}"),
-                }
-
-            visa_data = response.json()
-
-            # Check if the result itself is an error
-            if visa_data.get("error"):
-                return visa_data
+            if visa_data is None:
+                visa_data = await fetch_requirements(client, origin_code, dest_code)
+                if visa_data.get("error"):
+                    return visa_data
+            _record_hit(origin_code, dest_code)
 
             # Format successful response
             result = {
@@ -229,31 +348,37 @@ async def search_visa_options(
             }
 
             # Optionally get processing times
-            if get_processing_times and result["visaType"] and result["visaType"] != "Unknown":
+            # Processing times are optional; skip them rather than overrun the turn
+            if (
+                get_processing_times
+                and result["visaType"]
+                and result["visaType"] != "Unknown"
+                and not deadline.expired(deadline.MIN_CALL_SECONDS)
+            ):
+                times_key = processing_times_key(origin_code, dest_code, result["visaType"])
+                times_data = visa_cache.get(times_key)
                 try:
-                    times_response = await client.post(
-                        f"{CONVEX_SITE_URL}/api/visa/processing-times",
-                        json={
-                            "origin": origin_code,
-                            "destination": dest_code,
-                            "visaType": result["visaType"],
-                        },
-                    )
-
-                    if times_response.status_code == 200:
-                        times_data = times_response.json()
-                        if times_data.get("success") or times_data.get("averageProcessingDays"):
-                            result["processingTime"] = {
-                                "averageDays": times_data.get("averageProcessingDays"),
-                                "source": times_data.get("source", "estimated"),
-                                "cached": times_data.get("cached", False),
-                            }
+                    if times_data is None:
+                        times_data = await fetch_processing_times(
+                            client, origin_code, dest_code, result["visaType"]
+                        )
+
+                    if times_data and (
+                        times_data.get("success") or times_data.get("averageProcessingDays")
+                    ):
+                        result["processingTime"] = {
+                            "averageDays": times_data.get("averageProcessingDays"),
+                            "source": times_data.get("source", "estimated"),
+                            "cached": times_data.get("cached", False),
+                        }
                 except Exception:
                     pass  # Processing times are optional
 
-            return result
+            return shape_result("search_visa_options", result, detail)
 
         except httpx.TimeoutException:
+            if deadline.expired():
+                deadline.record_exceeded("tool", "search_visa_options")
             return {
                 "error": True,
                 "message": "Request timed out. Please try again.",
@@ -266,4 +391,4 @@ async def search_visa_options(
 
 
 # Wrap function as FunctionTool for ADK
-search_visa_options_tool = FunctionTool(search_visa_options)
+search_visa_options_tool = FunctionTool(batched(search_visa_options))
@@ -0,0 +1,51 @@
+"""
+User context accessors shared by the system prompt and model callbacks.
+
+CopilotKit properties (corridor, stage, language, userId) reach the agent as
+AG-UI state. ADK hands instruction providers a ReadonlyContext and model
+callbacks a CallbackContext, both exposing it as `.state`; tests and direct
+calls may pass a plain dict instead.
+"""
+
+from collections.abc import Mapping
+from typing import Any, Optional
+
+
+def safe_get(obj, key, default=None):
+    """Safely get a value from a mapping, mapping-like state or object attribute."""
+    if obj is None:
+        return default
+    if isinstance(obj, Mapping):
+        return obj.get(key, default)
+    # ADK State is mapping-like (has get/__contains__) but is not a Mapping
+    if callable(getattr(obj, "get", None)) and hasattr(obj, "__contains__"):
+        return obj.get(key, default)
+    # Try attribute access for ReadonlyContext
+    return getattr(obj, key, default)
+
+
+def get_context_value(context, key: str, default=None) -> Any:
+    """Read a user context value from the context itself or its session state."""
+    value = safe_get(context, key)
+    if value is None and not isinstance(context, Mapping):
+        value = safe_get(safe_get(context, "state"), key)
+    return default if value is None else value
+
+
+def corridor_label(context) -> Optional[str]:
+    """'<origin>→<destination>' for the user's active corridor, if known."""
+    corridor = get_context_value(context, "corridor")
+    origin = safe_get(corridor, "origin")
+    destination = safe_get(corridor, "destination")
+    if origin and destination:
+        return f"{origin}→{destination}"
+    return None
+
+
+def turn_scope(context) -> tuple[str, str, str]:
+    """(corridor, stage, language) a turn's answer depends on, for cache keys."""
+    return (
+        corridor_label(context) or "-",
+        get_context_value(context, "stage") or "-",
+        get_context_value(context, "language") or "en",
+    )
@@ -0,0 +1,153 @@
+"""
+Agent initialization and background warm-up.
+
+Importing google.adk / ag_ui_adk and loading the housing dataset dominates
+cold start time. In lazy mode (LAZY_INIT=true) the server starts answering
+liveness checks immediately, builds the agent in a background warm-up task
+started from the lifespan handler, and holds AG-UI requests that arrive
+earlier until the agent is ready.
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, Optional
+
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+LAZY_INIT = os.environ.get("LAZY_INIT", "false").lower() == "true"
+
+# Optional SQLAlchemy URL for sessions shared across worker processes
+# (e.g. sqlite:////dev/shm/tribe_sessions.db, requires google-adk[db]).
+# In-memory sessions when unset.
+SESSION_DB_URL = os.environ.get("SESSION_DB_URL", "")
+
+# Paths registered by ag_ui_adk's add_adk_fastapi_endpoint for path="/agui"
+AGUI_PATHS = ["/agui", "/agui/capabilities", "/agents/state"]
+
+_state: dict[str, Any] = {
+    "ready": False,
+    "error": None,
+    "warmup_ms": None,
+}
+_agui_app = None
+_warmup_lock: Optional[asyncio.Lock] = None
+
+
+def create_adk_agent():
+    """Build the AG-UI wrapper around the TRIBE ADK agent."""
+    from ag_ui_adk import ADKAgent
+
+    from agent import tribe_agent
+
+    session_service = None
+    if SESSION_DB_URL:
+        from google.adk.sessions import DatabaseSessionService
+
+        session_service = DatabaseSessionService(db_url=SESSION_DB_URL)
+
+    return ADKAgent(
+        adk_agent=tribe_agent,
+        app_name="tribe_ai",
+        user_id="default_user",  # Will be overridden by CopilotKit context
+        session_timeout_seconds=3600,
+        session_service=session_service,
+        use_in_memory_services=True,
+    )
+
+
+def mount_agui(app) -> None:
+    """Eagerly mount the AG-UI endpoint at /agui on the given app."""
+    from ag_ui_adk import add_adk_fastapi_endpoint
+
+    add_adk_fastapi_endpoint(app, create_adk_agent(), path="/agui")
+    _state["ready"] = True
+
+
+def preload_shared_data() -> None:
+    """
+    Load immutable datasets and lookup tables.
+
+    Called before forking by the preforked server so the parsed data is shared
+    copy-on-write between workers, and by the warm-up task otherwise.
+    """
+    import tools.visa  # noqa: F401 - country code tables
+    from tools.housing import get_housing_facets
+
+    get_housing_facets()  # Builds the search index first
+
+
+def load_heavy_modules() -> None:
+    """Import the ADK stack and load datasets (runs in a worker thread)."""
+    import ag_ui_adk  # noqa: F401
+
+    import agent  # noqa: F401
+
+    preload_shared_data()
+
+
+async def warm_up():
+    """
+    Initialize the agent once, sharing the work between concurrent callers.
+
+    Returns:
+        The ASGI app serving the AG-UI routes
+    """
+    global _agui_app, _warmup_lock
+
+    if _agui_app is not None:
+        return _agui_app
+
+    if _warmup_lock is None:
+        _warmup_lock = asyncio.Lock()
+
+    async with _warmup_lock:
+        if _agui_app is not None:
+            return _agui_app
+
+        start_time = time.perf_counter()
+        try:
+            # Module imports and JSON parsing are blocking; keep them off the loop
+            await asyncio.to_thread(load_heavy_modules)
+
+            from fastapi import FastAPI
+
+            agui_app = FastAPI(openapi_url=None, docs_url=None, redoc_url=None)
+            mount_agui(agui_app)
+        except Exception as e:
+            _state["error"] = str(e)
+            logger.exception("Agent warm-up failed")
+            raise
+
+        _state["warmup_ms"] = round((time.perf_counter() - start_time) * 1000, 2)
+        _state["error"] = None
+        _agui_app = agui_app
+        logger.info("Agent warm-up complete", extra={"duration_ms": _state["warmup_ms"]})
+        return _agui_app
+
+
+class LazyAGUIEndpoint:
+    """ASGI endpoint that waits for warm-up, then delegates to the AG-UI app."""
+
+    async def __call__(self, scope, receive, send):
+        agui_app = await warm_up()
+        await agui_app(scope, receive, send)
+
+
+def mount_lazy_agui(app) -> None:
+    """Register the AG-UI paths on the app without importing the ADK stack."""
+    endpoint = LazyAGUIEndpoint()
+    for path in AGUI_PATHS:
+        app.add_route(path, endpoint, include_in_schema=False)
+
+
+def readiness() -> dict:
+    """Current readiness state for health checks."""
+    return {
+        "ready": _state["ready"],
+        "lazy_init": LAZY_INIT,
+        "warmup_ms": _state["warmup_ms"],
+        "error": _state["error"],
+    }
@@ -301,6 +301,9 @@ http.route({
  * - todos: Recent tasks (top 5)
  * - progress: Protocol completion stats
  * - corridorInfo: Basic corridor metadata
+ *
+ * Responses carry a strong ETag; a matching If-None-Match returns 304 so the
+ * ADK agent can revalidate its per-session cache without re-downloading.
  */
 http.route({
   path: "/api/user/context",
@@ -353,26 +356,41 @@ http.route({
           };
         }) || [];
 
-      return new Response(
-        JSON.stringify({
-          success: true,
-          todos: activeTasks,
-          progress: {
-            completed: completedProtocols,
-            total: totalProtocols,
-            percentage: totalProtocols > 0
-              ? Math.round((completedProtocols / totalProtocols) * 100)
-              : 0,
-          },
-        }),
-        {
-          status: 200,
+      const body = JSON.stringify({
+        success: true,
+        todos: activeTasks,
+        progress: {
+          completed: completedProtocols,
+          total: totalProtocols,
+          percentage: totalProtocols > 0
+            ? Math.round((completedProtocols / totalProtocols) * 100)
+            : 0,
+        },
+      });
+
+      const digest = await crypto.subtle.digest("SHA-256", new TextEncoder().encode(body));
+      const etag = `"${Array.from(new Uint8Array(digest).slice(0, 16))
+        .map((b) => b.toString(16).padStart(2, "0"))
+        .join("")}"`;
+
+      if (request.headers.get("If-None-Match") === etag) {
+        return new Response(null, {
+          status: 304,
           headers: {
-            "Content-Type": "application/json",
+            ETag: etag,
             "Access-Control-Allow-Origin": "*",
           },
-        }
-      );
+        });
+      }
+
+      return new Response(body, {
+        status: 200,
+        headers: {
+          "Content-Type": "application/json",
+          ETag: etag,
+          "Access-Control-Allow-Origin": "*",
+        },
+      });
     } catch (error) {
       return new Response(
         JSON.stringify({ error: true, message: String(error) }),
@@ -397,7 +415,8 @@ http.route({
       headers: {
         "Access-Control-Allow-Origin": "*",
         "Access-Control-Allow-Methods": "GET, OPTIONS",
-        "Access-Control-Allow-Headers": "Content-Type",
+        "Access-Control-Allow-Headers": "Content-Type, If-None-Match",
+        "Access-Control-Expose-Headers": "ETag",
       },
     });
   }),